@@ -0,0 +1,178 @@
+'''
+Benchmarks concurrent reads and writes of sensor data via the API of The Europa
+project, with each database engine profile.
+'''
+
+import os
+import sys
+import json
+import time
+import shutil
+import datetime
+import argparse
+import tempfile
+import threading
+
+from europa import initialize_all
+
+from europa.models import db
+from europa.models import Vessel
+from europa.models import VesselSize
+from europa.models import Sensor
+from europa.models import SensorCategory
+
+# Define the profiles to compare, where None is the library defaults.
+PROFILES = [None, 'sqlite-embedded']
+
+
+def setup(application):
+    ''' Creates an empty database, with a single sensor. '''
+    with application.app_context():
+        db.create_all()
+        db.session.add(
+            Vessel(
+                id=1,
+                name='Vessel',
+                size=VesselSize.POT_TWELVE_CM,
+                location='Benchmark',
+            )
+        )
+        db.session.add(SensorCategory(id=1, name='Category', units='Degrees'))
+        db.session.add(Sensor(id=1, name='Sensor', vessel_id=1, category_id=1))
+        db.session.commit()
+
+
+def write(client, index):
+    ''' Submits a single entry of sensor data, returning whether successful. '''
+    created = datetime.datetime(2018, 1, 1) + datetime.timedelta(seconds=index)
+    response = client.post(
+        '/api/v1/sensor/1/data',
+        data=json.dumps({
+            'value': float(index % 100),
+            'created': created.strftime('%Y-%m-%dT%H:%M:%S'),
+        }),
+        content_type='application/json',
+    )
+    return response.status_code == 201
+
+
+def read(client, index):
+    ''' Reads the latest sensor data, returning whether successful. '''
+    response = client.get(
+        '/api/v1/sensor/1/data?since=2018-01-01T00:00:00&limit=100'
+    )
+    return response.status_code == 200
+
+
+def run(application, function, counter, offset, deadline):
+    ''' Calls the given function until the deadline, counting each outcome. '''
+    client = application.test_client()
+    index = offset
+    while time.perf_counter() < deadline:
+        try:
+            succeeded = function(client, index)
+        except Exception:
+            succeeded = False
+        counter[0 if succeeded else 1] += 1
+        index += 1
+
+
+def measure(profile, writers, readers, duration):
+    '''
+    Runs the given number of writer, and reader, threads against a new database
+    file with the given profile for the given duration. Returns the number of
+    successful writes, reads, and failed requests, per second.
+    '''
+    directory = tempfile.mkdtemp()
+    try:
+        application = initialize_all()
+        application.config.update(
+            DEBUG=False,
+            TESTING=False,
+            DATABASE_PROFILE=profile,
+            SQLALCHEMY_DATABASE_URI='sqlite:///{}'.format(
+                os.path.join(directory, 'benchmark.db')
+            ),
+        )
+        setup(application)
+
+        counters = []
+        threads = []
+        deadline = time.perf_counter() + duration
+        for number, function in (
+            [(number, write) for number in range(writers)] +
+            [(number, read) for number in range(readers)]
+        ):
+            counter = [0, 0]
+            counters.append((function, counter))
+            threads.append(
+                threading.Thread(
+                    target=run,
+                    args=(
+                        application,
+                        function,
+                        counter,
+                        number * 10 ** 7,
+                        deadline,
+                    ),
+                )
+            )
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        return (
+            sum(c[0] for f, c in counters if f is write) / duration,
+            sum(c[0] for f, c in counters if f is read) / duration,
+            sum(c[1] for f, c in counters) / duration,
+        )
+    finally:
+        shutil.rmtree(directory)
+
+
+def main():
+    ''' Benchmarks each engine profile with the requested concurrency. '''
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--writers',
+        type=int,
+        default=2,
+        help='The number of threads submitting sensor data',
+    )
+    parser.add_argument(
+        '--readers',
+        type=int,
+        default=4,
+        help='The number of threads reading sensor data',
+    )
+    parser.add_argument(
+        '--duration',
+        type=float,
+        default=10.0,
+        help='The number of seconds to run each benchmark for',
+    )
+    arguments = parser.parse_args()
+
+    print(
+        '{:>16} {:>12} {:>12} {:>12}'.format(
+            'profile', 'writes/sec', 'reads/sec', 'errors/sec'
+        )
+    )
+    for profile in PROFILES:
+        writes, reads, errors = measure(
+            profile,
+            arguments.writers,
+            arguments.readers,
+            arguments.duration,
+        )
+        print(
+            '{:>16} {:>12,.0f} {:>12,.0f} {:>12,.1f}'.format(
+                profile or 'default', writes, reads, errors
+            )
+        )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,125 @@
+''' Benchmarks the sensor data read path of The Europa project. '''
+
+import sys
+import json
+import time
+import datetime
+import argparse
+import tracemalloc
+
+import sqlalchemy
+
+from europa import initialize_all
+
+from europa.models import db
+from europa.models import Vessel
+from europa.models import VesselSize
+from europa.models import Sensor
+from europa.models import SensorData
+from europa.models import SensorCategory
+from europa.timeseries import Series
+
+from europa.api.v1 import formats
+
+# Define the number of rows to insert at a time when seeding.
+SEED_CHUNK_SIZE = 10000
+
+
+def seed(rows):
+    ''' Seeds the database with a single sensor, with the given rows of data. '''
+    db.drop_all()
+    db.create_all()
+    db.session.add(
+        Vessel(
+            id=1,
+            name='Vessel',
+            size=VesselSize.POT_TWELVE_CM,
+            location='Benchmark',
+        )
+    )
+    db.session.add(SensorCategory(id=1, name='Category', units='Degrees'))
+    db.session.add(Sensor(id=1, name='Sensor', vessel_id=1, category_id=1))
+    db.session.commit()
+
+    start = datetime.datetime(2018, 1, 1)
+    for offset in range(0, rows, SEED_CHUNK_SIZE):
+        db.session.execute(
+            SensorData.__table__.insert(),
+            [
+                {
+                    'sensor_id': 1,
+                    'value': float(index % 100),
+                    'created': start + datetime.timedelta(seconds=index),
+                }
+                for index in range(offset, min(offset + SEED_CHUNK_SIZE, rows))
+            ],
+        )
+    db.session.commit()
+
+
+def read_orm():
+    ''' Reads, and serializes, all sensor data via the ORM. '''
+    candidates = SensorData.query.filter(
+        SensorData.sensor_id == 1,
+    ).order_by(SensorData.created, SensorData.id).all()
+    document = json.dumps([candidate.for_json() for candidate in candidates])
+    db.session.expunge_all()
+    return document
+
+
+def read_core():
+    ''' Reads, and serializes, all sensor data via Core into arrays. '''
+    series = Series.from_rows(
+        db.session.execute(
+            sqlalchemy.select([
+                SensorData.id,
+                SensorData.created,
+                SensorData.value,
+            ]).where(
+                SensorData.sensor_id == 1,
+            ).order_by(SensorData.created, SensorData.id)
+        )
+    )
+    return json.dumps(formats.to_document(series, formats.JSON))
+
+
+def measure(function, rows):
+    ''' Returns the rows per second, and peak memory in bytes, of a read. '''
+    tracemalloc.start()
+    started = time.perf_counter()
+    function()
+    elapsed = time.perf_counter() - started
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return rows / elapsed, peak
+
+
+def main():
+    ''' Benchmarks each read path for each requested number of rows. '''
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--rows',
+        type=int,
+        nargs='+',
+        default=[10000, 100000, 1000000],
+        help='The number of rows to read in each benchmark',
+    )
+    arguments = parser.parse_args()
+
+    application = initialize_all()
+    print('{:>10} {:>6} {:>14} {:>14}'.format('rows', 'path', 'rows/sec', 'peak MiB'))
+    with application.app_context():
+        for rows in arguments.rows:
+            seed(rows)
+            for name, function in (('orm', read_orm), ('core', read_core)):
+                rate, peak = measure(function, rows)
+                print(
+                    '{:>10} {:>6} {:>14,.0f} {:>14.1f}'.format(
+                        rows, name, rate, peak / 1024.0 / 1024.0
+                    )
+                )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
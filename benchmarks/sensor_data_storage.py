@@ -0,0 +1,156 @@
+''' Benchmarks the sensor data storage engines of The Europa project. '''
+
+import os
+import sys
+import math
+import time
+import datetime
+import argparse
+import tempfile
+
+import sqlalchemy
+
+from europa import blocks
+from europa import initialize_all
+
+from europa.models import db
+from europa.models import Vessel
+from europa.models import VesselSize
+from europa.models import Sensor
+from europa.models import SensorData
+from europa.models import SensorCategory
+from europa.timeseries import Series
+
+# Define the number of rows to insert at a time when seeding, and the number of
+# seconds between each entry.
+SEED_CHUNK_SIZE = 10000
+SEED_INTERVAL = 60
+
+
+def setup():
+    ''' Creates an empty database, with a single sensor. '''
+    db.drop_all()
+    db.create_all()
+    db.session.add(
+        Vessel(
+            id=1,
+            name='Vessel',
+            size=VesselSize.POT_TWELVE_CM,
+            location='Benchmark',
+        )
+    )
+    db.session.add(SensorCategory(id=1, name='Category', units='Degrees'))
+    db.session.add(Sensor(id=1, name='Sensor', vessel_id=1, category_id=1))
+    db.session.commit()
+
+
+def seed(rows):
+    '''
+    Seeds the sensor with the given rows of slowly changing data - as would be
+    read from a real sensor. Returns the time of the last entry.
+    '''
+    start = datetime.datetime(2018, 1, 1)
+    for offset in range(0, rows, SEED_CHUNK_SIZE):
+        db.session.execute(
+            SensorData.__table__.insert(),
+            [
+                {
+                    'sensor_id': 1,
+                    'value': round(20.0 + 5.0 * math.sin(index / 500.0), 1),
+                    'created': start + datetime.timedelta(
+                        seconds=index * SEED_INTERVAL
+                    ),
+                }
+                for index in range(offset, min(offset + SEED_CHUNK_SIZE, rows))
+            ],
+        )
+    db.session.commit()
+    return start + datetime.timedelta(seconds=(rows - 1) * SEED_INTERVAL)
+
+
+def size():
+    ''' Returns the size of the database, in bytes, once vacuumed. '''
+    db.session.commit()
+    db.session.execute('VACUUM')
+    return (
+        db.session.execute('PRAGMA page_count').scalar() *
+        db.session.execute('PRAGMA page_size').scalar()
+    )
+
+
+def read_rows():
+    ''' Reads all sensor data from rows into arrays. '''
+    return Series.from_rows(
+        db.session.execute(
+            sqlalchemy.select([
+                SensorData.id,
+                SensorData.created,
+                SensorData.value,
+            ]).where(
+                SensorData.sensor_id == 1,
+            ).order_by(SensorData.created, SensorData.id)
+        )
+    )
+
+
+def read_blocks():
+    ''' Reads all sealed sensor data from blocks into arrays. '''
+    return blocks.read([1])[1]
+
+
+def measure(function):
+    ''' Returns the number of entries read, and the time taken to read them. '''
+    started = time.perf_counter()
+    series = function()
+    return len(series), time.perf_counter() - started
+
+
+def main():
+    ''' Benchmarks each storage engine for each requested number of rows. '''
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--rows',
+        type=int,
+        nargs='+',
+        default=[10000, 100000, 1000000],
+        help='The number of rows to store in each benchmark',
+    )
+    arguments = parser.parse_args()
+
+    # Use a database file, rather than memory, so that its size is realistic.
+    directory = tempfile.mkdtemp()
+    application = initialize_all()
+    application.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///{}'.format(
+        os.path.join(directory, 'benchmark.db')
+    )
+    application.config['SENSOR_DATA_STORAGE'] = blocks.BLOCKS
+
+    print(
+        '{:>10} {:>7} {:>14} {:>14}'.format(
+            'rows', 'engine', 'bytes/point', 'points/sec'
+        )
+    )
+    with application.app_context():
+        for rows in arguments.rows:
+            setup()
+            empty = size()
+            latest = seed(rows)
+
+            # Seal everything but the window holding the latest entry. The size
+            # of each engine includes any rows left in the head.
+            results = []
+            results.append(('rows', size() - empty, measure(read_rows)))
+            blocks.seal(now=latest + datetime.timedelta(days=7))
+            results.append(('blocks', size() - empty, measure(read_blocks)))
+
+            for name, stored, (points, elapsed) in results:
+                print(
+                    '{:>10} {:>7} {:>14.2f} {:>14,.0f}'.format(
+                        rows, name, stored / float(rows), points / elapsed
+                    )
+                )
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,415 @@
+'''
+Benchmarks ingest throughput, query latency, and memory per request of the API
+of The Europa project against a seeded, file-backed, SQLite database. Results
+are written as JSON so that runs can be compared.
+'''
+
+import os
+import sys
+import json
+import time
+import random
+import shutil
+import sqlite3
+import platform
+import datetime
+import argparse
+import tempfile
+import subprocess
+import tracemalloc
+
+import numpy
+import sqlalchemy
+
+from europa import rollups
+from europa import initialize_all
+
+from europa.models import db
+from europa.models import Vessel
+from europa.models import VesselSize
+from europa.models import Sensor
+from europa.models import SensorData
+from europa.models import SensorCategory
+
+# Define the version of the format of results, to be incremented whenever
+# results are no longer comparable with those of previous versions.
+RESULTS_VERSION = 1
+
+# Define the time of the last entry of the seeded dataset, so that datasets -
+# and the windows read from them - are identical between runs.
+DATASET_END = datetime.datetime(2018, 6, 1)
+
+# Define the number of rows to insert at a time when seeding.
+SEED_CHUNK_SIZE = 10000
+
+# Define the number of entries to request per page when reading.
+PAGE_SIZE = 10000
+
+# Define the percentiles of latency to report.
+PERCENTILES = [50, 95, 99]
+
+
+def generate(sensors, days, cadence, seed):
+    '''
+    Seeds an empty database with the given number of sensors, each with the
+    given number of days of data at the given cadence, in seconds. Values are a
+    random walk from the given seed, so that the dataset is reproducible.
+    Returns the number of entries seeded.
+    '''
+    db.drop_all()
+    db.create_all()
+    db.session.add(
+        Vessel(
+            id=1,
+            name='Vessel',
+            size=VesselSize.POT_TWELVE_CM,
+            location='Benchmark',
+        )
+    )
+    db.session.add(SensorCategory(id=1, name='Category', units='Degrees'))
+    for sensor_id in range(1, sensors + 1):
+        db.session.add(
+            Sensor(
+                id=sensor_id,
+                name='Sensor {}'.format(sensor_id),
+                vessel_id=1,
+                category_id=1,
+            )
+        )
+    db.session.commit()
+
+    generator = random.Random(seed)
+    per_sensor = int(days * 24 * 60 * 60 // cadence)
+    start = DATASET_END - datetime.timedelta(seconds=(per_sensor - 1) * cadence)
+    values = [20.0] * sensors
+
+    # Insert entries in the order they would be received, interleaving sensors.
+    chunk = []
+    for index in range(per_sensor):
+        created = start + datetime.timedelta(seconds=index * cadence)
+        for sensor in range(sensors):
+            values[sensor] += generator.gauss(0.0, 0.1)
+            chunk.append({
+                'sensor_id': sensor + 1,
+                'value': round(values[sensor], 1),
+                'created': created,
+            })
+        if len(chunk) >= SEED_CHUNK_SIZE:
+            db.session.execute(SensorData.__table__.insert(), chunk)
+            chunk = []
+    if chunk:
+        db.session.execute(SensorData.__table__.insert(), chunk)
+    db.session.commit()
+
+    # Rollups are maintained on ingest, so must also exist for seeded data.
+    rollups.rebuild()
+    return per_sensor * sensors
+
+
+def scenarios(sensors, requests):
+    '''
+    Returns the name of each benchmark, the number of times it is run, and a
+    function which performs it with a given client and iteration - returning
+    the number of HTTP requests made.
+    '''
+    def get(client, url):
+        ''' Returns the response of a successful GET of the given URL. '''
+        response = client.get(url)
+        if response.status_code != 200:
+            raise RuntimeError('GET {} returned {}'.format(url, response.status_code))
+        return response
+
+    def ingest(client, index):
+        created = DATASET_END + datetime.timedelta(seconds=index + 1)
+        response = client.post(
+            '/api/v1/sensor/{}/data'.format(index % sensors + 1),
+            data=json.dumps({
+                'value': 20.0,
+                'created': created.strftime('%Y-%m-%dT%H:%M:%S'),
+            }),
+            content_type='application/json',
+        )
+        if response.status_code != 201:
+            raise RuntimeError('POST returned {}'.format(response.status_code))
+        return 1
+
+    def listing(url):
+        def retrieve(client, index):
+            get(client, url)
+            return 1
+        return retrieve
+
+    def window(days):
+        since = DATASET_END - datetime.timedelta(days=days)
+        url = '/api/v1/sensor/{}/data?since={}&until={}&limit={}'
+
+        def retrieve(client, index):
+            # Follow each page of the window, as a client would.
+            made = 1
+            response = get(
+                client,
+                url.format(
+                    index % sensors + 1,
+                    since.strftime('%Y-%m-%dT%H:%M:%S'),
+                    DATASET_END.strftime('%Y-%m-%dT%H:%M:%S'),
+                    PAGE_SIZE,
+                ),
+            )
+            while json.loads(response.data.decode()):
+                link = response.headers['Link'][1:].split('>')[0]
+                response = get(client, link)
+                made += 1
+            return made
+        return retrieve
+
+    return [
+        ('list_sensors', requests, listing('/api/v1/sensors')),
+        ('list_vessels', requests, listing('/api/v1/vessel')),
+        ('list_categories', requests, listing('/api/v1/sensor/categories')),
+        ('read_24h', requests, window(1)),
+        ('read_30d', max(1, requests // 10), window(30)),
+        # Ingest last, so that reads are of the seeded dataset alone.
+        ('ingest', requests, ingest),
+    ]
+
+
+def measure(client, count, function, offset):
+    '''
+    Runs the given benchmark the given number of times, after a single warm up.
+    Returns the latency of each run, in seconds, the total time taken, and the
+    number of HTTP requests made.
+    '''
+    function(client, offset)
+
+    latencies = []
+    made = 0
+    started = time.perf_counter()
+    for index in range(offset + 1, offset + 1 + count):
+        before = time.perf_counter()
+        made += function(client, index)
+        latencies.append(time.perf_counter() - before)
+    return latencies, time.perf_counter() - started, made
+
+
+def measure_memory(client, count, function, offset):
+    '''
+    Returns the largest peak of memory allocated, in bytes, by any of the given
+    number of runs of the benchmark. This is measured separately from latency,
+    as tracing allocations slows each run.
+    '''
+    peaks = []
+    for index in range(offset, offset + count):
+        tracemalloc.start()
+        function(client, index)
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        peaks.append(peak)
+    return max(peaks)
+
+
+def summarize(latencies, elapsed, made, peak):
+    ''' Returns a JSON friendly summary of the results of a benchmark. '''
+    milliseconds = numpy.array(latencies) * 1000.0
+    summary = {
+        'runs': len(latencies),
+        'requests': made,
+        'seconds': round(elapsed, 6),
+        'runs_per_second': round(len(latencies) / elapsed, 3),
+        'requests_per_second': round(made / elapsed, 3),
+        'latency_ms': {
+            'mean': round(float(milliseconds.mean()), 3),
+            'max': round(float(milliseconds.max()), 3),
+        },
+        'peak_memory_bytes': peak,
+    }
+    for percentile in PERCENTILES:
+        summary['latency_ms']['p{}'.format(percentile)] = round(
+            float(numpy.percentile(milliseconds, percentile)), 3
+        )
+    return summary
+
+
+def environment():
+    ''' Returns a description of the environment the benchmarks are run in. '''
+    try:
+        revision = subprocess.check_output(
+            ['git', 'rev-parse', 'HEAD'],
+            cwd=os.path.dirname(os.path.abspath(__file__)),
+            stderr=subprocess.DEVNULL,
+        ).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        revision = None
+
+    return {
+        'revision': revision,
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'machine': platform.machine(),
+        'sqlalchemy': sqlalchemy.__version__,
+        'sqlite': sqlite3.sqlite_version,
+        'numpy': numpy.__version__,
+    }
+
+
+def compare(baseline, results):
+    '''
+    Returns a table comparing the median latency, and peak memory, of each
+    benchmark with that of a baseline run.
+    '''
+    lines = [
+        '{:>16} {:>12} {:>12} {:>8} {:>12} {:>8}'.format(
+            'benchmark', 'p50 base', 'p50 now', 'change', 'peak MiB', 'change'
+        )
+    ]
+    for name, summary in sorted(results['benchmarks'].items()):
+        previous = baseline['benchmarks'].get(name)
+        if previous is None:
+            continue
+
+        def change(before, after):
+            if not before:
+                return 'n/a'
+            return '{:+.1%}'.format(after / float(before) - 1.0)
+
+        lines.append(
+            '{:>16} {:>12.3f} {:>12.3f} {:>8} {:>12.2f} {:>8}'.format(
+                name,
+                previous['latency_ms']['p50'],
+                summary['latency_ms']['p50'],
+                change(previous['latency_ms']['p50'], summary['latency_ms']['p50']),
+                summary['peak_memory_bytes'] / 1024.0 / 1024.0,
+                change(previous['peak_memory_bytes'], summary['peak_memory_bytes']),
+            )
+        )
+    return '\n'.join(lines)
+
+
+def main():
+    ''' Seeds a dataset, runs each benchmark against it, and reports as JSON. '''
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        '--sensors',
+        type=int,
+        default=10,
+        help='The number of sensors to seed',
+    )
+    parser.add_argument(
+        '--days',
+        type=float,
+        default=30,
+        help='The number of days of data to seed for each sensor',
+    )
+    parser.add_argument(
+        '--cadence',
+        type=float,
+        default=60,
+        help='The number of seconds between each seeded entry',
+    )
+    parser.add_argument(
+        '--seed',
+        type=int,
+        default=0,
+        help='The seed for generating sensor data values',
+    )
+    parser.add_argument(
+        '--requests',
+        type=int,
+        default=200,
+        help='The number of times to run each benchmark',
+    )
+    parser.add_argument(
+        '--memory-requests',
+        type=int,
+        default=5,
+        help='The number of times to run each benchmark with memory tracing',
+    )
+    parser.add_argument(
+        '--profile',
+        default=None,
+        help='The database engine profile to use, if any',
+    )
+    parser.add_argument(
+        '--output',
+        default=None,
+        help='The file to write results to, rather than standard output',
+    )
+    parser.add_argument(
+        '--baseline',
+        default=None,
+        help='The results of a previous run to compare with',
+    )
+    arguments = parser.parse_args()
+
+    directory = tempfile.mkdtemp()
+    try:
+        path = os.path.join(directory, 'benchmark.db')
+        application = initialize_all()
+        application.config.update(
+            DEBUG=False,
+            TESTING=False,
+            DATABASE_PROFILE=arguments.profile,
+            SQLALCHEMY_DATABASE_URI='sqlite:///{}'.format(path),
+        )
+
+        with application.app_context():
+            started = time.perf_counter()
+            entries = generate(
+                arguments.sensors,
+                arguments.days,
+                arguments.cadence,
+                arguments.seed,
+            )
+            seeded = time.perf_counter() - started
+            db.session.remove()
+
+        results = {
+            'version': RESULTS_VERSION,
+            'created': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S'),
+            'environment': environment(),
+            'parameters': {
+                'sensors': arguments.sensors,
+                'days': arguments.days,
+                'cadence': arguments.cadence,
+                'seed': arguments.seed,
+                'requests': arguments.requests,
+                'memory_requests': arguments.memory_requests,
+                'profile': arguments.profile,
+            },
+            'dataset': {
+                'entries': entries,
+                'seconds': round(seeded, 3),
+                'bytes': os.path.getsize(path),
+            },
+            'benchmarks': {},
+        }
+
+        # Each benchmark continues from where the last run left off, so that
+        # ingested entries are never duplicates of one another.
+        client = application.test_client()
+        for name, count, function in scenarios(arguments.sensors, arguments.requests):
+            latencies, elapsed, made = measure(client, count, function, 0)
+            peak = measure_memory(
+                client,
+                arguments.memory_requests,
+                function,
+                count + 1,
+            )
+            results['benchmarks'][name] = summarize(latencies, elapsed, made, peak)
+    finally:
+        shutil.rmtree(directory)
+
+    document = json.dumps(results, indent=2, sort_keys=True)
+    if arguments.output is None:
+        print(document)
+    else:
+        with open(arguments.output, 'w') as handle:
+            handle.write(document + '\n')
+
+    if arguments.baseline is not None:
+        with open(arguments.baseline) as handle:
+            print(compare(json.load(handle), results), file=sys.stderr)
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,120 @@
+"""Partition sensor data by month
+
+Revision ID: 1ccad6523e60
+Revises: 356ba2d23a83
+Create Date: 2026-10-18 19:12:40.118203
+
+"""
+import datetime
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '1ccad6523e60'
+down_revision = '356ba2d23a83'
+branch_labels = None
+depends_on = None
+
+# Define the number of months to create partitions ahead for.
+MONTHS_AHEAD = 3
+
+
+def _next_month(month):
+    ''' Returns the start of the month after the given month. '''
+    if month.month == 12:
+        return datetime.datetime(month.year + 1, 1, 1)
+    return datetime.datetime(month.year, month.month + 1, 1)
+
+
+def _create_table(name, partitioned):
+    ''' Creates a sensor data table, sharing the existing ID sequence. '''
+    op.execute(
+        'CREATE TABLE {} ('
+        "id INTEGER NOT NULL DEFAULT nextval('sensor_data_id_seq'), "
+        'value FLOAT NOT NULL, '
+        'sensor_id INTEGER NOT NULL REFERENCES sensor (id), '
+        'created TIMESTAMP WITHOUT TIME ZONE {}, '
+        'PRIMARY KEY ({})'
+        '){}'.format(
+            name,
+            'NOT NULL' if partitioned else 'NULL',
+            'id, created' if partitioned else 'id',
+            ' PARTITION BY RANGE (created)' if partitioned else '',
+        )
+    )
+    op.execute(
+        'CREATE INDEX sensor_id_created_idx ON {} (sensor_id, created)'.format(
+            name
+        )
+    )
+    op.execute('ALTER SEQUENCE sensor_data_id_seq OWNED BY {}.id'.format(name))
+
+
+def _rename_table(name):
+    ''' Moves the existing sensor data table, and its indexes, aside. '''
+    op.execute('ALTER TABLE sensor_data RENAME TO {}'.format(name))
+    op.execute(
+        'ALTER INDEX sensor_id_created_idx RENAME TO {}_created_idx'.format(name)
+    )
+    op.execute(
+        'ALTER TABLE {0} RENAME CONSTRAINT sensor_data_pkey TO {0}_pkey'.format(
+            name
+        )
+    )
+
+
+def upgrade():
+    # Only PostgreSQL (11 and newer) supports native partitioning. Elsewhere,
+    # sensor data remains in a single table.
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    _rename_table('sensor_data_unpartitioned')
+    _create_table('sensor_data', partitioned=True)
+
+    # Create a partition for every month with existing data, up to the months
+    # ahead. Entries without a creation time are treated as created now.
+    now = datetime.datetime.utcnow()
+    earliest = op.get_bind().execute(
+        sa.text('SELECT MIN(created) FROM sensor_data_unpartitioned')
+    ).scalar() or now
+
+    month = datetime.datetime(earliest.year, earliest.month, 1)
+    end = datetime.datetime(now.year, now.month, 1)
+    for _ in range(MONTHS_AHEAD):
+        end = _next_month(end)
+    while month <= end:
+        op.execute(
+            "CREATE TABLE sensor_data_y{:%Ym%m} PARTITION OF sensor_data "
+            "FOR VALUES FROM ('{:%Y-%m-%d}') TO ('{:%Y-%m-%d}')".format(
+                month,
+                month,
+                _next_month(month),
+            )
+        )
+        month = _next_month(month)
+
+    op.execute(
+        'INSERT INTO sensor_data (id, value, sensor_id, created) '
+        'SELECT id, value, sensor_id, '
+        "COALESCE(created, NOW() AT TIME ZONE 'utc') "
+        'FROM sensor_data_unpartitioned'
+    )
+    op.execute('DROP TABLE sensor_data_unpartitioned')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+
+    _rename_table('sensor_data_partitioned')
+    _create_table('sensor_data', partitioned=False)
+    op.execute(
+        'INSERT INTO sensor_data (id, value, sensor_id, created) '
+        'SELECT id, value, sensor_id, created FROM sensor_data_partitioned'
+    )
+
+    # Dropping the partitioned table also drops all of its partitions.
+    op.execute('DROP TABLE sensor_data_partitioned')
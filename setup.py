@@ -24,6 +24,12 @@ setup(
         'flask==0.12.2',
         'flask_migrate==2.1.1',
         'flask_sqlalchemy==2.3.2',
+        'numpy==1.14.2',
         'psycopg2==2.7.3.2',
-    ]
+    ],
+    extras_require={
+        'redis': [
+            'redis',
+        ],
+    }
 )
@@ -1,11 +1,14 @@
 ''' The Europa project. '''
 
+import os
 import sys
 import europa
 
-# Use a different configuration file, if specified.
-config_file = None
-if len(sys.argv) > 1:
+# Use a different configuration file, if specified. This may be provided as the
+# first argument, or via the EUROPA_CONFIG environment variable when loaded by
+# another tool - such as the Flask CLI.
+config_file = os.environ.get('EUROPA_CONFIG')
+if __name__ == '__main__' and len(sys.argv) > 1:
     config_file = sys.argv[1]
 
 # Load the configuration, if provided.
@@ -17,5 +20,17 @@ if __name__ == '__main__':
         from europa.models import db
         db.create_all()
 
-    # Let's go!
-    application.run(debug=False, host='0.0.0.0')
+        # Warm the latest sensor data cache, and rebuild the recent sensor data
+        # store, before accepting requests.
+        from europa import latest
+        from europa import recent
+        latest.cache().warm()
+        recent.store().warm()
+
+        # Ensure sensor data can be stored for the coming months.
+        from europa import partitions
+        partitions.manager().create_ahead()
+
+    # Let's go! Requests are handled in threads, so that clients streaming data
+    # do not block other requests.
+    application.run(debug=False, host='0.0.0.0', threaded=True)
@@ -11,6 +11,16 @@ from flask_sqlalchemy import SQLAlchemy
 from europa import ui
 from europa import api
 from europa import models
+from europa import alerts
+from europa import blocks
+from europa import engines
+from europa import latest
+from europa import recent
+from europa import stream
+from europa import partitions
+from europa import metadata
+from europa import compression
+from europa import commands
 
 
 def initialize_all(config_file=None):
@@ -37,8 +47,35 @@ def initialize_all(config_file=None):
     else:
         application.config.from_pyfile(config_file)
 
-    # Setup the database, and the migrations library.
+    # Setup the database, with the configured engine profile, and the
+    # migrations library.
+    engines.init_app(application)
     models.db.init_app(application)
     Migrate(application, models.db)
 
+    # Setup the process-local latest sensor data cache, and alert evaluator.
+    latest.init_app(application)
+    alerts.init_app(application)
+
+    # Setup the store of recent sensor data, shared between processes.
+    recent.init_app(application)
+
+    # Setup the process-local broker for streaming new sensor data.
+    stream.init_app(application)
+
+    # Configure the storage engine for sensor data.
+    blocks.init_app(application)
+
+    # Setup management of sensor data partitions, where supported.
+    partitions.init_app(application)
+
+    # Setup the process-local, or shared, metadata response cache.
+    metadata.init_app(application)
+
+    # Compress large responses for clients which accept it.
+    compression.init_app(application)
+
+    # Register command line interface commands.
+    commands.register(application)
+
     return application
@@ -0,0 +1,326 @@
+''' Implements evaluation of sensor data alert rules for Europa. '''
+
+import math
+import time
+import datetime
+import threading
+
+import sqlalchemy
+
+from flask import current_app
+
+from europa import latest
+
+from europa.models import db
+from europa.models import Sensor
+from europa.models import AlertKind
+from europa.models import AlertRule
+from europa.models import AlertEvent
+from europa.models import AlertState
+
+# Define the key under which the evaluator is registered with the application.
+EXTENSION_NAME = 'europa.alerts'
+
+# Define the number of readings required before a deviation rule may alert, so
+# that the moving average and variance have settled.
+DEVIATION_WARMUP = 10
+
+# Define the default number of seconds for which rules are used before being
+# reloaded, so that changes made via other processes are seen.
+DEFAULT_RULES_TTL = 30
+
+
+class State(object):
+    ''' Tracks the state of a single rule for a single sensor. '''
+
+    __slots__ = ['active', 'created', 'value', 'mean', 'variance', 'samples']
+
+    def __init__(self, active=False):
+        self.active = active
+        self.created = None
+        self.value = None
+        self.mean = None
+        self.variance = 0.0
+        self.samples = 0
+
+
+def _threshold(rule, state, created, value):
+    ''' Returns whether the value is outside of the rule's bounds. '''
+    return (
+        (rule.minimum is not None and value < rule.minimum) or
+        (rule.maximum is not None and value > rule.maximum)
+    )
+
+
+def _rate(rule, state, created, value):
+    ''' Returns whether the value changed faster than the rule's limit. '''
+    if state.created is None:
+        return False
+
+    minutes = (created - state.created).total_seconds() / 60.0
+    return abs(value - state.value) / minutes > rule.limit
+
+
+def _deviation(rule, state, created, value):
+    '''
+    Returns whether the value deviates from the exponentially weighted moving
+    average of previous values by more than the rule's limit, and then folds
+    the value into the average and variance.
+    '''
+    if state.mean is None:
+        state.mean = value
+        state.samples = 1
+        return False
+
+    difference = value - state.mean
+    deviating = (
+        state.samples >= DEVIATION_WARMUP and
+        abs(difference) > rule.limit * math.sqrt(state.variance)
+    )
+
+    increment = rule.alpha * difference
+    state.mean += increment
+    state.variance = (1 - rule.alpha) * (state.variance + difference * increment)
+    state.samples += 1
+    return deviating
+
+
+# Map each kind of rule which is evaluated on ingest to its evaluation. Stale
+# rules are evaluated periodically instead, as they alert on an absence of data.
+EVALUATORS = {
+    AlertKind.THRESHOLD: _threshold,
+    AlertKind.RATE: _rate,
+    AlertKind.DEVIATION: _deviation,
+}
+
+
+def _applicable(rules, sensors):
+    '''
+    Returns the given rules which apply to each of the given sensors, keyed by
+    sensor ID. The sensors are a mapping of sensor ID to category ID.
+    '''
+    applicable = dict((sensor_id, []) for sensor_id in sensors)
+    for rule in rules:
+        for sensor_id, category_id in sensors.items():
+            if (
+                (rule.sensor_id is None or rule.sensor_id == sensor_id) and
+                (rule.category_id is None or rule.category_id == category_id)
+            ):
+                applicable[sensor_id].append(rule)
+    return applicable
+
+
+def _active(kinds):
+    '''
+    Returns the set of (rule ID, sensor ID) pairs for rules of the given kinds
+    which are currently alerting, according to the most recent event for each.
+    '''
+    recent = db.session.query(
+        sqlalchemy.func.max(AlertEvent.id),
+    ).join(
+        AlertRule,
+        AlertRule.id == AlertEvent.rule_id,
+    ).filter(
+        AlertRule.kind.in_(kinds),
+    ).group_by(
+        AlertEvent.rule_id,
+        AlertEvent.sensor_id,
+    )
+
+    return set(
+        (candidate.rule_id, candidate.sensor_id)
+        for candidate in db.session.query(
+            AlertEvent.rule_id,
+            AlertEvent.sensor_id,
+        ).filter(
+            AlertEvent.id.in_(recent),
+            AlertEvent.state == AlertState.ALERTING,
+        ).all()
+    )
+
+
+def _load(kinds):
+    ''' Returns all active rules of the given kinds, keyed by sensor ID. '''
+    rules = AlertRule.query.filter(
+        AlertRule.deleted == None,
+        AlertRule.kind.in_(kinds),
+    ).order_by(AlertRule.id).all()
+
+    # Ensure rules can be used outside of the session they were loaded in.
+    for rule in rules:
+        db.session.expunge(rule)
+
+    sensors = dict(
+        db.session.query(Sensor.id, Sensor.category_id).filter(
+            Sensor.deleted == None,
+        ).all()
+    )
+    return _applicable(rules, sensors)
+
+
+class AlertEvaluator(object):
+    '''
+    Evaluates alert rules against sensor data as it is stored, keeping the
+    state of each rule for each sensor in memory - so that each reading is
+    evaluated in constant time, without reading any previous data. Rules are
+    loaded on first use, and reloaded whenever rules or sensors change in this
+    process, or once older than the given TTL - as they may have been changed
+    via another process.
+    '''
+
+    def __init__(self, ttl=DEFAULT_RULES_TTL):
+        self.lock = threading.Lock()
+        self.ttl = ttl
+        self.rules = None
+        self.loaded = None
+        self.states = {}
+
+    def warm(self):
+        '''
+        Loads all rules, and whether each is alerting, from the database.
+        Returns the rules which apply to each sensor, keyed by sensor ID.
+        '''
+        rules = _load(list(EVALUATORS))
+        active = _active(list(EVALUATORS))
+
+        with self.lock:
+            self.rules = rules
+            self.loaded = time.monotonic()
+
+            # Keep the state of existing rules, so that averages and previous
+            # values are not lost when rules are reloaded.
+            states = {}
+            for sensor_id, candidates in rules.items():
+                for rule in candidates:
+                    key = (rule.id, sensor_id)
+                    states[key] = self.states.get(key, State(key in active))
+            self.states = states
+        return rules
+
+    def invalidate(self):
+        ''' Ensures that rules are reloaded before the next evaluation. '''
+        with self.lock:
+            self.rules = None
+
+    def evaluate(self, entries):
+        '''
+        Evaluates all applicable rules against the given, committed, sensor
+        data mappings - recording an event for each rule which starts or stops
+        alerting. Readings older than the last reading evaluated for a sensor
+        are skipped, as they no longer reflect its state.
+        '''
+        rules = self.rules
+        if rules is None or time.monotonic() - self.loaded >= self.ttl:
+            rules = self.warm()
+
+        events = []
+        with self.lock:
+            for entry in sorted(entries, key=lambda entry: entry['created']):
+                sensor_id = entry['sensor_id']
+                created = entry['created']
+                value = entry['value']
+
+                for rule in rules.get(sensor_id, []):
+                    state = self.states.setdefault((rule.id, sensor_id), State())
+                    if state.created is not None and created <= state.created:
+                        continue
+
+                    alerting = EVALUATORS[rule.kind](rule, state, created, value)
+                    state.created = created
+                    state.value = value
+
+                    if alerting != state.active:
+                        state.active = alerting
+                        events.append(
+                            AlertEvent(
+                                rule_id=rule.id,
+                                sensor_id=sensor_id,
+                                state=(
+                                    AlertState.ALERTING if alerting
+                                    else AlertState.RESOLVED
+                                ),
+                                value=value,
+                                created=created,
+                            )
+                        )
+
+        if not events:
+            return events
+
+        # As each process has its own state, another process may have already
+        # recorded the same change. Only record changes from the state of each
+        # rule according to the events recorded so far.
+        active = _active(list(EVALUATORS))
+        recorded = []
+        for event in events:
+            key = (event.rule_id, event.sensor_id)
+            alerting = event.state == AlertState.ALERTING
+            if alerting == (key in active):
+                continue
+            if alerting:
+                active.add(key)
+            else:
+                active.discard(key)
+            recorded.append(event)
+
+        # The sensor data is already stored, so failing to record events must
+        # not fail the request which stored it.
+        try:
+            db.session.add_all(recorded)
+            db.session.commit()
+        except sqlalchemy.exc.SQLAlchemyError:
+            db.session.rollback()
+            current_app.logger.exception('Unable to record alert events')
+            return []
+        return recorded
+
+
+def check(now=None):
+    '''
+    Evaluates all stale rules against the time that data was last received for
+    each sensor, recording an event for each rule which starts or stops
+    alerting. Returns the events recorded.
+    '''
+    if now is None:
+        now = datetime.datetime.utcnow()
+
+    active = _active([AlertKind.STALE])
+    events = []
+    for sensor_id, rules in _load([AlertKind.STALE]).items():
+        entry = latest.cache().get(sensor_id)
+        for rule in rules:
+            cutoff = now - datetime.timedelta(minutes=rule.minutes)
+            alerting = entry is None or entry[0] < cutoff
+            if alerting == ((rule.id, sensor_id) in active):
+                continue
+
+            events.append(
+                AlertEvent(
+                    rule_id=rule.id,
+                    sensor_id=sensor_id,
+                    state=(
+                        AlertState.ALERTING if alerting
+                        else AlertState.RESOLVED
+                    ),
+                    value=entry[1] if entry else None,
+                    created=now,
+                )
+            )
+
+    if events:
+        db.session.add_all(events)
+        db.session.commit()
+    return events
+
+
+def init_app(application):
+    ''' Registers a new alert rule evaluator with the given application. '''
+    application.config.setdefault('ALERT_RULES_TTL', DEFAULT_RULES_TTL)
+    application.extensions[EXTENSION_NAME] = AlertEvaluator(
+        ttl=application.config['ALERT_RULES_TTL'],
+    )
+
+
+def evaluator():
+    ''' Returns the alert rule evaluator for the current application. '''
+    return current_app.extensions[EXTENSION_NAME]
@@ -7,4 +7,7 @@ router = Blueprint(__name__, __name__)
 
 from europa.api.v1 import decorators
 from europa.api.v1 import exceptions
+from europa.api.v1 import formats
+from europa.api.v1 import parameters
+from europa.api.v1 import validators
 from europa.api.v1 import endpoints
@@ -4,8 +4,16 @@ from functools import wraps
 
 from flask import g
 from flask import request
+from flask import Response
+from flask import make_response
+
+from europa import metadata
+
+from europa.models import to_datetime
+from europa.models import from_datetime
 
 from europa.api.v1 import exceptions    
+from europa.api.v1 import validators
 
 
 def validated(fields=None, optional=False):
@@ -41,3 +49,120 @@ def validated(fields=None, optional=False):
         # Decorators with arguments must return a function to be invoked.
         return decorated_function
     return decorator
+
+
+def validated_batch(limit=None):
+    '''
+    Validate the request contains a JSON document which is a list of entries,
+    and that the number of entries does not exceed the given limit. Individual
+    entries are left to the endpoint to validate, so that a single bad entry
+    does not cause the entire batch to be rejected.
+    '''
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            document = request.get_json()
+            if document is None:
+                raise exceptions.InvalidClientRequest('No JSON provided')
+
+            # Ensure that the document is a list, and is not too large.
+            if not isinstance(document, list):
+                raise exceptions.InvalidClientRequest('A list must be provided')
+            if limit is not None and len(document) > limit:
+                raise exceptions.InvalidClientRequest(
+                    'No more than {} entries may be provided'.format(limit)
+                )
+            return func(*args, **kwargs)
+
+        # Decorators with arguments must return a function to be invoked.
+        return decorated_function
+    return decorator
+
+
+def streamed(mimetype):
+    '''
+    Validate the request body is of the given type. The body is not read, so
+    that the endpoint is able to consume it from the request stream.
+    '''
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            if request.mimetype != mimetype:
+                raise exceptions.InvalidClientRequest(
+                    "Content-Type must be '{}'".format(mimetype)
+                )
+            return func(*args, **kwargs)
+
+        # Decorators with arguments must return a function to be invoked.
+        return decorated_function
+    return decorator
+
+
+def conditional(*models):
+    '''
+    Allow the client to conditionally retrieve a resource built from the rows of
+    the given models. If the client already holds the current version, an HTTP
+    304 is returned without calling the endpoint.
+    '''
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            validators.evaluate(*validators.version_of(*models))
+            return func(*args, **kwargs)
+
+        # Decorators with arguments must return a function to be invoked.
+        return decorated_function
+    return decorator
+
+
+def _pack(etag, modified, body):
+    ''' Packs the validators of a response with its body, for caching. '''
+    return b'\n'.join([
+        (etag or '').encode(),
+        (from_datetime(modified) or '').encode(),
+        body,
+    ])
+
+
+def _unpack(value):
+    ''' Unpacks the validators, and body, of a cached response. '''
+    etag, modified, body = value.split(b'\n', 2)
+    return etag.decode() or None, to_datetime(modified.decode()), body
+
+
+def cached(*namespaces):
+    '''
+    Serve the response from the metadata cache, if present. If not, call the
+    endpoint and cache its response, if successful, in the given namespaces.
+    The validators of the response are cached with it, so that conditional
+    requests are also served from the cache - and so this must be applied
+    outside of 'conditional'.
+    '''
+    def decorator(func):
+        @wraps(func)
+        def decorated_function(*args, **kwargs):
+            # Take the key before building the response, so that a response
+            # invalidated meanwhile is stored in a generation no longer read.
+            key = metadata.cache().key(namespaces, request.full_path)
+            value = metadata.cache().fetch(key)
+            if value is not None:
+                etag, modified, body = _unpack(value)
+                if etag is not None:
+                    validators.validate(etag, modified)
+                return Response(body, mimetype='application/json')
+
+            response = make_response(func(*args, **kwargs))
+            if response.status_code == 200:
+                metadata.cache().store(
+                    key,
+                    _pack(
+                        g.get('etag'),
+                        g.get('last_modified'),
+                        response.get_data(),
+                    ),
+                )
+            return response
+
+        # Decorators with arguments must return a function to be invoked.
+        return decorated_function
+    return decorator
@@ -5,3 +5,6 @@ from europa.api.v1.endpoints import plant
 from europa.api.v1.endpoints import sensor
 from europa.api.v1.endpoints import sensor_data
 from europa.api.v1.endpoints import sensor_category
+from europa.api.v1.endpoints import retention_policy
+from europa.api.v1.endpoints import cache
+from europa.api.v1.endpoints import alert
@@ -0,0 +1,242 @@
+''' Version 1 Alert endpoints of the Europa project API. '''
+
+import datetime
+import sqlalchemy
+
+from flask import g
+from flask import jsonify
+from flask import request
+
+from europa import alerts
+
+from europa.models import db
+from europa.models import Sensor
+from europa.models import AlertKind
+from europa.models import AlertRule
+from europa.models import AlertEvent
+from europa.models import SensorCategory
+
+from europa.api.v1 import decorators
+from europa.api.v1 import exceptions
+from europa.api.v1 import parameters
+
+from europa.api.v1 import router
+
+# Define the fields which configure a rule, and those required by each kind.
+RULE_FIELDS = ['minimum', 'maximum', 'limit', 'alpha', 'minutes']
+REQUIRED_FIELDS = {
+    AlertKind.THRESHOLD: [],
+    AlertKind.RATE: ['limit'],
+    AlertKind.DEVIATION: ['limit', 'alpha'],
+    AlertKind.STALE: ['minutes'],
+}
+
+# Define the maximum number of events which may be retrieved at once.
+MAXIMUM_EVENTS = 1000
+
+
+def _apply_alert_rule(candidate, document):
+    ''' Validates and maps all provided fields onto the given rule. '''
+    if document.get('sensor') and document.get('category'):
+        raise exceptions.InvalidClientRequest(
+            'Only one of sensor or category may be provided'
+        )
+
+    if 'kind' in document:
+        try:
+            candidate.kind = AlertKind(document.get('kind'))
+        except ValueError:
+            raise exceptions.InvalidClientRequest(
+                "'kind' must be one of {}".format(
+                    ', '.join(kind.value for kind in AlertKind)
+                )
+            )
+
+    for field in RULE_FIELDS:
+        if field not in document:
+            continue
+
+        # Fields are either a number, or null if unused.
+        number = document.get(field)
+        if number is not None and type(number) not in (int, float):
+            raise exceptions.InvalidClientRequest(
+                "'{}' must be a number, or null".format(field)
+            )
+        setattr(candidate, field, number)
+
+    # Ensure the fields required by the kind of rule are present and sensible.
+    for field in REQUIRED_FIELDS[candidate.kind]:
+        if getattr(candidate, field) is None:
+            raise exceptions.InvalidClientRequest(
+                "'{}' is required for {} rules".format(field, candidate.kind.value)
+            )
+    if candidate.kind == AlertKind.THRESHOLD and (
+        candidate.minimum is None and candidate.maximum is None
+    ):
+        raise exceptions.InvalidClientRequest(
+            "'minimum' or 'maximum' is required for threshold rules"
+        )
+    if candidate.limit is not None and candidate.limit <= 0:
+        raise exceptions.InvalidClientRequest("'limit' must be positive")
+    if candidate.alpha is not None and not 0 < candidate.alpha <= 1:
+        raise exceptions.InvalidClientRequest("'alpha' must be within (0, 1]")
+    if candidate.minutes is not None and (
+        type(candidate.minutes) != int or candidate.minutes < 1
+    ):
+        raise exceptions.InvalidClientRequest("'minutes' must be a positive integer")
+
+    # Ensure the provided sensor exists, or 404.
+    if document.get('sensor'):
+        _ = Sensor.query.filter(
+            Sensor.id == document.get('sensor'),
+        ).first_or_404()
+        candidate.sensor_id = document.get('sensor')
+        candidate.category_id = None
+
+    # Ensure the provided category exists, or 404.
+    if document.get('category'):
+        _ = SensorCategory.query.filter(
+            SensorCategory.id == document.get('category'),
+        ).first_or_404()
+        candidate.category_id = document.get('category')
+        candidate.sensor_id = None
+
+
+@router.route('/alert/rule', methods=['POST'])
+@decorators.validated(fields=['kind'])
+@decorators.validated(
+    fields=['sensor', 'category', 'kind'] + RULE_FIELDS,
+    optional=True,
+)
+def create_alert_rule():
+    ''' Attempt to create an alert rule. '''
+    document = request.get_json()
+
+    # Create a new alert rule from the provided payload.
+    candidate = AlertRule()
+    _apply_alert_rule(candidate, document)
+    db.session.add(candidate)
+
+    try:
+        db.session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        raise exceptions.InternalServerError('Unable to create alert rule')
+
+    # Ensure the new rule is evaluated against new data.
+    alerts.evaluator().invalidate()
+
+    # Return the newly created alert rule to the user.
+    response = jsonify(candidate.for_json())
+    response.status_code = 201
+    return response
+
+
+@router.route('/alert/rules', methods=['GET'])
+def retrieve_alert_rules():
+    ''' Attempt to retrieve all alert rules. '''
+    candidates = AlertRule.query.filter(
+        AlertRule.deleted == None,
+    ).order_by(AlertRule.id).all()
+
+    # Construct a JSON friendly response.
+    rules = [candidate.for_json() for candidate in candidates]
+    return jsonify(rules)
+
+
+@router.route('/alert/rule/<int:alert_rule_id>', methods=['GET'])
+def retrieve_alert_rule(alert_rule_id):
+    ''' Attempt to retrieve a given alert rule. '''
+    candidate = AlertRule.query.filter(
+        AlertRule.id == alert_rule_id,
+    ).first_or_404()
+
+    # Return the given alert rule to the user.
+    response = jsonify(candidate.for_json())
+    response.status_code = 200
+    return response
+
+
+@router.route('/alert/rule/<int:alert_rule_id>', methods=['PUT'])
+@decorators.validated(
+    fields=['sensor', 'category', 'kind'] + RULE_FIELDS,
+    optional=True,
+)
+def update_alert_rule(alert_rule_id):
+    ''' Attempt to update a given alert rule. '''
+    candidate = AlertRule.query.filter(
+        AlertRule.id == alert_rule_id,
+    ).first_or_404()
+
+    # Map in all fields that can be modified.
+    document = request.get_json()
+    _apply_alert_rule(candidate, document)
+
+    try:
+        db.session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        raise exceptions.InternalServerError('Unable to update alert rule')
+
+    # Ensure the updated rule is evaluated against new data.
+    alerts.evaluator().invalidate()
+
+    # Confirm update with an HTTP 204.
+    response = jsonify()
+    response.status_code = 204
+    return response
+
+
+@router.route('/alert/rule/<int:alert_rule_id>', methods=['DELETE'])
+def delete_alert_rule(alert_rule_id):
+    ''' Attempt to delete a given alert rule. '''
+    candidate = AlertRule.query.filter(
+        AlertRule.id == alert_rule_id,
+        AlertRule.deleted == None,
+    ).first_or_404()
+
+    # Mark deleted.
+    candidate.deleted = datetime.datetime.utcnow()
+
+    try:
+        db.session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        raise exceptions.InternalServerError('Unable to delete alert rule')
+
+    # Ensure the deleted rule is no longer evaluated.
+    alerts.evaluator().invalidate()
+
+    # Confirm deletion with an HTTP 204.
+    response = jsonify()
+    response.status_code = 204
+    return response
+
+
+@router.route('/alert/events', methods=['GET'])
+def retrieve_alert_events():
+    '''
+    Attempt to retrieve the most recent alert events - each recording a rule
+    starting, or stopping, alerting for a sensor. Events may be limited to a
+    given 'sensor' or 'rule', and to those after 'since'.
+    '''
+    since = parameters.get_datetime('since')
+    sensor_id = parameters.get_integer('sensor')
+    rule_id = parameters.get_integer('rule')
+    limit = parameters.get_integer(
+        'limit',
+        default=MAXIMUM_EVENTS,
+        minimum=1,
+        maximum=MAXIMUM_EVENTS,
+    )
+
+    query = AlertEvent.query
+    if since is not None:
+        query = query.filter(AlertEvent.created >= since)
+    if sensor_id is not None:
+        query = query.filter(AlertEvent.sensor_id == sensor_id)
+    if rule_id is not None:
+        query = query.filter(AlertEvent.rule_id == rule_id)
+
+    candidates = query.order_by(AlertEvent.id.desc()).limit(limit).all()
+
+    # Construct a JSON friendly response.
+    events = [candidate.for_json() for candidate in candidates]
+    return jsonify(events)
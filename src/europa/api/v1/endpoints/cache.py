@@ -0,0 +1,13 @@
+''' Version 1 Cache endpoints of the Europa project API. '''
+
+from flask import jsonify
+
+from europa import metadata
+
+from europa.api.v1 import router
+
+
+@router.route('/cache/metadata', methods=['GET'])
+def retrieve_metadata_cache():
+    ''' Attempt to retrieve the counters of the metadata response cache. '''
+    return jsonify(metadata.cache().stats())
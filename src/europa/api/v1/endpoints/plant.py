@@ -7,6 +7,8 @@ from flask import g
 from flask import jsonify
 from flask import request
 
+from europa import metadata
+
 from europa.models import db
 from europa.models import Plant
 from europa.models import Vessel
@@ -41,6 +43,9 @@ def create_plant():
     except sqlalchemy.exc.IntegrityError:
         raise exceptions.InternalServerError('Unable to create plant')
 
+    # Stop serving cached responses which include this plant.
+    metadata.cache().invalidate(metadata.PLANTS)
+
     # Return the newly created vessel to the user.
     # TODO: Perhaps reference the account in the HTTP 'Location' header, rather
     #       than returning a body on the HTTP 201?
@@ -50,9 +55,14 @@ def create_plant():
 
 
 @router.route('/plants', methods=['GET'])
+@decorators.cached(metadata.PLANTS, metadata.VESSELS)
+@decorators.conditional(Plant, Vessel)
 def retrieve_plants():
     ''' Attempt to retrive plants the user is authorised to access. '''
-    candidates = Plant.query.filter(
+    # Load each vessel with its plant, rather than with a query per plant.
+    candidates = Plant.query.options(
+        db.joinedload(Plant.vessel),
+    ).filter(
         Plant.deleted == None,
     ).order_by(Plant.id).all()
 
@@ -62,9 +72,13 @@ def retrieve_plants():
 
 
 @router.route('/plant/<int:plant_id>', methods=['GET'])
+@decorators.cached(metadata.PLANTS, metadata.VESSELS)
+@decorators.conditional(Plant, Vessel)
 def retrieve_plant(plant_id):
     ''' Attempt to retrieve a given plant. '''
-    candidate = Plant.query.filter(
+    candidate = Plant.query.options(
+        db.joinedload(Plant.vessel),
+    ).filter(
         Plant.id == plant_id,
     ).first_or_404()
 
@@ -101,6 +115,9 @@ def update_plant(plant_id):
     except sqlalchemy.exc.IntegrityError:
         raise exceptions.InternalServerError('Unable to update plant')
 
+    # Stop serving cached responses which include this plant.
+    metadata.cache().invalidate(metadata.PLANTS)
+
     # Confirm update with an HTTP 204.
     response = jsonify()
     response.status_code = 204
@@ -123,6 +140,9 @@ def delete_plant(plant_id):
     except sqlalchemy.exc.IntegrityError:
         raise exceptions.InternalServerError('Unable to delete plant')
 
+    # Stop serving cached responses which include this plant.
+    metadata.cache().invalidate(metadata.PLANTS)
+
     # Confirm deletion with an HTTP 204.
     response = jsonify()
     response.status_code = 204
@@ -0,0 +1,157 @@
+''' Version 1 Retention Policy endpoints of the Europa project API. '''
+
+import datetime
+import sqlalchemy
+
+from flask import g
+from flask import jsonify
+from flask import request
+
+from europa.models import db
+from europa.models import Sensor
+from europa.models import SensorCategory
+from europa.models import RetentionPolicy
+
+from europa.api.v1 import decorators
+from europa.api.v1 import exceptions
+
+from europa.api.v1 import router
+
+# Define the fields which hold the number of days to retain data for.
+RETENTION_FIELDS = ['raw', 'minutely', 'hourly', 'daily']
+
+
+def _apply_retention_policy(candidate, document):
+    ''' Validates and maps all provided fields onto the given policy. '''
+    if document.get('sensor') and document.get('category'):
+        raise exceptions.InvalidClientRequest(
+            'Only one of sensor or category may be provided'
+        )
+
+    for field in RETENTION_FIELDS:
+        if field not in document:
+            continue
+
+        # Retention is either a number of days, or null to retain forever.
+        days = document.get(field)
+        if days is not None and (type(days) != int or days < 0):
+            raise exceptions.InvalidClientRequest(
+                "'{}' must be a non-negative integer, or null".format(field)
+            )
+        setattr(candidate, field, days)
+
+    # Ensure the provided sensor exists, or 404.
+    if document.get('sensor'):
+        _ = Sensor.query.filter(
+            Sensor.id == document.get('sensor'),
+        ).first_or_404()
+        candidate.sensor_id = document.get('sensor')
+        candidate.category_id = None
+
+    # Ensure the provided category exists, or 404.
+    if document.get('category'):
+        _ = SensorCategory.query.filter(
+            SensorCategory.id == document.get('category'),
+        ).first_or_404()
+        candidate.category_id = document.get('category')
+        candidate.sensor_id = None
+
+
+@router.route('/retention/policy', methods=['POST'])
+@decorators.validated(
+    fields=['sensor', 'category'] + RETENTION_FIELDS,
+    optional=True,
+)
+def create_retention_policy():
+    ''' Attempt to create a retention policy. '''
+    document = request.get_json()
+
+    # Create a new retention policy from the provided payload.
+    candidate = RetentionPolicy()
+    _apply_retention_policy(candidate, document)
+    db.session.add(candidate)
+
+    try:
+        db.session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        raise exceptions.InternalServerError('Unable to create retention policy')
+
+    # Return the newly created retention policy to the user.
+    response = jsonify(candidate.for_json())
+    response.status_code = 201
+    return response
+
+
+@router.route('/retention/policies', methods=['GET'])
+@decorators.conditional(RetentionPolicy)
+def retrieve_retention_policies():
+    ''' Attempt to retrieve all retention policies. '''
+    candidates = RetentionPolicy.query.filter(
+        RetentionPolicy.deleted == None,
+    ).order_by(RetentionPolicy.id).all()
+
+    # Construct a JSON friendly response.
+    policies = [candidate.for_json() for candidate in candidates]
+    return jsonify(policies)
+
+
+@router.route('/retention/policy/<int:retention_policy_id>', methods=['GET'])
+@decorators.conditional(RetentionPolicy)
+def retrieve_retention_policy(retention_policy_id):
+    ''' Attempt to retrieve a given retention policy. '''
+    candidate = RetentionPolicy.query.filter(
+        RetentionPolicy.id == retention_policy_id,
+    ).first_or_404()
+
+    # Return the given retention policy to the user.
+    response = jsonify(candidate.for_json())
+    response.status_code = 200
+    return response
+
+
+@router.route('/retention/policy/<int:retention_policy_id>', methods=['PUT'])
+@decorators.validated(
+    fields=['sensor', 'category'] + RETENTION_FIELDS,
+    optional=True,
+)
+def update_retention_policy(retention_policy_id):
+    ''' Attempt to update a given retention policy. '''
+    candidate = RetentionPolicy.query.filter(
+        RetentionPolicy.id == retention_policy_id,
+    ).first_or_404()
+
+    # Map in all fields that can be modified.
+    document = request.get_json()
+    _apply_retention_policy(candidate, document)
+
+    try:
+        db.session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        raise exceptions.InternalServerError('Unable to update retention policy')
+
+    # Confirm update with an HTTP 204.
+    response = jsonify()
+    response.status_code = 204
+    return response
+
+
+@router.route('/retention/policy/<int:retention_policy_id>', methods=['DELETE'])
+def delete_retention_policy(retention_policy_id):
+    ''' Attempt to delete a given retention policy. '''
+    candidate = RetentionPolicy.query.filter(
+        RetentionPolicy.id == retention_policy_id,
+        RetentionPolicy.deleted == None,
+    ).first_or_404()
+
+    # Mark deleted.
+    candidate.deleted = datetime.datetime.utcnow()
+
+    try:
+        db.session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        raise exceptions.InternalServerError('Unable to delete retention policy')
+
+    # Confirm deletion with an HTTP 204.
+    response = jsonify()
+    response.status_code = 204
+    return response
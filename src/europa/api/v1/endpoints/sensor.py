@@ -7,6 +7,11 @@ from flask import g
 from flask import jsonify
 from flask import request
 
+from europa import alerts
+from europa import latest
+from europa import recent
+from europa import metadata
+
 from europa.models import db
 from europa.models import Plant
 from europa.models import Vessel
@@ -49,6 +54,11 @@ def create_sensor():
     except sqlalchemy.exc.IntegrityError:
         raise exceptions.InternalServerError('Unable to create sensor')
 
+    # Stop serving cached responses which include this sensor, and ensure the
+    # alert rules which apply to it are reloaded.
+    metadata.cache().invalidate(metadata.SENSORS)
+    alerts.evaluator().invalidate()
+
     # Return the newly created vessel to the user.
     # TODO: Perhaps reference the account in the HTTP 'Location' header, rather
     #       than returning a body on the HTTP 201?
@@ -58,9 +68,16 @@ def create_sensor():
 
 
 @router.route('/sensors', methods=['GET'])
+@decorators.cached(metadata.SENSORS, metadata.VESSELS, metadata.CATEGORIES)
+@decorators.conditional(Sensor, SensorCategory, Vessel)
 def retrieve_sensors():
     ''' Attempt to retrive sensors the user is authorised to access. '''
-    candidates = Sensor.query.filter(
+    # Load each vessel and category with its sensor, rather than with queries
+    # per sensor.
+    candidates = Sensor.query.options(
+        db.joinedload(Sensor.vessel),
+        db.joinedload(Sensor.category),
+    ).filter(
         Sensor.deleted == None,
     ).order_by(Sensor.id).all()
 
@@ -70,9 +87,14 @@ def retrieve_sensors():
 
 
 @router.route('/sensor/<int:sensor_id>', methods=['GET'])
+@decorators.cached(metadata.SENSORS, metadata.VESSELS, metadata.CATEGORIES)
+@decorators.conditional(Sensor, SensorCategory, Vessel)
 def retrieve_sensor(sensor_id):
     ''' Attempt to retrieve a given sensor. '''
-    candidate = Sensor.query.filter(
+    candidate = Sensor.query.options(
+        db.joinedload(Sensor.vessel),
+        db.joinedload(Sensor.category),
+    ).filter(
         Sensor.id == sensor_id,
     ).first_or_404()
 
@@ -114,6 +136,11 @@ def update_sensor(sensor_id):
     except sqlalchemy.exc.IntegrityError:
         raise exceptions.InternalServerError('Unable to update sensor')
 
+    # Stop serving cached responses which include this sensor, and ensure the
+    # alert rules which apply to it are reloaded.
+    metadata.cache().invalidate(metadata.SENSORS)
+    alerts.evaluator().invalidate()
+
     # Confirm update with an HTTP 204.
     response = jsonify()
     response.status_code = 204
@@ -136,6 +163,15 @@ def delete_sensor(sensor_id):
     except sqlalchemy.exc.IntegrityError:
         raise exceptions.InternalServerError('Unable to delete sensor')
 
+    # Stop serving cached responses which include this sensor, and ensure the
+    # alert rules which apply to it are reloaded.
+    metadata.cache().invalidate(metadata.SENSORS)
+    alerts.evaluator().invalidate()
+
+    # Ensure the latest, and recent, data for the sensor is no longer served.
+    latest.cache().discard(sensor_id)
+    recent.store().discard(sensor_id)
+
     # Confirm deletion with an HTTP 204.
     response = jsonify()
     response.status_code = 204
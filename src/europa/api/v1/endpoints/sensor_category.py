@@ -7,6 +7,8 @@ from flask import g
 from flask import jsonify
 from flask import request
 
+from europa import metadata
+
 from europa.models import db
 from europa.models import SensorCategory
 
@@ -34,6 +36,9 @@ def create_sensor_category():
     except sqlalchemy.exc.IntegrityError:
         raise exceptions.InternalServerError('Unable to create sensor category')
 
+    # Stop serving cached responses which include this sensor category.
+    metadata.cache().invalidate(metadata.CATEGORIES)
+
     # Return the newly created sensor category to the user.
     # TODO: Perhaps reference the account in the HTTP 'Location' header, rather
     #       than returning a body on the HTTP 201?
@@ -43,6 +48,8 @@ def create_sensor_category():
 
 
 @router.route('/sensor/categories', methods=['GET'])
+@decorators.cached(metadata.CATEGORIES)
+@decorators.conditional(SensorCategory)
 def retrieve_sensor_categories():
     ''' Attempt to retrive sensor cagegories the user can access. '''
     candidates = SensorCategory.query.filter(
@@ -55,6 +62,8 @@ def retrieve_sensor_categories():
 
 
 @router.route('/sensor/category/<int:sensor_category_id>', methods=['GET'])
+@decorators.cached(metadata.CATEGORIES)
+@decorators.conditional(SensorCategory)
 def retrieve_sensor_category(sensor_category_id):
     ''' Attempt to retrieve a given sensor category. '''
     candidate = SensorCategory.query.filter(
@@ -87,6 +96,9 @@ def update_sensor_category(sensor_category_id):
     except sqlalchemy.exc.IntegrityError:
         raise exceptions.InternalServerError('Unable to update sensor category')
 
+    # Stop serving cached responses which include this sensor category.
+    metadata.cache().invalidate(metadata.CATEGORIES)
+
     # Confirm update with an HTTP 204.
     response = jsonify()
     response.status_code = 204
@@ -109,6 +121,9 @@ def delete_sensor_category(sensor_category_id):
     except sqlalchemy.exc.IntegrityError:
         raise exceptions.InternalServerError('Unable to delete sensor category')
 
+    # Stop serving cached responses which include this sensor category.
+    metadata.cache().invalidate(metadata.CATEGORIES)
+
     # Confirm deletion with an HTTP 204.
     response = jsonify()
     response.status_code = 204
@@ -1,22 +1,397 @@
 ''' Version 1 Sensor Data endpoints of the Europa project API. '''
 
+import json
+import heapq
 import datetime
+import itertools
+
+import numpy
 import sqlalchemy
 
 from flask import g
+from flask import abort
+from flask import url_for
 from flask import jsonify
 from flask import request
+from flask import Response
+from flask import stream_with_context
+
+from europa import alerts
+from europa import blocks
+from europa import latest
+from europa import partitions
+from europa import recent
+from europa import rollups
+from europa import statistics
+from europa import stream
 
 from europa.models import db
 from europa.models import Sensor
 from europa.models import SensorData
+from europa.models import SensorDataRollup
 from europa.models import to_datetime
+from europa.models import from_datetime
+from europa.expressions import epoch_bucket
+from europa.timeseries import truncate
+from europa.timeseries import downsample
+from europa.timeseries import Series
 
 from europa.api.v1 import decorators
+from europa.api.v1 import formats
 from europa.api.v1 import exceptions
+from europa.api.v1 import parameters
+from europa.api.v1 import validators
 
 from europa.api.v1 import router
 
+# Define the maximum number of entries which may be submitted in a batch.
+MAXIMUM_BATCH_SIZE = 5000
+
+# Define the number of entries to commit at a time when importing, the longest
+# line which will be read from an import, and the number of errors to report.
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_LINE_LENGTH = 4096
+IMPORT_ERROR_LIMIT = 100
+
+# Define the maximum number of entries which may be retrieved in a page, and
+# the window of data to return if no start time or cursor is provided.
+MAXIMUM_PAGE_SIZE = 10000
+DEFAULT_WINDOW = datetime.timedelta(days=1)
+
+# Define the smallest number of points which data may be downsampled to, as
+# LTTB always keeps the first and last points, and needs at least one between.
+MINIMUM_POINTS = 3
+
+# Define the number of entries to read from the database at a time when
+# exporting sensor data.
+EXPORT_CHUNK_SIZE = 1000
+
+# Define the maximum number of sensors which may be retrieved at once.
+MAXIMUM_SENSORS = 100
+
+# Define the aggregate functions which may be applied to sensor data, and how
+# each is calculated from rollups. Also define the maximum number of buckets
+# which may be returned in a single request.
+AGGREGATE_FUNCTIONS = {
+    'avg': sqlalchemy.func.avg(SensorData.value),
+    'min': sqlalchemy.func.min(SensorData.value),
+    'max': sqlalchemy.func.max(SensorData.value),
+    'sum': sqlalchemy.func.sum(SensorData.value),
+    'count': sqlalchemy.func.count(SensorData.value),
+}
+ROLLUP_AGGREGATE_FUNCTIONS = {
+    'avg': (
+        sqlalchemy.func.sum(SensorDataRollup.total) /
+        sqlalchemy.func.sum(SensorDataRollup.count)
+    ),
+    'min': sqlalchemy.func.min(SensorDataRollup.minimum),
+    'max': sqlalchemy.func.max(SensorDataRollup.maximum),
+    'sum': sqlalchemy.func.sum(SensorDataRollup.total),
+    'count': sqlalchemy.func.sum(SensorDataRollup.count),
+}
+MAXIMUM_BUCKETS = 10000
+
+# Define the number of seconds between keepalive comments on a stream, and the
+# number of milliseconds clients should wait before reconnecting.
+STREAM_HEARTBEAT = 15
+STREAM_RETRY = 5000
+
+# Define the percentiles to calculate if none are requested, and the maximum
+# number which may be requested at once.
+DEFAULT_PERCENTILES = [5, 50, 95]
+MAXIMUM_PERCENTILES = 20
+
+
+def _parse_sensor_data(document, sensor_id=None):
+    '''
+    Validate a sensor data document, and return a mapping suitable for insert.
+    If a sensor ID is provided, it is used in place of the 'sensor' field.
+    '''
+    if not isinstance(document, dict):
+        raise exceptions.InvalidClientRequest('Entry must be an object')
+
+    # Ensure required fields are present in the document.
+    fields = ['value', 'created']
+    if sensor_id is None:
+        fields.append('sensor')
+    for field in fields:
+        if document.get(field) is None:
+            raise exceptions.InvalidClientRequest(
+                "'{}' field missing".format(field)
+            )
+
+    # Ensure the sensor value and identifier are in the correct format.
+    value = document.get('value')
+    if type(value) != float:
+        raise exceptions.InvalidClientRequest('Value must be a float!')
+
+    if sensor_id is None:
+        sensor_id = document.get('sensor')
+        if type(sensor_id) != int:
+            raise exceptions.InvalidClientRequest('Sensor must be an integer!')
+
+    try:
+        created = to_datetime(document.get('created'))
+    except (TypeError, ValueError):
+        raise exceptions.InvalidClientRequest('Created must be a timestamp!')
+
+    return {
+        'value': value,
+        'sensor_id': sensor_id,
+        'created': created,
+    }
+
+
+def _find_sensors(sensor_ids):
+    ''' Returns the subset of the given sensor IDs which exist. '''
+    if not sensor_ids:
+        return set()
+
+    candidates = db.session.query(Sensor.id).filter(
+        Sensor.id.in_(sensor_ids),
+        Sensor.deleted == None,
+    ).all()
+    return set(candidate.id for candidate in candidates)
+
+
+def _store_sensor_data(entries):
+    '''
+    Insert the given sensor data mappings with a single statement, and commit
+    them in a single transaction along with any changes to rollups.
+    '''
+    if entries:
+        partitions.manager().ensure(entries)
+        try:
+            db.session.execute(SensorData.__table__.insert(), entries)
+        except sqlalchemy.exc.IntegrityError as err:
+            db.session.rollback()
+            if not partitions.missing(err):
+                raise exceptions.InternalServerError('Unable to create sensor data')
+
+            # A partition may have been dropped by another process, such as
+            # by retention, since partitions were loaded. Reload them, and
+            # try once more.
+            partitions.manager().refresh()
+            partitions.manager().ensure(entries)
+            db.session.execute(SensorData.__table__.insert(), entries)
+        rollups.update(entries)
+
+    try:
+        db.session.commit()
+    except sqlalchemy.exc.IntegrityError:
+        db.session.rollback()
+        raise exceptions.InternalServerError('Unable to create sensor data')
+
+    # Only once committed, update the latest and recent data for each sensor,
+    # evaluate any alert rules against the new data, and publish it to any
+    # subscribers.
+    latest.cache().update(entries)
+    recent.store().append(entries)
+    alerts.evaluator().evaluate(entries)
+    stream.broker().publish(entries)
+
+
+def _create_sensor_data_batch(documents, sensor_id=None):
+    '''
+    Validate and store a batch of sensor data documents, returning a response
+    which contains the status of each entry, in submission order.
+    '''
+    results = []
+    entries = []
+    for document in documents:
+        try:
+            entries.append(_parse_sensor_data(document, sensor_id=sensor_id))
+            results.append({'status': 201})
+        except exceptions.InvalidClientRequest as err:
+            entries.append(None)
+            results.append({'status': 400, 'error': str(err)})
+
+    # Check all referenced sensors exist with a single query, and reject any
+    # entries which reference an unknown sensor.
+    if sensor_id is None:
+        sensors = _find_sensors(
+            set(entry['sensor_id'] for entry in entries if entry)
+        )
+        for index, entry in enumerate(entries):
+            if entry and entry['sensor_id'] not in sensors:
+                entries[index] = None
+                results[index] = {'status': 404, 'error': 'Sensor not found'}
+
+    # Insert all valid entries in a single transaction.
+    accepted = [entry for entry in entries if entry]
+    _store_sensor_data(accepted)
+
+    # Report the status of each entry to the user. If any entries could not
+    # be created, use an HTTP 207 to indicate that the caller should check.
+    response = jsonify({
+        'accepted': len(accepted),
+        'rejected': len(entries) - len(accepted),
+        'results': results,
+    })
+    response.status_code = 201 if len(accepted) == len(entries) else 207
+    return response
+
+
+def _downsample_sensor_data(series, points):
+    ''' Downsamples the given series to at most the given points. '''
+    return series[downsample(series.epoch(), series.values, points)]
+
+
+def _aggregate_sensor_data(series, interval, functions):
+    '''
+    Groups the given series into buckets of the given interval in memory, and
+    applies the given functions to the values in each bucket - as the database
+    does for rows. Returns a JSON friendly list of buckets.
+    '''
+    if not len(series):
+        return []
+
+    buckets = series.created.astype('datetime64[s]').astype(numpy.int64)
+    buckets = buckets // interval * interval
+    edges, starts = numpy.unique(buckets, return_index=True)
+    counts = numpy.diff(numpy.append(starts, len(series)))
+    sums = numpy.add.reduceat(series.values, starts)
+    results = {
+        'avg': sums / counts,
+        'min': numpy.minimum.reduceat(series.values, starts),
+        'max': numpy.maximum.reduceat(series.values, starts),
+        'sum': sums,
+        'count': counts,
+    }
+
+    buckets = []
+    for index, edge in enumerate(edges.tolist()):
+        entry = {
+            'created': from_datetime(datetime.datetime.utcfromtimestamp(edge)),
+        }
+        for function in functions:
+            entry[function] = results[function][index].item()
+        buckets.append(entry)
+    return buckets
+
+
+def _evaluate_sensor_data(query, *version):
+    '''
+    Allow the client to conditionally retrieve the sensor data selected by the
+    given query. The version is derived from the number, and range, of entries
+    selected, which changes as entries are added, or leave the window, without
+    reading the entries themselves.
+    '''
+    candidate = db.session.execute(
+        query.with_only_columns([
+            sqlalchemy.func.count(),
+            sqlalchemy.func.min(SensorData.created),
+            sqlalchemy.func.max(SensorData.created),
+            sqlalchemy.func.max(SensorData.id),
+        ])
+    ).first()
+    validators.evaluate(tuple(candidate) + version)
+
+
+def _read_lines(stream):
+    '''
+    Yields each line of the given stream, reading at most IMPORT_LINE_LENGTH
+    bytes at a time. Lines longer than this are discarded, without being read
+    into memory, and None is yielded in place of each.
+    '''
+    while True:
+        candidate = stream.readline(IMPORT_LINE_LENGTH)
+        if not candidate:
+            return
+        if len(candidate) < IMPORT_LINE_LENGTH or candidate.endswith(b'\n'):
+            yield candidate
+            continue
+
+        # The line may still be complete if the stream has been exhausted.
+        remainder = stream.readline(IMPORT_LINE_LENGTH)
+        if not remainder:
+            yield candidate
+            return
+        while remainder and not remainder.endswith(b'\n'):
+            remainder = stream.readline(IMPORT_LINE_LENGTH)
+        yield None
+
+
+def _import_sensor_data(stream, sensor_id=None):
+    '''
+    Validate and store newline delimited JSON sensor data documents read from
+    the given stream, committing in fixed size chunks so that memory use does
+    not depend on the size of the import.
+    '''
+    accepted = 0
+    rejected = 0
+    errors = []
+
+    # Track which sensors are known to exist so that each sensor is only
+    # checked once per import.
+    checked = set()
+    existing = set()
+    if sensor_id is not None:
+        checked.add(sensor_id)
+        existing.add(sensor_id)
+
+    def reject(line, error):
+        ''' Record a rejected entry, retaining a bounded number of errors. '''
+        nonlocal rejected
+        rejected += 1
+        if len(errors) < IMPORT_ERROR_LIMIT:
+            errors.append({'line': line, 'error': error})
+
+    def flush(chunk):
+        ''' Check referenced sensors exist, and store the given chunk. '''
+        unchecked = set(entry['sensor_id'] for _, entry in chunk) - checked
+        existing.update(_find_sensors(unchecked))
+        checked.update(unchecked)
+
+        entries = []
+        for line, entry in chunk:
+            if entry['sensor_id'] in existing:
+                entries.append(entry)
+            else:
+                reject(line, 'Sensor not found')
+
+        _store_sensor_data(entries)
+        return len(entries)
+
+    # Read the stream a line at a time, limiting line length so that a body
+    # without any newlines cannot be read into memory all at once.
+    chunk = []
+    for line, candidate in enumerate(_read_lines(stream), start=1):
+        if candidate is None:
+            reject(line, 'Line too long')
+            continue
+
+        candidate = candidate.strip()
+        if not candidate:
+            continue
+
+        try:
+            document = json.loads(candidate.decode('utf-8'))
+            chunk.append(
+                (line, _parse_sensor_data(document, sensor_id=sensor_id))
+            )
+        except exceptions.InvalidClientRequest as err:
+            reject(line, str(err))
+        except ValueError:
+            reject(line, 'Invalid JSON')
+
+        if len(chunk) >= IMPORT_CHUNK_SIZE:
+            accepted += flush(chunk)
+            chunk = []
+
+    if chunk:
+        accepted += flush(chunk)
+
+    # Report the outcome of the import to the user. If any entries could not
+    # be created, use an HTTP 207 to indicate that the caller should check.
+    response = jsonify({
+        'accepted': accepted,
+        'rejected': rejected,
+        'errors': sorted(errors, key=lambda error: error['line']),
+    })
+    response.status_code = 201 if rejected == 0 else 207
+    return response
+
 
 @router.route('/sensor/<int:sensor_id>/data', methods=['POST'])
 @decorators.validated(fields=['value', 'created'])
@@ -28,24 +403,9 @@ def create_sensor_data(sensor_id):
         Sensor.deleted == None,
     ).first_or_404()
 
-    # Ensure the sensor value is in the correct format.
-    document = request.get_json()
-    value = document.get('value')
-    if type(value) != float:
-        raise exceptions.InvalidClientRequest('Value must be a float!')
-
     # Create a new sensor data entry from the provided payload.
-    candidate = SensorData(
-        value=value,
-        sensor_id=sensor_id,
-        created=to_datetime(document.get('created'))
-    )
-    db.session.add(candidate)
-
-    try:
-        db.session.commit()
-    except sqlalchemy.exc.IntegrityError:
-        raise exceptions.InternalServerError('Unable to create sensor data')
+    candidate = _parse_sensor_data(request.get_json(), sensor_id=sensor_id)
+    _store_sensor_data([candidate])
 
     # Confirm addition with an HTTP 201.
     response = jsonify()
@@ -53,17 +413,572 @@ def create_sensor_data(sensor_id):
     return response
 
 
+@router.route('/sensor/data/batch', methods=['POST'])
+@decorators.validated_batch(limit=MAXIMUM_BATCH_SIZE)
+def create_sensor_data_batch():
+    ''' Attempt to create a batch of sensor data entries for any sensors. '''
+    return _create_sensor_data_batch(request.get_json())
+
+
+@router.route('/sensor/<int:sensor_id>/data/batch', methods=['POST'])
+@decorators.validated_batch(limit=MAXIMUM_BATCH_SIZE)
+def create_sensor_data_batch_for_sensor(sensor_id):
+    ''' Attempt to create a batch of sensor data entries for a given sensor. '''
+    # Ensure the associated sensor exists.
+    _ = Sensor.query.filter(
+        Sensor.id == sensor_id,
+        Sensor.deleted == None,
+    ).first_or_404()
+
+    return _create_sensor_data_batch(request.get_json(), sensor_id=sensor_id)
+
+
+@router.route('/sensor/data/import', methods=['POST'])
+@decorators.streamed('application/x-ndjson')
+def import_sensor_data():
+    ''' Attempt to import a stream of sensor data entries for any sensors. '''
+    return _import_sensor_data(request.stream)
+
+
+@router.route('/sensor/<int:sensor_id>/data/import', methods=['POST'])
+@decorators.streamed('application/x-ndjson')
+def import_sensor_data_for_sensor(sensor_id):
+    ''' Attempt to import a stream of sensor data entries for a sensor. '''
+    # Ensure the associated sensor exists.
+    _ = Sensor.query.filter(
+        Sensor.id == sensor_id,
+        Sensor.deleted == None,
+    ).first_or_404()
+
+    return _import_sensor_data(request.stream, sensor_id=sensor_id)
+
+
+def _read_sensor_data(sensor_id, since, until, cursor, limit):
+    '''
+    Reads the data of a given sensor from the database, created from 'since',
+    before 'until', and after the given cursor, returning up to 'limit' entries
+    as a series. Sealed entries are read from blocks, where enabled. If the
+    client already holds the selected entries, they are not read at all.
+    '''
+    # Select only the required columns with Core, rather than the ORM, so that
+    # no object is constructed for each entry.
+    query = sqlalchemy.select([
+        SensorData.id,
+        SensorData.created,
+        SensorData.value,
+    ]).select_from(
+        SensorData.__table__.join(
+            Sensor.__table__,
+            Sensor.id == SensorData.sensor_id,
+        )
+    ).where(
+        SensorData.sensor_id == sensor_id,
+    ).where(
+        Sensor.deleted == None,
+    )
+    if since is not None:
+        query = query.where(SensorData.created >= since)
+    if until is not None:
+        query = query.where(SensorData.created < until)
+
+    # Page by position, rather than offset, so that the cost of retrieving a
+    # page does not depend on how many pages came before it.
+    if cursor is not None:
+        created, identifier = cursor
+        query = query.where(
+            sqlalchemy.or_(
+                SensorData.created > created,
+                sqlalchemy.and_(
+                    SensorData.created == created,
+                    SensorData.id > identifier,
+                ),
+            )
+        )
+
+    # Sealed entries are read from blocks which overlap the window, starting
+    # from the cursor if it is later than the start of the window.
+    sealed = blocks.enabled()
+    start = since
+    if cursor is not None and (start is None or cursor[0] > start):
+        start = cursor[0]
+
+    # Entries are never modified once stored, so the client may skip reading
+    # them if the selection is unchanged.
+    if sealed:
+        _evaluate_sensor_data(query, *blocks.version([sensor_id], start, until))
+    else:
+        _evaluate_sensor_data(query)
+
+    series = Series.from_rows(
+        db.session.execute(
+            query.order_by(
+                SensorData.created,
+                SensorData.id,
+            ).limit(limit)
+        ),
+        size=limit,
+    )
+    if sealed:
+        candidates = blocks.read([sensor_id], start, until).get(sensor_id)
+        if candidates is not None:
+            if cursor is not None:
+                candidates = candidates.after(*cursor)
+            series = Series.concatenate([candidates, series])[:limit]
+    return series
+
+
 @router.route('/sensor/<int:sensor_id>/data', methods=['GET'])
 def retrieve_sensor_data(sensor_id):
-    ''' Attempt to retrieve data for a given sensor. '''
-    candidates = SensorData.query.filter(
+    '''
+    Attempt to retrieve data for a given sensor. By default, the last day of
+    data is returned, though this may be controlled with the 'since', 'until'
+    and 'limit' parameters - where 'limit' defaults to the largest page. If any
+    data is returned, a 'next' link is provided which can be followed to
+    retrieve the next page, or any newer data.
+
+    If 'max_points' is provided, the data is downsampled to at most this many
+    entries in a manner which preserves its shape, for use in charts.
+
+    The data may be requested in any of the formats defined in 'formats'.
+    '''
+    cursor = parameters.get_cursor()
+    since = parameters.get_datetime('since')
+    until = parameters.get_datetime('until')
+    limit = parameters.get_integer(
+        'limit',
+        default=MAXIMUM_PAGE_SIZE,
+        minimum=1,
+        maximum=MAXIMUM_PAGE_SIZE,
+    )
+    points = parameters.get_integer(
+        'max_points',
+        minimum=MINIMUM_POINTS,
+        maximum=MAXIMUM_PAGE_SIZE,
+    )
+
+    # Only default to the most recent window if not resuming from a cursor, as
+    # otherwise any data between the cursor and the window would be skipped.
+    if since is None and cursor is None:
+        since = datetime.datetime.utcnow() - DEFAULT_WINDOW
+
+    # Serve windows of recent data from the ring buffer of the sensor, where it
+    # holds every entry in the window, without querying the database at all.
+    candidate = None
+    if cursor is None:
+        candidate = recent.store().read(sensor_id, since, until)
+
+    if candidate is not None:
+        series, version = candidate
+        validators.evaluate(version)
+        series = series[:limit]
+    else:
+        series = _read_sensor_data(sensor_id, since, until, cursor, limit)
+
+    # Link to the position after the last entry retrieved. As downsampling
+    # always retains the last entry, this is also the last entry returned.
+    arguments = None
+    if len(series):
+        arguments = request.args.to_dict()
+        arguments['cursor'] = parameters.to_cursor(*series.last())
+
+    if points is not None:
+        series = _downsample_sensor_data(series, points)
+
+    # Construct a response in the requested format.
+    response = formats.render(series)
+    if arguments:
+        response.headers['Link'] = '<{}>; rel="next"'.format(
+            url_for(request.endpoint, sensor_id=sensor_id, **arguments)
+        )
+    return response
+
+
+@router.route('/sensor/<int:sensor_id>/data/export', methods=['GET'])
+def export_sensor_data(sensor_id):
+    '''
+    Attempt to export all data for a given sensor, optionally limited with the
+    'since' and 'until' parameters, as either 'csv' or 'ndjson' - set with the
+    'format' parameter. The export is streamed as it is read from the database,
+    so that memory use does not depend on the amount of data exported.
+    '''
+    since = parameters.get_datetime('since')
+    until = parameters.get_datetime('until')
+    mimetype = formats.negotiate_export()
+
+    # Ensure the sensor exists before starting the export, as errors can no
+    # longer be returned once streaming has started.
+    _ = Sensor.query.filter(
+        Sensor.id == sensor_id,
+        Sensor.deleted == None,
+    ).first_or_404()
+
+    query = sqlalchemy.select([
+        SensorData.created,
+        SensorData.id,
+        SensorData.value,
+    ]).where(
         SensorData.sensor_id == sensor_id,
+    )
+    if since is not None:
+        query = query.where(SensorData.created >= since)
+    if until is not None:
+        query = query.where(SensorData.created < until)
+
+    # Use a server-side cursor, where supported, so that entries are fetched
+    # from the database in chunks rather than all at once.
+    query = query.order_by(
+        SensorData.created,
+        SensorData.id,
+    ).execution_options(stream_results=True)
+    sealed = blocks.enabled()
+
+    def generate():
+        result = db.session.execute(query)
+        try:
+            rows = (
+                tuple(row) for row in itertools.chain.from_iterable(
+                    iter(lambda: result.fetchmany(EXPORT_CHUNK_SIZE), [])
+                )
+            )
+
+            # Merge in sealed entries a block at a time, where stored in blocks.
+            if sealed:
+                rows = heapq.merge(
+                    (
+                        entry
+                        for _, _, candidates in blocks.scan(sensor_id, since, until)
+                        for entry in zip(
+                            candidates.created.astype(datetime.datetime).tolist(),
+                            candidates.ids.tolist(),
+                            candidates.values.tolist(),
+                        )
+                    ),
+                    rows,
+                )
+
+            chunks = iter(
+                lambda: [
+                    (created, value) for created, _, value in
+                    itertools.islice(rows, EXPORT_CHUNK_SIZE)
+                ],
+                [],
+            )
+            for text in formats.export(chunks, mimetype):
+                yield text
+        finally:
+            result.close()
+
+    filename = 'sensor-{}.{}'.format(
+        sensor_id,
+        'csv' if mimetype == formats.CSV else 'ndjson',
+    )
+    response = Response(stream_with_context(generate()), mimetype=mimetype)
+    response.headers['Content-Disposition'] = (
+        'attachment; filename="{}"'.format(filename)
+    )
+    return response
+
+
+@router.route('/sensors/data', methods=['GET'])
+def retrieve_sensors_data():
+    '''
+    Attempt to retrieve data for a number of sensors with a single query. The
+    sensors are listed in 'ids', or all sensors are returned if omitted. The
+    data is grouped by sensor ID, and may be limited with the 'since', 'until'
+    and 'max_points' parameters, and formatted, as for a single sensor.
+    '''
+    sensor_ids = parameters.get_integers('ids', maximum=MAXIMUM_SENSORS)
+    since = parameters.get_datetime(
+        'since',
+        default=datetime.datetime.utcnow() - DEFAULT_WINDOW,
+    )
+    until = parameters.get_datetime('until')
+    points = parameters.get_integer(
+        'max_points',
+        minimum=MINIMUM_POINTS,
+        maximum=MAXIMUM_PAGE_SIZE,
+    )
+
+    # Find the requested sensors, so that sensors without data in the window
+    # are still included in the response.
+    query = db.session.query(Sensor.id).filter(Sensor.deleted == None)
+    if sensor_ids is not None:
+        query = query.filter(Sensor.id.in_(sensor_ids))
+    sensors = dict((candidate.id, Series.empty()) for candidate in query.all())
+
+    # Serve windows of recent data from the ring buffers of the sensors, where
+    # they hold every entry in the window, without querying for any data.
+    recents = dict(
+        (sensor_id, recent.store().read(sensor_id, since, until))
+        for sensor_id in sensors
+    )
+    if sensors and all(recents.values()):
+        validators.evaluate(
+            tuple(
+                (sensor_id, recents[sensor_id][1])
+                for sensor_id in sorted(sensors)
+            )
+        )
+        for sensor_id in sensors:
+            sensors[sensor_id] = recents[sensor_id][0]
+
+    # Otherwise, retrieve data for all sensors with a single Core query.
+    elif sensors:
+        query = sqlalchemy.select([
+            SensorData.sensor_id,
+            SensorData.id,
+            SensorData.created,
+            SensorData.value,
+        ]).where(
+            SensorData.sensor_id.in_(sensors.keys()),
+        ).where(
+            SensorData.created >= since,
+        )
+        if until is not None:
+            query = query.where(SensorData.created < until)
+
+        version = tuple(sorted(sensors.keys()))
+        if blocks.enabled():
+            version += blocks.version(sensors.keys(), since, until)
+        _evaluate_sensor_data(query, *version)
+
+        sensors.update(
+            Series.from_grouped_rows(
+                db.session.execute(
+                    query.order_by(
+                        SensorData.sensor_id,
+                        SensorData.created,
+                        SensorData.id,
+                    )
+                )
+            )
+        )
+
+        # Merge in sealed entries, where stored in blocks.
+        if blocks.enabled():
+            for sensor_id, candidates in blocks.read(
+                sensors.keys(),
+                since,
+                until,
+            ).items():
+                sensors[sensor_id] = Series.concatenate(
+                    [candidates, sensors[sensor_id]]
+                )
+
+    if points is not None:
+        for sensor_id, candidates in sensors.items():
+            sensors[sensor_id] = _downsample_sensor_data(candidates, points)
+
+    # Construct a response in the requested format, keyed by sensor.
+    return formats.render_many(sensors)
+
+
+@router.route('/sensors/stream', methods=['GET'])
+def stream_sensors_data():
+    '''
+    Attempt to stream new data for a number of sensors, as Server-Sent Events.
+    The sensors are listed in 'ids', or data for all sensors is streamed if
+    omitted. Each event contains a list of readings as they are stored.
+
+    Clients which fall too far behind are sent a 'reset' event, and the stream
+    is closed - as data has been missed, and should be retrieved again.
+    '''
+    sensor_ids = parameters.get_integers('ids', maximum=MAXIMUM_SENSORS)
+    broker = stream.broker()
+    subscription = broker.subscribe(sensor_ids)
+
+    def generate():
+        yield 'retry: {}\n\n'.format(STREAM_RETRY)
+        while not subscription.overflowed:
+            message = subscription.get(timeout=STREAM_HEARTBEAT)
+            if message is None:
+                # Keep idle connections open, and detect closed ones.
+                yield ': keepalive\n\n'
+            else:
+                yield 'data: {}\n\n'.format(message)
+        yield 'event: reset\ndata: {}\n\n'
+
+    # Ensure the subscription is removed once the client disconnects, and that
+    # events are not buffered by any proxy.
+    response = Response(generate(), mimetype='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    response.headers['X-Accel-Buffering'] = 'no'
+    response.call_on_close(lambda: broker.unsubscribe(subscription))
+    return response
+
+
+@router.route('/sensors/latest', methods=['GET'])
+def retrieve_sensors_latest():
+    ''' Attempt to retrieve the latest data for all sensors, from cache. '''
+    sensors = {}
+    for sensor_id, (created, value) in latest.cache().all().items():
+        sensors[str(sensor_id)] = {
+            'value': value,
+            'created': from_datetime(created),
+        }
+    return jsonify(sensors)
+
+
+@router.route('/sensor/<int:sensor_id>/latest', methods=['GET'])
+def retrieve_sensor_latest(sensor_id):
+    ''' Attempt to retrieve the latest data for a given sensor, from cache. '''
+    candidate = latest.cache().get(sensor_id)
+    if candidate is None:
+        abort(404)
+
+    created, value = candidate
+    return jsonify({
+        'value': value,
+        'created': from_datetime(created),
+    })
+
+
+@router.route('/sensor/<int:sensor_id>/data/aggregate', methods=['GET'])
+def retrieve_sensor_data_aggregate(sensor_id):
+    '''
+    Attempt to retrieve aggregated data for a given sensor. Data is grouped
+    into buckets of the given 'interval', and the functions listed in 'fn' are
+    applied to the values in each bucket. Buckets without data are omitted.
+
+    By default, the last day of buckets is returned - up to and including the
+    current bucket.
+    '''
+    interval = parameters.get_interval('interval', default=60 * 60)
+    functions = parameters.get_choices(
+        'fn',
+        AGGREGATE_FUNCTIONS,
+        default=['avg', 'min', 'max', 'count'],
+    )
+    until = parameters.get_datetime(
+        'until',
+        default=truncate(datetime.datetime.utcnow(), interval) +
+        datetime.timedelta(seconds=interval),
+    )
+    since = parameters.get_datetime('since', default=until - DEFAULT_WINDOW)
+
+    # Ensure the response stays bounded, regardless of the window requested.
+    if (until - since).total_seconds() / interval > MAXIMUM_BUCKETS:
+        raise exceptions.InvalidClientRequest(
+            'No more than {} buckets may be requested'.format(MAXIMUM_BUCKETS)
+        )
+
+    # Where buckets can be built from rollups, use them rather than reading
+    # every entry in the window. Either way, perform the bucketing in the
+    # database so that only one row per bucket is returned.
+    resolution = rollups.resolution_for(interval, since, until)
+    if resolution is None:
+        source = SensorData
+        created = SensorData.created
+        aggregates = AGGREGATE_FUNCTIONS
+    else:
+        source = SensorDataRollup
+        created = SensorDataRollup.bucket
+        aggregates = ROLLUP_AGGREGATE_FUNCTIONS
+
+    bucket = epoch_bucket(created, interval).label('bucket')
+    query = db.session.query(
+        bucket,
+        *[aggregates[function].label(function) for function in functions]
+    ).join(
+        Sensor,
+        Sensor.id == source.sensor_id,
+    ).filter(
+        source.sensor_id == sensor_id,
         Sensor.deleted == None,
-        SensorData.created >= (
-            datetime.datetime.utcnow() - datetime.timedelta(days=1)
+        created >= since,
+        created < until,
+    )
+    if resolution is not None:
+        query = query.filter(SensorDataRollup.resolution == resolution)
+
+    # Sealed entries can't be bucketed by the database, so where any are in
+    # the window, bucket all entries in memory instead.
+    sealed = None
+    if resolution is None and blocks.enabled():
+        sealed = blocks.read([sensor_id], since, until).get(sensor_id)
+
+    if sealed is not None:
+        rows = Series.from_rows(
+            db.session.execute(
+                sqlalchemy.select([
+                    SensorData.id,
+                    SensorData.created,
+                    SensorData.value,
+                ]).where(
+                    SensorData.sensor_id == sensor_id,
+                ).where(
+                    SensorData.created >= since,
+                ).where(
+                    SensorData.created < until,
+                )
+            )
+        )
+        return jsonify(
+            _aggregate_sensor_data(
+                Series.concatenate([sealed, rows]),
+                interval,
+                functions,
+            )
         )
-    ).order_by(SensorData.created).all()
+
+    candidates = query.group_by(bucket).order_by(bucket).all()
 
     # Construct a JSON friendly response.
-    sensors = [candidate.for_json() for candidate in candidates]
-    return jsonify(sensors)
+    buckets = []
+    for candidate in candidates:
+        entry = {
+            'created': from_datetime(
+                datetime.datetime.utcfromtimestamp(candidate.bucket)
+            ),
+        }
+        for function in functions:
+            entry[function] = getattr(candidate, function)
+        buckets.append(entry)
+    return jsonify(buckets)
+
+
+@router.route('/sensor/<int:sensor_id>/data/stats', methods=['GET'])
+def retrieve_sensor_data_stats(sensor_id):
+    '''
+    Attempt to retrieve statistics of the data for a given sensor - its count,
+    mean, variance, standard deviation, minimum, maximum, and the percentiles
+    listed in 'percentiles'. By default, the last day of data is used, though
+    this may be controlled with the 'since' and 'until' parameters.
+    '''
+    since = parameters.get_datetime(
+        'since',
+        default=datetime.datetime.utcnow() - DEFAULT_WINDOW,
+    )
+    until = parameters.get_datetime('until')
+    percentiles = parameters.get_percentiles(
+        'percentiles',
+        default=DEFAULT_PERCENTILES,
+        maximum=MAXIMUM_PERCENTILES,
+    )
+
+    query = sqlalchemy.select([SensorData.value]).select_from(
+        SensorData.__table__.join(
+            Sensor.__table__,
+            Sensor.id == SensorData.sensor_id,
+        )
+    ).where(
+        SensorData.sensor_id == sensor_id,
+    ).where(
+        Sensor.deleted == None,
+    ).where(
+        SensorData.created >= since,
+    )
+    if until is not None:
+        query = query.where(SensorData.created < until)
+
+    # Statistics are unchanged while the selected entries are unchanged.
+    sealed = None
+    if blocks.enabled():
+        _evaluate_sensor_data(query, *blocks.version([sensor_id], since, until))
+        candidates = blocks.read([sensor_id], since, until).get(sensor_id)
+        if candidates is not None:
+            sealed = candidates.values
+    else:
+        _evaluate_sensor_data(query)
+
+    return jsonify(statistics.describe(query, percentiles, sealed=sealed))
@@ -7,6 +7,8 @@ from flask import g
 from flask import jsonify
 from flask import request
 
+from europa import metadata
+
 from europa.models import db
 from europa.models import Vessel
 from europa.models import VesselSize
@@ -36,6 +38,9 @@ def create_vessel():
     except sqlalchemy.exc.IntegrityError:
         raise exceptions.InternalServerError('Unable to create vessel')
 
+    # Stop serving cached responses which include this vessel.
+    metadata.cache().invalidate(metadata.VESSELS)
+
     # Return the newly created vessel to the user.
     # TODO: Perhaps reference the account in the HTTP 'Location' header, rather
     #       than returning a body on the HTTP 201?
@@ -45,6 +50,8 @@ def create_vessel():
 
 
 @router.route('/vessel', methods=['GET'])
+@decorators.cached(metadata.VESSELS)
+@decorators.conditional(Vessel)
 def retrieve_vessels():
     ''' Attempt to retrive vessels the user is authorised to access. '''
     candidates = Vessel.query.filter(
@@ -57,6 +64,8 @@ def retrieve_vessels():
 
 
 @router.route('/vessel/<int:vessel_id>', methods=['GET'])
+@decorators.cached(metadata.VESSELS)
+@decorators.conditional(Vessel)
 def retrieve_vessel(vessel_id):
     ''' Attempt to retrieve a given vessel. '''
     candidate = Vessel.query.filter(
@@ -89,6 +98,9 @@ def update_vessel(vessel_id):
     except sqlalchemy.exc.IntegrityError:
         raise exceptions.InternalServerError('Unable to update vessel')
 
+    # Stop serving cached responses which include this vessel.
+    metadata.cache().invalidate(metadata.VESSELS)
+
     # Confirm update with an HTTP 204.
     response = jsonify()
     response.status_code = 204
@@ -111,6 +123,9 @@ def delete_vessel(vessel_id):
     except sqlalchemy.exc.IntegrityError:
         raise exceptions.InternalServerError('Unable to delete vessel')
 
+    # Stop serving cached responses which include this vessel.
+    metadata.cache().invalidate(metadata.VESSELS)
+
     # Confirm deletion with an HTTP 204.
     response = jsonify()
     response.status_code = 204
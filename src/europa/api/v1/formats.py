@@ -0,0 +1,172 @@
+''' Defines sensor data response formats for V1 of The Europa project API. '''
+
+import io
+import csv
+import json
+import struct
+
+import numpy
+
+from flask import jsonify
+from flask import request
+from flask import Response
+
+from europa.models import SERIALIZABLE_DATE_FORMAT
+from europa.api.v1 import exceptions
+
+# Define the supported formats for sensor data. These may be requested with
+# the 'format' query parameter, or by mimetype with the 'Accept' header.
+#
+#   json     - A list of objects, each with a 'created' and 'value' field.
+#   columnar - An object with a list of epoch timestamps in 't', and a list of
+#              values in 'v'.
+#   binary   - A little-endian unsigned 32-bit count, followed by that many
+#              signed 64-bit epoch timestamps, then that many 64-bit floating
+#              point values. When data for many sensors is returned, each is
+#              prefixed with its unsigned 32-bit sensor ID.
+#
+JSON = 'application/json'
+COLUMNAR = 'application/vnd.europa.columnar+json'
+BINARY = 'application/vnd.europa.binary'
+FORMATS = {
+    'json': JSON,
+    'columnar': COLUMNAR,
+    'binary': BINARY,
+}
+
+# Define the supported formats for exported sensor data. Unlike the formats
+# above, these are written a row at a time, so that exports may be streamed.
+#
+#   csv    - A header, followed by a line for each entry, with 'created' and
+#            'value' columns.
+#   ndjson - A JSON object on each line, with a 'created' and 'value' field.
+#
+CSV = 'text/csv'
+NDJSON = 'application/x-ndjson'
+EXPORT_FORMATS = {
+    'csv': CSV,
+    'ndjson': NDJSON,
+}
+
+
+def negotiate():
+    ''' Returns the mimetype which sensor data should be rendered as. '''
+    candidate = request.args.get('format')
+    if candidate is None:
+        return request.accept_mimetypes.best_match(
+            [JSON, COLUMNAR, BINARY],
+            default=JSON,
+        )
+
+    if candidate not in FORMATS:
+        raise exceptions.InvalidClientRequest(
+            "'{}' is not a valid format".format(candidate)
+        )
+    return FORMATS[candidate]
+
+
+def _to_columns(series):
+    ''' Returns the timestamps, in epoch seconds, and values of a series. '''
+    times = series.created.astype('datetime64[s]').astype(numpy.int64)
+    return times, series.values
+
+
+def _to_binary(series):
+    ''' Packs the given series into the binary format. '''
+    times, values = _to_columns(series)
+    return b''.join([
+        struct.pack('<I', len(series)),
+        times.astype('<i8').tobytes(),
+        values.astype('<f8').tobytes(),
+    ])
+
+
+def to_document(series, mimetype):
+    ''' Converts the given series into a JSON serializable document. '''
+    if mimetype == COLUMNAR:
+        times, values = _to_columns(series)
+        return {'t': times.tolist(), 'v': values.tolist()}
+
+    # Format all timestamps at once, rather than for each entry.
+    created = numpy.datetime_as_string(series.created, unit='s')
+    return [
+        {'value': value, 'created': timestamp}
+        for timestamp, value in zip(created.tolist(), series.values.tolist())
+    ]
+
+
+def render(series):
+    ''' Renders the given series into a response of the negotiated format. '''
+    mimetype = negotiate()
+    if mimetype == BINARY:
+        response = Response(_to_binary(series), mimetype=BINARY)
+    else:
+        response = jsonify(to_document(series, mimetype))
+        response.mimetype = mimetype
+
+    response.vary.add('Accept')
+    return response
+
+
+def render_many(series):
+    '''
+    Renders a series for each of many sensors, keyed by sensor ID, into a
+    response of the negotiated format.
+    '''
+    mimetype = negotiate()
+    if mimetype == BINARY:
+        response = Response(
+            b''.join(
+                struct.pack('<I', sensor_id) + _to_binary(candidates)
+                for sensor_id, candidates in sorted(series.items())
+            ),
+            mimetype=BINARY,
+        )
+    else:
+        response = jsonify(
+            dict(
+                (str(sensor_id), to_document(candidates, mimetype))
+                for sensor_id, candidates in series.items()
+            )
+        )
+        response.mimetype = mimetype
+
+    response.vary.add('Accept')
+    return response
+
+
+def negotiate_export():
+    ''' Returns the mimetype which exported sensor data should be written as. '''
+    candidate = request.args.get('format', 'csv')
+    if candidate not in EXPORT_FORMATS:
+        raise exceptions.InvalidClientRequest(
+            "'{}' is not a valid export format".format(candidate)
+        )
+    return EXPORT_FORMATS[candidate]
+
+
+def export(chunks, mimetype):
+    '''
+    Writes the given iterable of chunks of (created, value) rows in the given
+    export format, yielding the text for each chunk as it is written.
+    '''
+    if mimetype == CSV:
+        yield 'created,value\r\n'
+
+    for rows in chunks:
+        if mimetype == CSV:
+            buffer = io.StringIO()
+            writer = csv.writer(buffer)
+            writer.writerows(
+                (created.strftime(SERIALIZABLE_DATE_FORMAT), value)
+                for created, value in rows
+            )
+            yield buffer.getvalue()
+        else:
+            yield ''.join(
+                json.dumps({
+                    'created': created.strftime(SERIALIZABLE_DATE_FORMAT),
+                    'value': value,
+                }) + '\n'
+                for created, value in rows
+            )
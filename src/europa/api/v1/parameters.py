@@ -0,0 +1,187 @@
+''' Defines query parameter helpers for V1 of The Europa project API. '''
+
+import re
+import base64
+import datetime
+
+from flask import request
+
+from europa.models import to_datetime
+from europa.api.v1 import exceptions
+
+# Define the format used for timestamps inside of cursors. Unlike serialized
+# dates, this must retain microseconds in order to identify a position.
+CURSOR_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S.%f'
+
+# Define the format of intervals, and the number of seconds in each unit.
+INTERVAL_FORMAT = re.compile(r'^(\d+)([smhd])$')
+INTERVAL_UNITS = {
+    's': 1,
+    'm': 60,
+    'h': 60 * 60,
+    'd': 60 * 60 * 24,
+}
+
+
+def get_datetime(name, default=None):
+    '''
+    Attempts to read a timestamp from the named query parameter. An empty value
+    is treated as if the parameter were not provided.
+    '''
+    candidate = request.args.get(name)
+    if not candidate:
+        return default
+
+    try:
+        return to_datetime(candidate)
+    except ValueError:
+        raise exceptions.InvalidClientRequest(
+            "'{}' must be a timestamp".format(name)
+        )
+
+
+def get_integer(name, default=None, minimum=None, maximum=None):
+    ''' Attempts to read a bounded integer from the named query parameter. '''
+    candidate = request.args.get(name)
+    if candidate is None:
+        return default
+
+    try:
+        candidate = int(candidate)
+    except ValueError:
+        raise exceptions.InvalidClientRequest(
+            "'{}' must be an integer".format(name)
+        )
+
+    if minimum is not None and candidate < minimum:
+        raise exceptions.InvalidClientRequest(
+            "'{}' must be at least {}".format(name, minimum)
+        )
+    if maximum is not None and candidate > maximum:
+        raise exceptions.InvalidClientRequest(
+            "'{}' must be at most {}".format(name, maximum)
+        )
+    return candidate
+
+
+def get_integers(name, default=None, maximum=None):
+    ''' Attempts to read a comma separated list of integers from the request. '''
+    candidate = request.args.get(name)
+    if candidate is None:
+        return default
+
+    try:
+        selected = [int(entry) for entry in candidate.split(',') if entry]
+    except ValueError:
+        raise exceptions.InvalidClientRequest(
+            "'{}' must be a list of integers".format(name)
+        )
+
+    if not selected:
+        raise exceptions.InvalidClientRequest(
+            "'{}' must not be empty".format(name)
+        )
+    if maximum is not None and len(selected) > maximum:
+        raise exceptions.InvalidClientRequest(
+            "'{}' must contain at most {} entries".format(name, maximum)
+        )
+    return selected
+
+
+def get_percentiles(name, default=None, maximum=None):
+    '''
+    Attempts to read a comma separated list of percentiles - such as '5,50,95'
+    or '99.9' - from the request.
+    '''
+    candidate = request.args.get(name)
+    if candidate is None:
+        return default
+
+    try:
+        selected = [float(entry) for entry in candidate.split(',') if entry]
+    except ValueError:
+        raise exceptions.InvalidClientRequest(
+            "'{}' must be a list of percentiles".format(name)
+        )
+
+    if not selected:
+        raise exceptions.InvalidClientRequest(
+            "'{}' must not be empty".format(name)
+        )
+    if any(not 0 <= entry <= 100 for entry in selected):
+        raise exceptions.InvalidClientRequest(
+            "'{}' must be between 0 and 100".format(name)
+        )
+    if maximum is not None and len(selected) > maximum:
+        raise exceptions.InvalidClientRequest(
+            "'{}' must contain at most {} entries".format(name, maximum)
+        )
+    return selected
+
+
+def get_interval(name, default=None):
+    '''
+    Attempts to read an interval - such as '5m' or '1h' - from the named query
+    parameter, returning the number of seconds in the interval.
+    '''
+    candidate = request.args.get(name)
+    if candidate is None:
+        return default
+
+    match = INTERVAL_FORMAT.match(candidate)
+    if not match or int(match.group(1)) < 1:
+        raise exceptions.InvalidClientRequest(
+            "'{}' must be an interval, such as '5m' or '1h'".format(name)
+        )
+    return int(match.group(1)) * INTERVAL_UNITS[match.group(2)]
+
+
+def get_choices(name, choices, default=None):
+    ''' Attempts to read a comma separated list of choices from the request. '''
+    candidate = request.args.get(name)
+    if candidate is None:
+        return default
+
+    selected = [choice for choice in candidate.split(',') if choice]
+    for choice in selected:
+        if choice not in choices:
+            raise exceptions.InvalidClientRequest(
+                "'{}' is not a valid choice for '{}'".format(choice, name)
+            )
+    if not selected:
+        raise exceptions.InvalidClientRequest(
+            "'{}' must not be empty".format(name)
+        )
+    return selected
+
+
+def get_cursor(name='cursor'):
+    '''
+    Attempts to read a cursor from the named query parameter, returning the
+    timestamp and identifier of the position it refers to.
+    '''
+    candidate = request.args.get(name)
+    if candidate is None:
+        return None
+
+    try:
+        created, identifier = base64.urlsafe_b64decode(
+            candidate.encode('ascii')
+        ).decode('ascii').split('|')
+        return (
+            datetime.datetime.strptime(created, CURSOR_DATE_FORMAT),
+            int(identifier),
+        )
+    except ValueError:
+        raise exceptions.InvalidClientRequest(
+            "'{}' is not a valid cursor".format(name)
+        )
+
+
+def to_cursor(created, identifier):
+    ''' Encodes the given timestamp and identifier into an opaque cursor. '''
+    position = '{}|{}'.format(
+        datetime.datetime.strftime(created, CURSOR_DATE_FORMAT),
+        identifier,
+    )
+    return base64.urlsafe_b64encode(position.encode('ascii')).decode('ascii')
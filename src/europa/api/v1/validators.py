@@ -0,0 +1,90 @@
+''' Implements conditional requests for V1 of The Europa project API. '''
+
+import hashlib
+
+import sqlalchemy
+
+from flask import g
+from flask import abort
+from flask import request
+from flask import Response
+
+from europa.models import db
+
+from europa.api.v1 import router
+
+
+def version_of(*models):
+    '''
+    Returns a version of the rows of the given models, and the time at which
+    any of them was last modified, with a single query. As rows are never
+    removed, only marked deleted, the version changes whenever a row is
+    created or updated.
+    '''
+    columns = []
+    for model in models:
+        columns.append(
+            db.session.query(sqlalchemy.func.count(model.id)).as_scalar()
+        )
+        columns.append(
+            db.session.query(sqlalchemy.func.max(model.updated)).as_scalar()
+        )
+    version = tuple(db.session.query(*columns).one())
+
+    modified = [candidate for candidate in version[1::2] if candidate]
+    return version, max(modified) if modified else None
+
+
+def evaluate(version, modified=None):
+    '''
+    Derives an ETag for the current request from the given version of the
+    resource, and compares it - and the time the resource was last modified,
+    if known - against the validators provided by the client. If the client
+    already holds the current representation, an HTTP 304 is returned and no
+    further processing is performed.
+    '''
+    # The representation also depends on the query string, and on the format
+    # negotiated from the 'Accept' header.
+    validate(
+        hashlib.sha1(
+            repr((version, request.full_path, request.headers.get('Accept')))
+            .encode()
+        ).hexdigest(),
+        modified,
+    )
+
+
+def validate(etag, modified=None):
+    '''
+    Compares the given ETag of the current request - and the time the resource
+    was last modified, if known - against the validators provided by the
+    client, returning an HTTP 304 if the client already holds it.
+    '''
+    g.etag = etag
+    g.last_modified = modified
+
+    # Where both are provided, the ETag takes precedence over the time.
+    if request.if_none_match:
+        unchanged = request.if_none_match.contains_weak(g.etag)
+    elif request.if_modified_since and modified:
+        unchanged = modified.replace(microsecond=0) <= request.if_modified_since
+    else:
+        unchanged = False
+
+    if unchanged:
+        abort(Response(status=304))
+
+
+@router.after_request
+def apply_validators(response):
+    '''
+    Attaches the validators for the current request, if any, to the response.
+    Clients are asked to revalidate before each use, so that stale data is not
+    served from a cache.
+    '''
+    if response.status_code in (200, 304) and g.get('etag'):
+        response.set_etag(g.etag)
+        if g.last_modified:
+            response.last_modified = g.last_modified
+        response.cache_control.no_cache = True
+    return response
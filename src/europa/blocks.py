@@ -0,0 +1,245 @@
+''' Implements compressed block storage of sealed sensor data for Europa. '''
+
+import datetime
+
+import numpy
+import sqlalchemy
+
+from flask import current_app
+
+from europa import gorilla
+
+from europa.models import db
+from europa.models import Sensor
+from europa.models import SensorData
+from europa.models import SensorDataBlock
+from europa.timeseries import truncate
+from europa.timeseries import Series
+
+# Define the supported storage engines for sensor data. With 'rows', all data
+# is stored as a row per entry. With 'blocks', data older than a configurable
+# age is periodically sealed into a compressed block per sensor and window,
+# while newer data remains as rows - the open head.
+ROWS = 'rows'
+BLOCKS = 'blocks'
+
+# Define the default length of the window of each block, and the age at which
+# data is sealed, in seconds.
+DEFAULT_WINDOW = 60 * 60 * 24
+DEFAULT_SEAL_AFTER = 60 * 60 * 24 * 2
+
+# Define the number of rows to delete at a time, once sealed.
+DELETE_CHUNK_SIZE = 1000
+
+
+def enabled():
+    ''' Returns whether sealed data must be read from blocks. '''
+    return current_app.config['SENSOR_DATA_STORAGE'] == BLOCKS
+
+
+def pack(series):
+    ''' Compresses the given series into the data of a block. '''
+    return gorilla.encode(
+        series.ids,
+        series.created.astype(numpy.int64),
+        series.values,
+    )
+
+
+def unpack(data):
+    ''' Decompresses the data of a block into a series. '''
+    ids, times, values = gorilla.decode(data)
+    return Series(ids, times.astype('datetime64[us]'), values)
+
+
+def _select(sensor_ids, since=None, until=None):
+    ''' Returns a query for blocks of the given sensors which overlap a window. '''
+    query = sqlalchemy.select([
+        SensorDataBlock.sensor_id,
+        SensorDataBlock.data,
+    ]).select_from(
+        SensorDataBlock.__table__.join(
+            Sensor.__table__,
+            Sensor.id == SensorDataBlock.sensor_id,
+        )
+    ).where(
+        SensorDataBlock.sensor_id.in_(sensor_ids),
+    ).where(
+        Sensor.deleted == None,
+    )
+    if since is not None:
+        query = query.where(SensorDataBlock.end > since)
+    if until is not None:
+        query = query.where(SensorDataBlock.start < until)
+    return query.order_by(SensorDataBlock.sensor_id, SensorDataBlock.start)
+
+
+def read(sensor_ids, since=None, until=None):
+    '''
+    Returns the sealed entries of the given sensors created from 'since', and
+    before 'until', as a series for each sensor keyed by sensor ID. Sensors
+    without sealed entries in the window are omitted.
+    '''
+    decoded = {}
+    for candidate in db.session.execute(_select(sensor_ids, since, until)):
+        decoded.setdefault(candidate.sensor_id, []).append(
+            unpack(candidate.data).between(since, until)
+        )
+
+    return dict(
+        (sensor_id, Series.concatenate(candidates))
+        for sensor_id, candidates in decoded.items()
+    )
+
+
+def scan(sensor_id, since=None, until=None):
+    '''
+    Yields the sealed entries of the given sensor created from 'since', and
+    before 'until', as the start and end of each block, and a series of its
+    entries - decompressing a single block at a time.
+    '''
+    query = _select([sensor_id], since, until).with_only_columns([
+        SensorDataBlock.start,
+        SensorDataBlock.end,
+        SensorDataBlock.data,
+    ])
+    for candidate in db.session.execute(query):
+        yield (
+            candidate.start,
+            candidate.end,
+            unpack(candidate.data).between(since, until),
+        )
+
+
+def version(sensor_ids, since=None, until=None):
+    '''
+    Returns the number of blocks of the given sensors which overlap a window,
+    the number of entries they hold, and the largest block ID - which changes
+    whenever any such block is added, updated, or removed.
+    '''
+    return tuple(
+        db.session.execute(
+            _select(sensor_ids, since, until).with_only_columns([
+                sqlalchemy.func.count(),
+                sqlalchemy.func.sum(SensorDataBlock.count),
+                sqlalchemy.func.max(SensorDataBlock.id),
+            ]).order_by(None)
+        ).first()
+    )
+
+
+def _seal_window(sensor_id, start, end):
+    '''
+    Seals all rows of a given sensor within a window into its block, merging
+    them with any entries already sealed - such as when data arrives late.
+    Returns the number of rows sealed.
+    '''
+    series = Series.from_rows(
+        db.session.execute(
+            sqlalchemy.select([
+                SensorData.id,
+                SensorData.created,
+                SensorData.value,
+            ]).where(
+                SensorData.sensor_id == sensor_id,
+            ).where(
+                SensorData.created >= start,
+            ).where(
+                SensorData.created < end,
+            ).order_by(
+                SensorData.created,
+                SensorData.id,
+            )
+        )
+    )
+    if not len(series):
+        return 0
+
+    block = SensorDataBlock.query.filter(
+        SensorDataBlock.sensor_id == sensor_id,
+        SensorDataBlock.start == start,
+    ).first()
+    if block is None:
+        block = SensorDataBlock(sensor_id=sensor_id, start=start, end=end)
+        db.session.add(block)
+        merged = Series.concatenate([series])
+    else:
+        merged = Series.concatenate([unpack(block.data), series])
+
+    block.count = len(merged)
+    block.data = pack(merged)
+
+    # Only delete the rows which were sealed, rather than the entire window, as
+    # rows may have been added since they were read.
+    ids = series.ids.tolist()
+    for offset in range(0, len(ids), DELETE_CHUNK_SIZE):
+        db.session.execute(
+            SensorData.__table__.delete().where(
+                SensorData.id.in_(ids[offset:offset + DELETE_CHUNK_SIZE])
+            )
+        )
+    db.session.commit()
+    return len(ids)
+
+
+def seal(sensor_id=None, now=None):
+    '''
+    Seals sensor data older than SENSOR_DATA_SEAL_AFTER into compressed blocks,
+    optionally only for the given sensor. Each window is sealed, and committed,
+    in its own transaction. The window containing the latest entry for each
+    sensor is never sealed, so that it can always be read from the head.
+    Returns the number of entries sealed.
+    '''
+    if now is None:
+        now = datetime.datetime.utcnow()
+
+    window = current_app.config['SENSOR_DATA_BLOCK_WINDOW']
+    limit = truncate(
+        now - datetime.timedelta(
+            seconds=current_app.config['SENSOR_DATA_SEAL_AFTER']
+        ),
+        window,
+    )
+
+    query = db.session.query(
+        SensorData.sensor_id,
+        sqlalchemy.func.max(SensorData.created).label('latest'),
+    )
+    if sensor_id is not None:
+        query = query.filter(SensorData.sensor_id == sensor_id)
+    candidates = query.group_by(SensorData.sensor_id).all()
+
+    sealed = 0
+    for candidate in candidates:
+        boundary = min(limit, truncate(candidate.latest, window))
+
+        # Move from the earliest unsealed window, to the boundary, skipping any
+        # windows without data.
+        while True:
+            earliest = db.session.query(
+                sqlalchemy.func.min(SensorData.created),
+            ).filter(
+                SensorData.sensor_id == candidate.sensor_id,
+                SensorData.created < boundary,
+            ).scalar()
+            if earliest is None:
+                break
+
+            start = truncate(earliest, window)
+            sealed += _seal_window(
+                candidate.sensor_id,
+                start,
+                start + datetime.timedelta(seconds=window),
+            )
+    return sealed
+
+
+def init_app(application):
+    ''' Configures the storage engine of the given application. '''
+    application.config.setdefault('SENSOR_DATA_STORAGE', ROWS)
+    application.config.setdefault('SENSOR_DATA_BLOCK_WINDOW', DEFAULT_WINDOW)
+    application.config.setdefault('SENSOR_DATA_SEAL_AFTER', DEFAULT_SEAL_AFTER)
+    if application.config['SENSOR_DATA_STORAGE'] not in (ROWS, BLOCKS):
+        raise ValueError(
+            "SENSOR_DATA_STORAGE must be '{}' or '{}'".format(ROWS, BLOCKS)
+        )
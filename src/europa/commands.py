@@ -0,0 +1,113 @@
+''' Implements command line interface commands for The Europa project. '''
+
+import click
+
+from europa import alerts
+from europa import blocks
+from europa import rollups
+from europa import retention
+from europa import partitions
+
+
+def register(application):
+    ''' Registers all commands with the given application. '''
+
+    @application.cli.group('rollup')
+    def rollup_group():
+        ''' Manage sensor data rollups. '''
+        pass
+
+    @rollup_group.command()
+    @click.option('--sensor', type=int, help='Only rebuild the given sensor.')
+    def rebuild(sensor):
+        ''' Rebuild rollups from existing sensor data. '''
+        processed = rollups.rebuild(sensor_id=sensor)
+        click.echo('Rebuilt rollups from {} entries'.format(processed))
+
+    @application.cli.group('blocks')
+    def blocks_group():
+        ''' Manage compressed sensor data blocks. '''
+        pass
+
+    @blocks_group.command()
+    @click.option('--sensor', type=int, help='Only seal the given sensor.')
+    def seal(sensor):
+        ''' Seal old sensor data into compressed blocks. '''
+        if not blocks.enabled():
+            raise click.ClickException(
+                "SENSOR_DATA_STORAGE must be '{}' to seal data".format(
+                    blocks.BLOCKS
+                )
+            )
+        sealed = blocks.seal(sensor_id=sensor)
+        click.echo('Sealed {} entries into blocks'.format(sealed))
+
+    @application.cli.group('retention')
+    def retention_group():
+        ''' Manage sensor data retention. '''
+        pass
+
+    @retention_group.command()
+    @click.option(
+        '--batch-size',
+        type=click.IntRange(min=1),
+        default=retention.DEFAULT_BATCH_SIZE,
+        help='The number of rows to delete in each transaction.',
+    )
+    @click.option(
+        '--pause',
+        type=float,
+        default=None,
+        help='The number of seconds to pause between each transaction.',
+    )
+    def enforce(batch_size, pause):
+        ''' Delete sensor data which has expired under retention policies. '''
+        for month in retention.drop_partitions():
+            click.echo('Dropped partition {}'.format(partitions.name_for(month)))
+
+        reclaimed = retention.enforce(batch_size=batch_size, pause=pause)
+        for table, count in sorted(reclaimed.items()):
+            click.echo('Reclaimed {} rows from {}'.format(count, table))
+
+    @application.cli.group('alerts')
+    def alerts_group():
+        ''' Manage sensor data alerts. '''
+        pass
+
+    @alerts_group.command()
+    def check():
+        ''' Evaluate rules which alert when no data has been received. '''
+        for event in alerts.check():
+            click.echo(
+                'Rule {} is {} for sensor {}'.format(
+                    event.rule_id,
+                    event.state.value,
+                    event.sensor_id,
+                )
+            )
+
+    @application.cli.group('partitions')
+    def partitions_group():
+        ''' Manage sensor data partitions. '''
+        pass
+
+    @partitions_group.command()
+    @click.option(
+        '--ahead',
+        type=int,
+        default=None,
+        help='The number of months to create partitions ahead for.',
+    )
+    def create(ahead):
+        ''' Create sensor data partitions ahead of time. '''
+        manager = partitions.manager()
+        if ahead is not None:
+            manager.months_ahead = ahead
+        for month in manager.create_ahead():
+            click.echo('Created partition {}'.format(partitions.name_for(month)))
+
+    @partitions_group.command('list')
+    def list_partitions():
+        ''' List sensor data partitions. '''
+        for month in partitions.manager().partitions():
+            click.echo(partitions.name_for(month))
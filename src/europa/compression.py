@@ -0,0 +1,93 @@
+''' Implements response compression for The Europa project. '''
+
+import zlib
+
+from flask import request
+from flask import current_app
+
+# Define the mimetypes of responses which are worth compressing. Others, such
+# as images, are either already compressed or too small to benefit.
+COMPRESSIBLE_MIMETYPES = set([
+    'application/json',
+    'application/javascript',
+    'text/javascript',
+    'application/x-ndjson',
+    'application/vnd.europa.columnar+json',
+    'application/vnd.europa.binary',
+    'text/css',
+    'text/csv',
+    'text/html',
+    'text/plain',
+])
+
+# Define the smallest response which will be compressed, in bytes, and the
+# level of compression to use. Below this size, the overhead of compression
+# outweighs the saving.
+DEFAULT_MINIMUM_SIZE = 1024
+DEFAULT_LEVEL = 6
+
+
+def compress(chunks, level=DEFAULT_LEVEL, sync=False):
+    '''
+    Compresses the given iterable of bytes into a gzip stream, yielding the
+    compressed data as it becomes available rather than buffering it all. If
+    'sync' is set, all data compressed so far is yielded after each chunk, so
+    that clients receive each chunk as soon as it is produced.
+    '''
+    # A window size of 16 + 15 bits produces a gzip, rather than zlib, stream.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if sync:
+            compressed += compressor.flush(zlib.Z_SYNC_FLUSH)
+        if compressed:
+            yield compressed
+    yield compressor.flush()
+
+
+def compress_response(response):
+    '''
+    Compresses the given response with gzip, if the client accepts it and the
+    response is large enough to benefit. Streamed responses are compressed as
+    they are streamed, and so are always compressed.
+    '''
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    # The response varies by encoding, whether or not this one is compressed.
+    response.vary.add('Accept-Encoding')
+    if (
+        response.status_code < 200 or
+        response.status_code >= 300 or
+        response.status_code in (204, 206) or
+        response.direct_passthrough or
+        'Content-Encoding' in response.headers or
+        not request.accept_encodings['gzip']
+    ):
+        return response
+
+    level = current_app.config['COMPRESSION_LEVEL']
+    if response.is_streamed:
+        response.response = compress(response.iter_encoded(), level, sync=True)
+        response.headers.pop('Content-Length', None)
+    else:
+        data = response.get_data()
+        if len(data) < current_app.config['COMPRESSION_MINIMUM_SIZE']:
+            return response
+        response.set_data(b''.join(compress([data], level)))
+
+    # The compressed representation is semantically, but not byte for byte,
+    # equivalent to the original - so any ETag can only be a weak match.
+    etag, weak = response.get_etag()
+    if etag and not weak:
+        response.set_etag(etag, weak=True)
+
+    response.headers['Content-Encoding'] = 'gzip'
+    return response
+
+
+def init_app(application):
+    ''' Registers response compression with the given application. '''
+    application.config.setdefault('COMPRESSION_LEVEL', DEFAULT_LEVEL)
+    application.config.setdefault('COMPRESSION_MINIMUM_SIZE', DEFAULT_MINIMUM_SIZE)
+    application.after_request(compress_response)
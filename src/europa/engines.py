@@ -0,0 +1,170 @@
+'''
+Implements named database engine profiles for The Europa project. A profile
+tunes the connection pool, and each new connection, for a particular backend
+and deployment - such as SQLite on a small single board computer, or a shared
+PostgreSQL server.
+'''
+
+import weakref
+
+import sqlalchemy
+
+from flask_sqlalchemy import SQLAlchemy
+
+# Define the available profiles. 'options' are passed to create_engine, unless
+# already set via the SQLALCHEMY_* pool configuration, 'connect_args' are passed
+# to the DBAPI when connecting, and 'statements' are executed on each new
+# connection.
+PROFILES = {
+    'sqlite-embedded': {
+        'backend': 'sqlite',
+        'options': {
+            # Keep connections open, rather than opening the database file for
+            # every request, so that their page and statement caches are kept.
+            'poolclass': sqlalchemy.pool.QueuePool,
+            'pool_size': 5,
+            'max_overflow': 10,
+            'pool_timeout': 30,
+            'pool_pre_ping': False,
+        },
+        'connect_args': {
+            'check_same_thread': False,
+            'cached_statements': 256,
+        },
+        'statements': [
+            # Allow reads to proceed while data is written, and only sync to
+            # disk on checkpoint - which is safe in WAL mode, as a power loss
+            # may only lose the most recent transactions.
+            'PRAGMA journal_mode = WAL',
+            'PRAGMA synchronous = NORMAL',
+            # Wait for up to five seconds for another writer, rather than
+            # failing immediately with 'database is locked'.
+            'PRAGMA busy_timeout = 5000',
+            # Use an 8MiB page cache, and map up to 64MiB of the database into
+            # memory - modest, as the memory of such devices is limited.
+            'PRAGMA cache_size = -8192',
+            'PRAGMA mmap_size = 67108864',
+            'PRAGMA temp_store = MEMORY',
+        ],
+    },
+    'postgres-server': {
+        'backend': 'postgresql',
+        'options': {
+            'pool_size': 10,
+            'max_overflow': 20,
+            'pool_timeout': 30,
+            # Replace connections dropped by the server, or by the network, and
+            # connections open longer than an hour, before they are used.
+            'pool_pre_ping': True,
+            'pool_recycle': 3600,
+        },
+        'connect_args': {
+            'connect_timeout': 10,
+            'keepalives': 1,
+            'keepalives_idle': 60,
+        },
+        'statements': [],
+    },
+}
+
+# Track the engines with which the connect hook of a profile is registered.
+_configured = weakref.WeakKeyDictionary()
+
+
+def _in_memory(info):
+    ''' Returns whether the given URL is of an in-memory SQLite database. '''
+    return (
+        info.get_backend_name() == 'sqlite' and
+        info.database in (None, '', ':memory:')
+    )
+
+
+def profile(application):
+    '''
+    Returns the name, and definition, of the engine profile configured for the
+    given application - or None where no profile is configured.
+    '''
+    name = application.config['DATABASE_PROFILE']
+    if name is None:
+        return None
+    if name not in PROFILES:
+        raise ValueError(
+            "DATABASE_PROFILE must be one of '{}'".format(
+                "', '".join(sorted(PROFILES))
+            )
+        )
+    return name, PROFILES[name]
+
+
+def apply(application, info, options):
+    '''
+    Applies the options of the engine profile configured for the given
+    application to the options for a new engine for the given URL.
+    '''
+    candidate = profile(application)
+    if candidate is None:
+        return
+    name, definition = candidate
+
+    if info.get_backend_name() != definition['backend']:
+        raise ValueError(
+            "DATABASE_PROFILE '{}' requires a {} database".format(
+                name, definition['backend']
+            )
+        )
+
+    # In-memory SQLite databases must use a single, static, connection - so
+    # do not size a pool for them.
+    if not _in_memory(info):
+        for key, value in definition['options'].items():
+            options.setdefault(key, value)
+
+    connect_args = dict(definition['connect_args'])
+    connect_args.update(options.get('connect_args', {}))
+    options['connect_args'] = connect_args
+
+
+def listen(application, engine):
+    '''
+    Registers the connect hook of the engine profile configured for the given
+    application with the given engine, if not already registered.
+    '''
+    if engine in _configured:
+        return
+
+    candidate = profile(application)
+    statements = candidate[1]['statements'] if candidate is not None else []
+
+    def connect(connection, record):
+        ''' Executes the statements of the profile on each new connection. '''
+        cursor = connection.cursor()
+        try:
+            for statement in statements:
+                cursor.execute(statement)
+        finally:
+            cursor.close()
+
+    if statements:
+        sqlalchemy.event.listen(engine, 'connect', connect)
+    _configured[engine] = candidate[0] if candidate is not None else None
+
+
+class Database(SQLAlchemy):
+    ''' Extends Flask-SQLAlchemy to create engines with the configured profile. '''
+
+    def apply_driver_hacks(self, app, info, options):
+        ''' Applies the profile before the defaults of Flask-SQLAlchemy. '''
+        apply(app, info, options)
+        super(Database, self).apply_driver_hacks(app, info, options)
+
+    def get_engine(self, app=None, bind=None):
+        ''' Returns the given engine, with the connect hook of the profile. '''
+        engine = super(Database, self).get_engine(app, bind)
+        listen(self.get_app(app), engine)
+        return engine
+
+
+def init_app(application):
+    ''' Configures, and validates, the engine profile of the given application. '''
+    application.config.setdefault('DATABASE_PROFILE', None)
+    profile(application)
@@ -0,0 +1,37 @@
+''' Implements SQL expressions for use throughout The Europa project. '''
+
+from sqlalchemy import BigInteger
+from sqlalchemy.ext.compiler import compiles
+from sqlalchemy.sql.expression import FunctionElement
+
+
+class epoch_bucket(FunctionElement):
+    '''
+    Provides an expression which truncates a timestamp to the start of the
+    fixed size bucket in which it falls, as seconds since the epoch. As the
+    size of the bucket is rendered into the statement, it must be an integer.
+    '''
+    type = BigInteger()
+    name = 'epoch_bucket'
+
+    def __init__(self, column, seconds):
+        self.seconds = int(seconds)
+        super(epoch_bucket, self).__init__(column)
+
+
+@compiles(epoch_bucket)
+def compile_epoch_bucket(element, compiler, **kwargs):
+    ''' Compiles an epoch bucket expression for PostgreSQL, and others. '''
+    return 'CAST(FLOOR(EXTRACT(EPOCH FROM {0}) / {1}) * {1} AS BIGINT)'.format(
+        compiler.process(element.clauses, **kwargs),
+        element.seconds,
+    )
+
+
+@compiles(epoch_bucket, 'sqlite')
+def compile_epoch_bucket_sqlite(element, compiler, **kwargs):
+    ''' Compiles an epoch bucket expression for SQLite. '''
+    return "(CAST(strftime('%s', {0}) AS INTEGER) / {1}) * {1}".format(
+        compiler.process(element.clauses, **kwargs),
+        element.seconds,
+    )
@@ -0,0 +1,219 @@
+'''
+Implements Gorilla style compression of sensor data for Europa, as described
+in "Gorilla: A Fast, Scalable, In-Memory Time Series Database" (Pelkonen et
+al.). Timestamps and identifiers are delta-of-delta encoded, and values are
+XOR encoded against the previous value, so that regular series of slowly
+changing values compress to a few bits per entry.
+'''
+
+import struct
+
+import numpy
+
+# Define the header of each encoded block: the format version, the number of
+# entries, the number of microseconds in each unit of time, and the first ID,
+# time and value - which are stored in full.
+HEADER = struct.Struct('<BIIqqd')
+VERSION = 1
+
+# Define the units which timestamps may be encoded in. Where all timestamps
+# fall on a whole second, they are encoded in seconds, as this results in much
+# smaller deltas.
+SECOND = 1000000
+MICROSECOND = 1
+
+# Define the number of bits used to store each delta-of-delta, according to
+# the number of leading one bits before it. Deltas-of-deltas of zero are stored
+# as a single zero bit.
+INTEGER_BITS = (7, 9, 12, 64)
+
+# Define the width of the fields describing the window of meaningful bits in
+# an XOR encoded value.
+LEADING_BITS = 5
+LENGTH_BITS = 6
+MAXIMUM_LEADING = (1 << LEADING_BITS) - 1
+MASK = (1 << 64) - 1
+
+
+class BitWriter(object):
+    ''' Writes values of arbitrary bit length to a buffer, most significant first. '''
+
+    def __init__(self):
+        self.data = bytearray()
+        self.accumulator = 0
+        self.bits = 0
+
+    def write(self, value, length):
+        ''' Writes the lowest given number of bits of the value. '''
+        self.accumulator = (self.accumulator << length) | value
+        self.bits += length
+        while self.bits >= 8:
+            self.bits -= 8
+            self.data.append((self.accumulator >> self.bits) & 0xFF)
+        self.accumulator &= (1 << self.bits) - 1
+
+    def getvalue(self):
+        ''' Returns the written bits, padded with zeros to a whole byte. '''
+        if not self.bits:
+            return bytes(self.data)
+        return bytes(self.data) + bytes([self.accumulator << (8 - self.bits)])
+
+
+class BitReader(object):
+    ''' Reads values of arbitrary bit length from a buffer, most significant first. '''
+
+    def __init__(self, data, offset=0):
+        self.data = data
+        self.position = offset * 8
+
+    def bit(self):
+        ''' Reads a single bit. '''
+        position = self.position
+        self.position = position + 1
+        return (self.data[position >> 3] >> (7 - (position & 7))) & 1
+
+    def read(self, length):
+        ''' Reads the given number of bits as an unsigned integer. '''
+        start = self.position >> 3
+        end = (self.position + length + 7) >> 3
+        chunk = int.from_bytes(self.data[start:end], 'big')
+        shift = (end << 3) - self.position - length
+        self.position += length
+        return (chunk >> shift) & ((1 << length) - 1)
+
+
+def _write_integer(writer, value):
+    ''' Writes a signed delta-of-delta, using the fewest bits possible. '''
+    if value == 0:
+        writer.write(0, 1)
+        return
+
+    for index, bits in enumerate(INTEGER_BITS):
+        limit = 1 << (bits - 1)
+        if -limit <= value < limit or bits == 64:
+            # Prefix the value with one bit for each bucket skipped, and a zero
+            # if this is not the last bucket.
+            if index < len(INTEGER_BITS) - 1:
+                writer.write(((1 << (index + 1)) - 1) << 1, index + 2)
+            else:
+                writer.write((1 << len(INTEGER_BITS)) - 1, len(INTEGER_BITS))
+            writer.write(value & ((1 << bits) - 1), bits)
+            return
+
+
+def _read_integer(reader):
+    ''' Reads a signed delta-of-delta. '''
+    if not reader.bit():
+        return 0
+
+    bits = INTEGER_BITS[-1]
+    for candidate in INTEGER_BITS[:-1]:
+        if not reader.bit():
+            bits = candidate
+            break
+
+    value = reader.read(bits)
+    if value >= 1 << (bits - 1):
+        value -= 1 << bits
+    return value
+
+
+def encode(ids, times, values):
+    '''
+    Encodes the given entries into a single block. IDs and times must be given
+    as integers - the latter in microseconds since the epoch - and values as
+    floats. Entries are encoded in the order given.
+    '''
+    ids = [int(identifier) for identifier in ids]
+    times = [int(time) for time in times]
+    bits = numpy.asarray(values, dtype=numpy.float64).view(numpy.uint64).tolist()
+    if not ids:
+        raise ValueError('At least one entry is required')
+
+    unit = SECOND if all(time % SECOND == 0 for time in times) else MICROSECOND
+    if unit != MICROSECOND:
+        times = [time // unit for time in times]
+
+    writer = BitWriter()
+    for series in (ids, times):
+        previous = series[0]
+        delta = 0
+        for current in series[1:]:
+            _write_integer(writer, (current - previous) - delta)
+            delta = current - previous
+            previous = current
+
+    previous = bits[0]
+    window = None
+    for current in bits[1:]:
+        xor = current ^ previous
+        previous = current
+        if not xor:
+            writer.write(0, 1)
+            continue
+
+        leading = min(64 - xor.bit_length(), MAXIMUM_LEADING)
+        trailing = (xor & -xor).bit_length() - 1
+
+        # Reuse the window of meaningful bits of the previous value if this
+        # value fits inside of it, otherwise describe a new window.
+        if window is not None and leading >= window[0] and trailing >= window[1]:
+            writer.write(0b10, 2)
+            writer.write(xor >> window[1], 64 - window[0] - window[1])
+        else:
+            length = 64 - leading - trailing
+            writer.write(0b11, 2)
+            writer.write(leading, LEADING_BITS)
+            writer.write(length & ((1 << LENGTH_BITS) - 1), LENGTH_BITS)
+            writer.write(xor >> trailing, length)
+            window = (leading, trailing)
+
+    header = HEADER.pack(
+        VERSION,
+        len(ids),
+        unit,
+        ids[0],
+        times[0],
+        numpy.uint64(bits[0]).view(numpy.float64),
+    )
+    return header + writer.getvalue()
+
+
+def decode(data):
+    '''
+    Decodes a block, returning arrays of its IDs, times - in microseconds since
+    the epoch - and values.
+    '''
+    version, count, unit, identifier, time, value = HEADER.unpack_from(data)
+    if version != VERSION:
+        raise ValueError('Unsupported block version {}'.format(version))
+
+    reader = BitReader(data, offset=HEADER.size)
+    series = []
+    for first in (identifier, time):
+        decoded = [first]
+        previous = first
+        delta = 0
+        for _ in range(count - 1):
+            delta += _read_integer(reader)
+            previous += delta
+            decoded.append(previous)
+        series.append(decoded)
+
+    previous = int(numpy.float64(value).view(numpy.uint64))
+    bits = [previous]
+    leading = trailing = 0
+    for _ in range(count - 1):
+        if reader.bit():
+            if reader.bit():
+                leading = reader.read(LEADING_BITS)
+                length = reader.read(LENGTH_BITS) or 64
+                trailing = 64 - leading - length
+            previous ^= reader.read(64 - leading - trailing) << trailing
+        bits.append(previous)
+
+    return (
+        numpy.array(series[0], dtype=numpy.int64),
+        numpy.array(series[1], dtype=numpy.int64) * unit,
+        numpy.array(bits, dtype=numpy.uint64).view(numpy.float64),
+    )
@@ -0,0 +1,99 @@
+''' Implements a process-local cache of the latest entry for each sensor. '''
+
+import threading
+
+import sqlalchemy
+
+from flask import current_app
+
+from europa.models import db
+from europa.models import Sensor
+from europa.models import SensorData
+
+# Define the key under which the cache is registered with the application.
+EXTENSION_NAME = 'europa.latest'
+
+
+class LatestCache(object):
+    '''
+    Tracks the latest entry for each sensor, as a tuple of its creation time
+    and value. The cache is warmed from the database with a single query on
+    first use, and is then kept up to date as new entries are committed.
+    '''
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.entries = None
+
+    def warm(self):
+        ''' Loads the latest entry for every sensor from the database. '''
+        latest = sqlalchemy.select([SensorData.id]).where(
+            SensorData.sensor_id == Sensor.id,
+        ).order_by(
+            SensorData.created.desc(),
+            SensorData.id.desc(),
+        ).limit(1).correlate(Sensor).as_scalar()
+
+        # Select from sensors, so that only the latest entry for each sensor is
+        # read from the index, rather than every entry.
+        candidates = db.session.query(
+            SensorData.sensor_id,
+            SensorData.created,
+            SensorData.value,
+        ).select_from(Sensor).join(
+            SensorData,
+            SensorData.id == latest,
+        ).filter(
+            Sensor.deleted == None,
+        ).all()
+
+        with self.lock:
+            self.entries = dict(
+                (candidate.sensor_id, (candidate.created, candidate.value))
+                for candidate in candidates
+            )
+
+    def _entries(self):
+        ''' Returns all cached entries, warming the cache if required. '''
+        if self.entries is None:
+            self.warm()
+        return self.entries
+
+    def get(self, sensor_id):
+        ''' Returns the latest entry for the given sensor, if any. '''
+        return self._entries().get(sensor_id)
+
+    def all(self):
+        ''' Returns a copy of the latest entry for all sensors. '''
+        entries = self._entries()
+        with self.lock:
+            return dict(entries)
+
+    def update(self, entries):
+        ''' Updates the cache from the given, committed, sensor data mappings. '''
+        cached = self._entries()
+        with self.lock:
+            for entry in entries:
+                current = cached.get(entry['sensor_id'])
+                if current is None or entry['created'] >= current[0]:
+                    cached[entry['sensor_id']] = (
+                        entry['created'],
+                        entry['value'],
+                    )
+
+    def discard(self, sensor_id):
+        ''' Removes the given sensor from the cache. '''
+        if self.entries is None:
+            return
+        with self.lock:
+            self.entries.pop(sensor_id, None)
+
+
+def init_app(application):
+    ''' Registers a new latest entry cache with the given application. '''
+    application.extensions[EXTENSION_NAME] = LatestCache()
+
+
+def cache():
+    ''' Returns the latest entry cache for the current application. '''
+    return current_app.extensions[EXTENSION_NAME]
@@ -0,0 +1,220 @@
+''' Implements a cache of serialized metadata responses for Europa. '''
+
+import time
+import threading
+import collections
+
+from flask import current_app
+
+try:
+    import redis
+except ImportError:
+    redis = None
+
+# Define the key under which the cache is registered with the application.
+EXTENSION_NAME = 'europa.metadata'
+
+# Define the default number of responses to hold in process, and the number of
+# seconds for which a response may be served from cache.
+DEFAULT_MAXIMUM_ENTRIES = 1024
+DEFAULT_TTL = 300
+
+# Define the namespaces which cached responses are grouped into, one for each
+# resource. A response is cached in the namespace of every resource which
+# appears in it, and so is invalidated when any of them is modified.
+VESSELS = 'vessels'
+PLANTS = 'plants'
+SENSORS = 'sensors'
+CATEGORIES = 'categories'
+
+
+class MemoryBackend(object):
+    '''
+    Stores cached responses in process, in a least recently used cache of a
+    bounded size. Expired entries are discarded when next read.
+    '''
+
+    name = 'memory'
+
+    def __init__(self, maximum_entries=DEFAULT_MAXIMUM_ENTRIES):
+        self.lock = threading.Lock()
+        self.maximum_entries = maximum_entries
+        self.entries = collections.OrderedDict()
+        self.generations = collections.defaultdict(int)
+        self.evictions = 0
+
+    def get(self, key):
+        ''' Returns the value of the given key, if present and not expired. '''
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is None:
+                return None
+
+            expires, value = entry
+            if expires <= time.monotonic():
+                del self.entries[key]
+                return None
+
+            self.entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        ''' Stores the given value, evicting the least recently used if full. '''
+        with self.lock:
+            self.entries[key] = (time.monotonic() + ttl, value)
+            self.entries.move_to_end(key)
+            while len(self.entries) > self.maximum_entries:
+                self.entries.popitem(last=False)
+                self.evictions += 1
+
+    def generation(self, namespace):
+        ''' Returns the current generation of the given namespace. '''
+        return self.generations[namespace]
+
+    def advance(self, namespace):
+        ''' Advances the generation of the given namespace. '''
+        with self.lock:
+            self.generations[namespace] += 1
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class RedisBackend(object):
+    '''
+    Stores cached responses in Redis, so that they are shared between - and
+    invalidated across - all processes. Redis is expected to be configured to
+    evict the least recently used keys when full.
+    '''
+
+    name = 'redis'
+
+    def __init__(self, url):
+        self.client = redis.StrictRedis.from_url(url)
+
+    @property
+    def evictions(self):
+        ''' Returns the number of keys evicted by the Redis server, for any client. '''
+        return self.client.info('stats').get('evicted_keys', 0)
+
+    def get(self, key):
+        ''' Returns the value of the given key, if present and not expired. '''
+        return self.client.get(key)
+
+    def set(self, key, value, ttl):
+        ''' Stores the given value, to expire after the given TTL. '''
+        self.client.setex(key, ttl, value)
+
+    def generation(self, namespace):
+        ''' Returns the current generation of the given namespace. '''
+        return int(self.client.get('europa:generation:{}'.format(namespace)) or 0)
+
+    def advance(self, namespace):
+        ''' Advances the generation of the given namespace. '''
+        self.client.incr('europa:generation:{}'.format(namespace))
+
+    def __len__(self):
+        return self.client.dbsize()
+
+
+class MetadataCache(object):
+    '''
+    Caches serialized responses, grouped into namespaces. Rather than tracking
+    which responses belong to a namespace, each namespace has a generation
+    which is part of the key of every response in it. Invalidating a namespace
+    advances its generation, so that all existing responses are unreachable
+    and eventually evicted.
+    '''
+
+    def __init__(self, backend, ttl=DEFAULT_TTL):
+        self.lock = threading.Lock()
+        self.backend = backend
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def key(self, namespaces, key):
+        '''
+        Returns the key of a response in the current generation. Responses
+        built after the key is taken must be stored under that key, so that a
+        response which was invalidated while being built is never reachable.
+        '''
+        generations = [
+            '{}.{}'.format(namespace, self.backend.generation(namespace))
+            for namespace in sorted(namespaces)
+        ]
+        return 'europa:{}:{}'.format(':'.join(generations), key)
+
+    def fetch(self, key):
+        ''' Returns the cached response for the given generation key, if any. '''
+        value = self.backend.get(key)
+        with self.lock:
+            if value is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return value
+
+    def store(self, key, value):
+        ''' Caches the given response under the given generation key. '''
+        self.backend.set(key, value, self.ttl)
+
+    def get(self, namespaces, key):
+        ''' Returns the cached response for the given key, if any. '''
+        return self.fetch(self.key(namespaces, key))
+
+    def set(self, namespaces, key, value):
+        ''' Caches the given response for the given key. '''
+        self.store(self.key(namespaces, key), value)
+
+    def invalidate(self, *namespaces):
+        ''' Invalidates all cached responses in the given namespaces. '''
+        for namespace in namespaces:
+            self.backend.advance(namespace)
+        with self.lock:
+            self.invalidations += len(namespaces)
+
+    def stats(self):
+        ''' Returns the counters for this cache, in this process. '''
+        return {
+            'backend': self.backend.name,
+            'entries': len(self.backend),
+            'hits': self.hits,
+            'misses': self.misses,
+            'evictions': self.backend.evictions,
+            'invalidations': self.invalidations,
+        }
+
+
+def init_app(application):
+    '''
+    Registers a new metadata cache with the given application. Responses are
+    cached in process unless 'METADATA_CACHE_REDIS_URL' is configured.
+    '''
+    application.config.setdefault('METADATA_CACHE_TTL', DEFAULT_TTL)
+    application.config.setdefault(
+        'METADATA_CACHE_MAXIMUM_ENTRIES',
+        DEFAULT_MAXIMUM_ENTRIES,
+    )
+    application.config.setdefault('METADATA_CACHE_REDIS_URL', None)
+
+    url = application.config['METADATA_CACHE_REDIS_URL']
+    if url is None:
+        backend = MemoryBackend(
+            application.config['METADATA_CACHE_MAXIMUM_ENTRIES']
+        )
+    elif redis is None:
+        raise RuntimeError('The redis package is required to use a Redis cache')
+    else:
+        backend = RedisBackend(url)
+
+    application.extensions[EXTENSION_NAME] = MetadataCache(
+        backend,
+        ttl=application.config['METADATA_CACHE_TTL'],
+    )
+
+
+def cache():
+    ''' Returns the metadata cache for the current application. '''
+    return current_app.extensions[EXTENSION_NAME]
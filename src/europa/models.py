@@ -3,14 +3,14 @@
 import datetime
 import enum
 
-from flask_sqlalchemy import SQLAlchemy
+from europa.engines import Database
 
 # Define formats to use when serializing / deserializing data into and from
 # the defined models.
 SERIALIZABLE_DATE_FORMAT = '%Y-%m-%dT%H:%M:%S'
 
 # Define SQLAlchemy here, with the application context to be loaded in later.
-db = SQLAlchemy()
+db = Database()
 
 def from_datetime(source=None):
     ''' Attempts to format an input datetime object into a string. '''
@@ -30,6 +30,20 @@ class VesselSize(enum.Enum):
     POT_TWELVE_CM = 'Pot (12CM)'
 
 
+class AlertKind(enum.Enum):
+    ''' Define supported types for the Alert Rule kind. '''
+    THRESHOLD = 'threshold'
+    RATE = 'rate'
+    DEVIATION = 'deviation'
+    STALE = 'stale'
+
+
+class AlertState(enum.Enum):
+    ''' Define supported types for the Alert Event state. '''
+    ALERTING = 'alerting'
+    RESOLVED = 'resolved'
+
+
 class Vessel(db.Model):
     ''' Implements the Vessels model for Europa. '''
     id = db.Column(db.Integer, primary_key=True)
@@ -37,6 +51,7 @@ class Vessel(db.Model):
     size = db.Column(db.Enum(VesselSize), nullable=False)
     location = db.Column(db.String(200), unique=False, nullable=False)
     created = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     deleted = db.Column(db.DateTime)
 
     # Enforce a unique constraint between location and name.
@@ -63,6 +78,7 @@ class Plant(db.Model):
     description = db.Column(db.String(200), unique=False, nullable=True)
     vessel_id = db.Column(db.Integer, db.ForeignKey('vessel.id'), nullable=False)
     created = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     deleted = db.Column(db.DateTime)
 
     # Map the reverse for the relationship.
@@ -92,6 +108,7 @@ class Sensor(db.Model):
     category_id = db.Column(db.Integer, db.ForeignKey('sensor_category.id'), nullable=False)
     vessel_id = db.Column(db.Integer, db.ForeignKey('vessel.id'), nullable=False)
     created = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     deleted = db.Column(db.DateTime)
 
     # Map the reverse for the relationship.
@@ -116,6 +133,7 @@ class SensorCategory(db.Model):
     name = db.Column(db.String(200), unique=False, nullable=False)
     units = db.Column(db.String(100), nullable=False)
     created = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
     deleted = db.Column(db.DateTime)
 
     def for_json(self):
@@ -139,14 +157,177 @@ class SensorData(db.Model):
     # Map the reverse for the relationship.
     sensor = db.relationship('Sensor', backref='data')
 
-    # Ensure that there is an index on the sensor ID.
+    # Ensure that there is an index on the sensor ID and creation time, as data
+    # is almost always retrieved for a given sensor over a window of time.
+    __table_args__ = (
+        db.Index('sensor_id_created_idx', 'sensor_id', 'created'),
+    )
+
+    def for_json(self):
+        ''' Provide a result in a JSON serializable format. '''
+        return {
+            'value': self.value,
+            'created': from_datetime(self.created),
+        }
+
+
+class SensorDataRollup(db.Model):
+    ''' Implements the Sensor Data Rollup model for Europa. '''
+    id = db.Column(db.Integer, primary_key=True)
+    sensor_id = db.Column(db.Integer, db.ForeignKey('sensor.id'), nullable=False)
+    resolution = db.Column(db.Integer, nullable=False)
+    bucket = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+    total = db.Column(db.Float, nullable=False)
+    minimum = db.Column(db.Float, nullable=False)
+    maximum = db.Column(db.Float, nullable=False)
+    last_value = db.Column(db.Float, nullable=False)
+    last_created = db.Column(db.DateTime, nullable=False)
+
+    # Map the reverse for the relationship.
+    sensor = db.relationship('Sensor', backref='rollups')
+
+    # Ensure there is only one rollup per sensor, resolution and bucket. This
+    # also provides the index used to read rollups for a window of time.
+    __table_args__ = (
+        db.UniqueConstraint('sensor_id', 'resolution', 'bucket'),
+    )
+
+
+class SensorDataBlock(db.Model):
+    '''
+    Implements the Sensor Data Block model for Europa. Each block holds all
+    sealed sensor data for a sensor within a window of time, compressed.
+    '''
+    id = db.Column(db.Integer, primary_key=True)
+    sensor_id = db.Column(db.Integer, db.ForeignKey('sensor.id'), nullable=False)
+    start = db.Column(db.DateTime, nullable=False)
+    end = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False)
+    data = db.Column(db.LargeBinary, nullable=False)
+
+    # Map the reverse for the relationship.
+    sensor = db.relationship('Sensor', backref='blocks')
+
+    # Ensure there is only one block per sensor and window. This also provides
+    # the index used to read blocks for a window of time.
     __table_args__ = (
-        db.Index('sensor_id_idx', 'sensor_id'),
+        db.UniqueConstraint('sensor_id', 'start'),
     )
 
+
+class RetentionPolicy(db.Model):
+    '''
+    Implements the Retention Policy model for Europa. A policy applies to a
+    sensor, all sensors in a category, or - if neither is set - all sensors,
+    with the most specific policy taking precedence. Each field is the number
+    of days for which data at that resolution is kept, or forever if unset.
+    '''
+    id = db.Column(db.Integer, primary_key=True)
+    sensor_id = db.Column(db.Integer, db.ForeignKey('sensor.id'), nullable=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('sensor_category.id'), nullable=True)
+    raw = db.Column(db.Integer, nullable=True)
+    minutely = db.Column(db.Integer, nullable=True)
+    hourly = db.Column(db.Integer, nullable=True)
+    daily = db.Column(db.Integer, nullable=True)
+    created = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    deleted = db.Column(db.DateTime)
+
+    # Map the reverse for the relationship.
+    sensor = db.relationship('Sensor', backref='retention_policies')
+    category = db.relationship('SensorCategory', backref='retention_policies')
+
     def for_json(self):
         ''' Provide a result in a JSON serializable format. '''
         return {
+            'id': self.id,
+            'sensor': self.sensor_id,
+            'category': self.category_id,
+            'raw': self.raw,
+            'minutely': self.minutely,
+            'hourly': self.hourly,
+            'daily': self.daily,
+            'created': from_datetime(self.created),
+            'deleted': from_datetime(self.deleted),
+        }
+
+
+class AlertRule(db.Model):
+    '''
+    Implements the Alert Rule model for Europa. A rule applies to a sensor, all
+    sensors in a category, or - if neither is set - all sensors. Which fields
+    are used depends on the kind of rule:
+
+      threshold - Alerts while a value is below 'minimum', or above 'maximum'.
+      rate      - Alerts while values change by more than 'limit' per minute.
+      deviation - Alerts while a value is more than 'limit' standard deviations
+                  from the exponentially weighted moving average of previous
+                  values, which is weighted by 'alpha'.
+      stale     - Alerts while no data has been received for 'minutes'.
+    '''
+    id = db.Column(db.Integer, primary_key=True)
+    sensor_id = db.Column(db.Integer, db.ForeignKey('sensor.id'), nullable=True)
+    category_id = db.Column(db.Integer, db.ForeignKey('sensor_category.id'), nullable=True)
+    kind = db.Column(db.Enum(AlertKind), nullable=False)
+    minimum = db.Column(db.Float, nullable=True)
+    maximum = db.Column(db.Float, nullable=True)
+    limit = db.Column(db.Float, nullable=True)
+    alpha = db.Column(db.Float, nullable=True)
+    minutes = db.Column(db.Integer, nullable=True)
+    created = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+    updated = db.Column(db.DateTime, default=datetime.datetime.utcnow, onupdate=datetime.datetime.utcnow)
+    deleted = db.Column(db.DateTime)
+
+    # Map the reverse for the relationship.
+    sensor = db.relationship('Sensor', backref='alert_rules')
+    category = db.relationship('SensorCategory', backref='alert_rules')
+
+    def for_json(self):
+        ''' Provide a result in a JSON serializable format. '''
+        return {
+            'id': self.id,
+            'sensor': self.sensor_id,
+            'category': self.category_id,
+            'kind': self.kind.value,
+            'minimum': self.minimum,
+            'maximum': self.maximum,
+            'limit': self.limit,
+            'alpha': self.alpha,
+            'minutes': self.minutes,
+            'created': from_datetime(self.created),
+            'deleted': from_datetime(self.deleted),
+        }
+
+
+class AlertEvent(db.Model):
+    '''
+    Implements the Alert Event model for Europa. An event is recorded each time
+    a rule starts, or stops, alerting for a sensor.
+    '''
+    id = db.Column(db.Integer, primary_key=True)
+    rule_id = db.Column(db.Integer, db.ForeignKey('alert_rule.id'), nullable=False)
+    sensor_id = db.Column(db.Integer, db.ForeignKey('sensor.id'), nullable=False)
+    state = db.Column(db.Enum(AlertState), nullable=False)
+    value = db.Column(db.Float, nullable=True)
+    created = db.Column(db.DateTime, default=datetime.datetime.utcnow)
+
+    # Map the reverse for the relationship.
+    rule = db.relationship('AlertRule', backref='events')
+    sensor = db.relationship('Sensor', backref='alert_events')
+
+    # Events are retrieved in order, and by the rule and sensor they are for.
+    __table_args__ = (
+        db.Index('alert_event_rule_id_sensor_id_idx', 'rule_id', 'sensor_id'),
+    )
+
+    def for_json(self):
+        ''' Provide a result in a JSON serializable format. '''
+        return {
+            'id': self.id,
+            'rule': self.rule_id,
+            'sensor': self.sensor_id,
+            'state': self.state.value,
             'value': self.value,
             'created': from_datetime(self.created),
         }
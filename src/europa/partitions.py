@@ -0,0 +1,248 @@
+''' Implements monthly time partitioning of sensor data for Europa. '''
+
+import re
+import datetime
+import threading
+
+import sqlalchemy
+
+from flask import current_app
+
+from europa.models import db
+from europa.models import SensorData
+
+# Define the key under which the manager is registered with the application.
+EXTENSION_NAME = 'europa.partitions'
+
+# Define the default number of months for which partitions are created ahead
+# of time, so that partitions rarely need to be created during ingest.
+DEFAULT_MONTHS_AHEAD = 3
+
+# Define the format of the name of each monthly partition.
+PARENT = SensorData.__tablename__
+PARTITION_FORMAT = '{}_y{:04d}m{:02d}'
+PARTITION_NAME = re.compile(r'^{}_y(\d{{4}})m(\d{{2}})$'.format(PARENT))
+
+# Define the SQLSTATE of the error raised when no partition holds a row, which
+# is that of any check violation - so the message is also matched.
+MISSING_PARTITION_CODE = '23514'
+MISSING_PARTITION_MESSAGE = 'no partition of relation'
+
+
+def month_of(moment):
+    ''' Returns the start of the month containing the given time. '''
+    return datetime.datetime(moment.year, moment.month, 1)
+
+
+def next_month(month):
+    ''' Returns the start of the month after the given month. '''
+    if month.month == 12:
+        return datetime.datetime(month.year + 1, 1, 1)
+    return datetime.datetime(month.year, month.month + 1, 1)
+
+
+def months(start, end):
+    ''' Returns the start of each month from the given start, to the end. '''
+    candidates = []
+    month = month_of(start)
+    while month <= end:
+        candidates.append(month)
+        month = next_month(month)
+    return candidates
+
+
+def name_for(month):
+    ''' Returns the name of the partition which holds the given month. '''
+    return PARTITION_FORMAT.format(PARENT, month.year, month.month)
+
+
+def month_for(name):
+    ''' Returns the month held by the named partition, or None if unknown. '''
+    match = PARTITION_NAME.match(name)
+    if not match:
+        return None
+    return datetime.datetime(int(match.group(1)), int(match.group(2)), 1)
+
+
+def create_statement(month):
+    ''' Returns the statement which creates the partition for a given month. '''
+    return sqlalchemy.text(
+        "CREATE TABLE IF NOT EXISTS {} PARTITION OF {} "
+        "FOR VALUES FROM ('{:%Y-%m-%d}') TO ('{:%Y-%m-%d}')".format(
+            name_for(month),
+            PARENT,
+            month,
+            next_month(month),
+        )
+    )
+
+
+def drop_statement(month):
+    ''' Returns the statement which drops the partition for a given month. '''
+    return sqlalchemy.text('DROP TABLE IF EXISTS {}'.format(name_for(month)))
+
+
+def missing(err):
+    ''' Returns whether the given error was raised as no partition held a row. '''
+    original = getattr(err, 'orig', None)
+    return (
+        getattr(original, 'pgcode', None) == MISSING_PARTITION_CODE and
+        MISSING_PARTITION_MESSAGE in str(original)
+    )
+
+
+def _partitioned():
+    ''' Returns whether sensor data is stored in a partitioned table. '''
+    if db.engine.dialect.name != 'postgresql':
+        return False
+
+    return bool(
+        db.session.execute(
+            sqlalchemy.text(
+                'SELECT EXISTS ('
+                'SELECT 1 FROM pg_partitioned_table '
+                'WHERE partrelid = to_regclass(:name))'
+            ),
+            {'name': PARENT},
+        ).scalar()
+    )
+
+
+def _existing():
+    ''' Returns the month held by each existing partition. '''
+    candidates = db.session.execute(
+        sqlalchemy.text(
+            'SELECT child.relname FROM pg_inherits '
+            'JOIN pg_class child ON child.oid = pg_inherits.inhrelid '
+            'WHERE pg_inherits.inhparent = to_regclass(:name)'
+        ),
+        {'name': PARENT},
+    ).fetchall()
+
+    existing = set()
+    for candidate in candidates:
+        month = month_for(candidate[0])
+        if month is not None:
+            existing.add(month)
+    return existing
+
+
+class PartitionManager(object):
+    '''
+    Manages the monthly partitions of sensor data, where the database supports
+    native partitioning - PostgreSQL 11 and newer. Queries which are limited to
+    a range of time only read the partitions which overlap it, and partitions
+    which have entirely expired can be dropped, rather than deleted a row at a
+    time. Where sensor data is not partitioned, such as on SQLite, all
+    operations do nothing.
+
+    Partitions are created ahead of time, and also on demand for any month
+    which new data is submitted for, so that no entry is ever rejected.
+    '''
+
+    def __init__(self, months_ahead=DEFAULT_MONTHS_AHEAD):
+        self.lock = threading.Lock()
+        self.months_ahead = months_ahead
+        self.enabled = None
+        self.existing = None
+
+    def _load(self):
+        ''' Returns the months which partitions exist for, if partitioned. '''
+        if self.enabled is None:
+            self.enabled = _partitioned()
+        if self.enabled and self.existing is None:
+            self.existing = _existing()
+        return self.existing
+
+    def refresh(self):
+        '''
+        Reloads the months which partitions exist for, as partitions may have
+        been dropped by another process since they were loaded.
+        '''
+        with self.lock:
+            self.existing = None
+        return self._load()
+
+    def partitions(self):
+        ''' Returns the month held by each partition, in order. '''
+        existing = self._load()
+        if existing is None:
+            return []
+        return sorted(existing)
+
+    def create(self, candidates):
+        '''
+        Creates a partition for each of the given months which does not exist,
+        returning the months created.
+        '''
+        existing = self._load()
+        if existing is None:
+            return []
+
+        created = []
+        with self.lock:
+            for month in sorted(set(candidates) - existing):
+                db.session.execute(create_statement(month))
+                created.append(month)
+            if created:
+                db.session.commit()
+                existing.update(created)
+        return created
+
+    def create_ahead(self, now=None):
+        '''
+        Creates partitions for the current month, and the configured number of
+        months ahead, returning the months created.
+        '''
+        if now is None:
+            now = datetime.datetime.utcnow()
+
+        end = month_of(now)
+        for _ in range(self.months_ahead):
+            end = next_month(end)
+        return self.create(months(now, end))
+
+    def ensure(self, entries):
+        ''' Ensures partitions exist for the given sensor data mappings. '''
+        existing = self._load()
+        if existing is None:
+            return
+
+        candidates = set(month_of(entry['created']) for entry in entries)
+        if not candidates.issubset(existing):
+            self.create(candidates)
+
+    def drop(self, before):
+        '''
+        Drops each partition which only holds data from before the given time,
+        returning the months dropped. Each is dropped in constant time, rather
+        than by deleting every entry it holds.
+        '''
+        existing = self._load()
+        if existing is None:
+            return []
+
+        dropped = []
+        with self.lock:
+            for month in sorted(existing):
+                if next_month(month) > before:
+                    break
+                db.session.execute(drop_statement(month))
+                dropped.append(month)
+            if dropped:
+                db.session.commit()
+                existing.difference_update(dropped)
+        return dropped
+
+
+def init_app(application):
+    ''' Registers a new partition manager with the given application. '''
+    application.config.setdefault('PARTITION_MONTHS_AHEAD', DEFAULT_MONTHS_AHEAD)
+    application.extensions[EXTENSION_NAME] = PartitionManager(
+        months_ahead=application.config['PARTITION_MONTHS_AHEAD'],
+    )
+
+
+def manager():
+    ''' Returns the partition manager for the current application. '''
+    return current_app.extensions[EXTENSION_NAME]
@@ -0,0 +1,428 @@
+'''
+Implements a store of the recent data of each sensor for Europa, held in a
+fixed size, memory-mapped, ring buffer per sensor. As the buffers are files,
+they are shared by all processes which are configured with the same path.
+'''
+
+import os
+import mmap
+import fcntl
+import struct
+import contextlib
+import threading
+
+import numpy
+import sqlalchemy
+
+from flask import current_app
+
+from europa.models import db
+from europa.models import Sensor
+from europa.models import SensorData
+from europa.timeseries import Series
+
+# Define the key under which the store is registered with the application.
+EXTENSION_NAME = 'europa.recent'
+
+# Define the default number of entries held for each sensor.
+DEFAULT_CAPACITY = 4096
+
+# Define the number of times a read is attempted while the buffer is being
+# written, before reading from the database instead.
+READ_ATTEMPTS = 1000
+
+# Define the header of each buffer: a magic number and version, the number of
+# entries which may be held, whether the buffer is valid, a sequence number
+# which is odd while the buffer is being written, the number of times the
+# buffer has been built, the number of entries appended since, and the time of
+# the latest entry which is no longer held - before which the buffer is
+# incomplete.
+HEADER = struct.Struct('<4sIIIQQQq')
+MAGIC = b'EURB'
+VERSION = 1
+
+# Define the value of 'covered' where the buffer holds every entry ever stored
+# for the sensor.
+COMPLETE = numpy.iinfo(numpy.int64).min
+
+# Entries are appended without their ID, so use the largest possible ID in its
+# place. A cursor at such an entry resumes after all entries created at the
+# same time.
+UNKNOWN_ID = numpy.iinfo(numpy.int64).max
+
+
+def _to_epoch(moment):
+    ''' Converts a naive UTC datetime into microseconds since the epoch. '''
+    return int(numpy.datetime64(moment, 'us').astype(numpy.int64))
+
+
+class RingBuffer(object):
+    '''
+    Holds the most recent entries of a single sensor as packed arrays of times,
+    in microseconds since the epoch, and values - in the order created. Writes
+    are serialized across processes with a file lock; reads take no lock, and
+    retry if the buffer was written to while being read.
+    '''
+
+    def __init__(self, path, capacity):
+        self.path = path
+        self.lock = threading.Lock()
+
+        # Create the file if required, sized for the given capacity. Buffers of
+        # a different capacity are recreated, and must be rebuilt.
+        size = HEADER.size + capacity * 16
+        descriptor = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            if os.fstat(descriptor).st_size != size:
+                os.ftruncate(descriptor, 0)
+                os.ftruncate(descriptor, size)
+            self.buffer = mmap.mmap(descriptor, size)
+        finally:
+            os.close(descriptor)
+
+        self.capacity = capacity
+        self.times = numpy.frombuffer(
+            self.buffer,
+            dtype=numpy.int64,
+            count=capacity,
+            offset=HEADER.size,
+        )
+        self.values = numpy.frombuffer(
+            self.buffer,
+            dtype=numpy.float64,
+            count=capacity,
+            offset=HEADER.size + capacity * 8,
+        )
+
+    def _header(self):
+        ''' Returns the fields of the header, or None if not yet written. '''
+        fields = HEADER.unpack_from(self.buffer)
+        magic, version, capacity = fields[:3]
+        if magic != MAGIC or version != VERSION or capacity != self.capacity:
+            return None
+        return fields[3:]
+
+    def _write_header(self, valid, sequence, generation, count, covered):
+        ''' Writes the given fields of the header. '''
+        HEADER.pack_into(
+            self.buffer,
+            0,
+            MAGIC,
+            VERSION,
+            self.capacity,
+            valid,
+            sequence,
+            generation,
+            count,
+            covered,
+        )
+
+    @contextlib.contextmanager
+    def _exclusive(self):
+        ''' Holds both the process, and file, lock for the duration. '''
+        with self.lock:
+            with open(self.path, 'rb') as handle:
+                fcntl.flock(handle, fcntl.LOCK_EX)
+                try:
+                    yield
+                finally:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _write(self, write):
+        '''
+        Calls the given function with the current header fields, with the
+        sequence number odd for the duration - so that readers can detect the
+        write. The caller must hold the exclusive lock.
+        '''
+        header = self._header() or (0, 0, 0, 0, COMPLETE)
+        valid, sequence, generation, count, covered = header
+        self._write_header(valid, sequence + 1, generation, count, covered)
+        valid, generation, count, covered = write(
+            valid, generation, count, covered
+        )
+        self._write_header(valid, sequence + 2, generation, count, covered)
+
+    def _locked(self, write):
+        ''' Calls the given function as a write, holding the exclusive lock. '''
+        with self._exclusive():
+            self._write(write)
+
+    def valid(self):
+        ''' Returns whether the buffer has been built, and not invalidated. '''
+        header = self._header()
+        return header is not None and bool(header[0])
+
+    def rebuild(self, load):
+        '''
+        Replaces the contents of the buffer with the entries returned by the
+        given function, as times and values in order, and whether they are
+        every entry of the sensor - otherwise only the time after the first
+        entry is considered complete. The function is called while holding the
+        exclusive lock, so that no entries are appended between loading and
+        writing them - which would otherwise be lost.
+        '''
+        def write(valid, generation, count, covered):
+            self.times[:len(times)] = times
+            self.values[:len(values)] = values
+            if complete or not len(times):
+                return 1, generation + 1, len(times), COMPLETE
+            return 1, generation + 1, len(times), int(times[0])
+
+        with self._exclusive():
+            times, values, complete = load()
+            times = times[-self.capacity:]
+            values = values[-self.capacity:]
+            self._write(write)
+
+    def append(self, times, values):
+        '''
+        Appends the given entries, which must be in order, to the buffer -
+        overwriting the oldest entries once full. Returns False, and leaves the
+        buffer unchanged, if any entry is older than the latest entry held.
+        '''
+        appended = []
+
+        def write(valid, generation, count, covered):
+            if not valid:
+                return valid, generation, count, covered
+            if count and times[0] < self.times[(count - 1) % self.capacity]:
+                return valid, generation, count, covered
+
+            for time, value in zip(times, values):
+                position = count % self.capacity
+                if count >= self.capacity:
+                    covered = int(self.times[position])
+                self.times[position] = time
+                self.values[position] = value
+                count += 1
+            appended.append(True)
+            return valid, generation, count, covered
+
+        self._locked(write)
+        return bool(appended)
+
+    def invalidate(self):
+        ''' Marks the buffer as invalid, until rebuilt. '''
+        self._locked(
+            lambda valid, generation, count, covered: (
+                0, generation, count, covered
+            )
+        )
+
+    def read(self, since, until=None):
+        '''
+        Returns the entries created from 'since', and before 'until', and the
+        version of the buffer - or None if the buffer is not valid, or does not
+        hold every entry in the window.
+        '''
+        since = _to_epoch(since)
+        until = _to_epoch(until) if until is not None else None
+
+        for _ in range(READ_ATTEMPTS):
+            header = self._header()
+            if header is None:
+                return None
+            valid, sequence, generation, count, covered = header
+            if sequence % 2:
+                continue
+            if not valid or since <= covered:
+                return None
+
+            # Select the window from the oldest entry, to the newest, copying
+            # it out of the buffer so that it is not changed while in use.
+            held = min(count, self.capacity)
+            start = count % self.capacity if count > self.capacity else 0
+            order = (numpy.arange(held) + start) % self.capacity
+            times = self.times[order]
+            values = self.values[order]
+
+            # Only use the copy if the buffer was not written to meanwhile.
+            if self._header() != header:
+                continue
+
+            # The version changes as entries are appended, and as entries leave
+            # the window.
+            lower = int(numpy.searchsorted(times, since, side='left'))
+            upper = held
+            if until is not None:
+                upper = int(numpy.searchsorted(times, until, side='left'))
+            return (
+                times[lower:upper],
+                values[lower:upper],
+                (generation, count, upper - lower),
+            )
+        return None
+
+
+class RecentStore(object):
+    '''
+    Manages the ring buffers of all sensors, held in the given directory. The
+    buffers are built from the database on first use, or when rebuilt, and are
+    then appended to as new entries are committed. Where entries arrive out of
+    order, the buffer of the sensor is rebuilt.
+    '''
+
+    def __init__(self, path, capacity=DEFAULT_CAPACITY):
+        self.path = path
+        self.capacity = capacity
+        self.lock = threading.Lock()
+        self.buffers = {}
+
+    def _buffer(self, sensor_id, create=False):
+        ''' Returns the buffer of the given sensor, opening it if required. '''
+        with self.lock:
+            candidate = self.buffers.get(sensor_id)
+            if candidate is not None:
+                return candidate
+
+            path = os.path.join(self.path, 'sensor-{}.ring'.format(sensor_id))
+            if not create and not os.path.exists(path):
+                return None
+            candidate = RingBuffer(path, self.capacity)
+            self.buffers[sensor_id] = candidate
+            return candidate
+
+    def rebuild(self, sensor_id):
+        '''
+        Rebuilds the buffer of the given sensor from the database. Deleted
+        sensors are rebuilt without entries, as their data is not served.
+        '''
+        query = sqlalchemy.select([
+            SensorData.created,
+            SensorData.value,
+        ]).select_from(
+            SensorData.__table__.join(
+                Sensor.__table__,
+                Sensor.id == SensorData.sensor_id,
+            )
+        ).where(
+            SensorData.sensor_id == sensor_id,
+        ).where(
+            Sensor.deleted == None,
+        ).order_by(
+            SensorData.created.desc(),
+            SensorData.id.desc(),
+        ).limit(self.capacity)
+
+        def load():
+            # Read with a connection of its own, rather than the session, so
+            # that entries committed since the session began are included.
+            with db.engine.connect() as connection:
+                candidates = connection.execute(query).fetchall()
+            candidates.reverse()
+
+            series = Series.from_rows(
+                [(UNKNOWN_ID, created, value) for created, value in candidates]
+            )
+            return (
+                series.created.astype(numpy.int64),
+                series.values,
+                len(candidates) < self.capacity,
+            )
+
+        self._buffer(sensor_id, create=True).rebuild(load)
+
+    def warm(self):
+        ''' Rebuilds the buffers of all sensors with data from the database. '''
+        candidates = db.session.query(SensorData.sensor_id).join(
+            Sensor,
+            Sensor.id == SensorData.sensor_id,
+        ).filter(
+            Sensor.deleted == None,
+        ).distinct()
+        for candidate in candidates:
+            self.rebuild(candidate.sensor_id)
+
+    def append(self, entries):
+        ''' Appends the given, committed, sensor data mappings to the buffers. '''
+        grouped = {}
+        for entry in sorted(entries, key=lambda entry: entry['created']):
+            grouped.setdefault(entry['sensor_id'], []).append(entry)
+
+        for sensor_id, candidates in grouped.items():
+            buffer = self._buffer(sensor_id)
+            if buffer is None or not buffer.valid() or not buffer.append(
+                [_to_epoch(entry['created']) for entry in candidates],
+                [entry['value'] for entry in candidates],
+            ):
+                # As the entries are committed, the rebuilt buffer holds them.
+                self.rebuild(sensor_id)
+
+    def discard(self, sensor_id):
+        ''' Ensures the buffer of the given sensor is no longer read from. '''
+        buffer = self._buffer(sensor_id)
+        if buffer is not None:
+            buffer.invalidate()
+
+    def read(self, sensor_id, since, until=None):
+        '''
+        Returns the entries of the given sensor created from 'since', and before
+        'until', as a series, and a version which changes whenever the entries
+        in the window change - or None if the buffer does not hold every entry
+        in the window.
+        '''
+        buffer = self._buffer(sensor_id)
+        if buffer is None:
+            return None
+
+        candidate = buffer.read(since, until)
+        if candidate is None:
+            return None
+
+        times, values, version = candidate
+        series = Series(
+            numpy.full(len(times), UNKNOWN_ID, dtype=numpy.int64),
+            times.astype('datetime64[us]'),
+            values,
+        )
+        return series, version
+
+
+class DisabledStore(object):
+    ''' Stands in for the store where no path is configured. '''
+
+    def warm(self):
+        ''' Does nothing, as there are no buffers. '''
+        pass
+
+    def append(self, entries):
+        ''' Does nothing, as there are no buffers. '''
+        pass
+
+    def rebuild(self, sensor_id):
+        ''' Does nothing, as there are no buffers. '''
+        pass
+
+    def discard(self, sensor_id):
+        ''' Does nothing, as there are no buffers. '''
+        pass
+
+    def read(self, sensor_id, since, until=None):
+        ''' Returns None, as no entries are held. '''
+        return None
+
+
+def init_app(application):
+    '''
+    Registers a new recent data store with the given application. The store is
+    only enabled where RECENT_STORE_PATH is set.
+    '''
+    application.config.setdefault('RECENT_STORE_PATH', None)
+    application.config.setdefault('RECENT_STORE_CAPACITY', DEFAULT_CAPACITY)
+
+    path = application.config['RECENT_STORE_PATH']
+    if path is None:
+        application.extensions[EXTENSION_NAME] = DisabledStore()
+        return
+
+    if not os.path.isdir(path):
+        os.makedirs(path)
+    application.extensions[EXTENSION_NAME] = RecentStore(
+        path,
+        capacity=application.config['RECENT_STORE_CAPACITY'],
+    )
+
+
+def store():
+    ''' Returns the recent data store for the current application. '''
+    return current_app.extensions[EXTENSION_NAME]
@@ -0,0 +1,187 @@
+''' Implements enforcement of sensor data retention policies for Europa. '''
+
+import time
+import datetime
+
+import sqlalchemy
+
+from europa import recent
+from europa import partitions
+
+from europa.models import db
+from europa.models import Sensor
+from europa.models import SensorData
+from europa.models import SensorDataRollup
+from europa.models import SensorDataBlock
+from europa.models import RetentionPolicy
+
+# Define the default number of rows to delete in each transaction.
+DEFAULT_BATCH_SIZE = 1000
+
+# Map each retention policy field to the resolution of the rollups it applies
+# to. Raw sensor data has no resolution.
+RESOLUTIONS = (
+    ('raw', None),
+    ('minutely', 60),
+    ('hourly', 60 * 60),
+    ('daily', 60 * 60 * 24),
+)
+
+
+def policies():
+    '''
+    Returns the retention policy which applies to each sensor, keyed by the
+    sensor ID. Sensors with no applicable policy are omitted.
+    '''
+    default = None
+    categories = {}
+    sensors = {}
+
+    # Where more than one policy exists for the same scope, the most recently
+    # created policy is used.
+    for policy in RetentionPolicy.query.filter(
+        RetentionPolicy.deleted == None,
+    ).order_by(RetentionPolicy.id).all():
+        if policy.sensor_id is not None:
+            sensors[policy.sensor_id] = policy
+        elif policy.category_id is not None:
+            categories[policy.category_id] = policy
+        else:
+            default = policy
+
+    applicable = {}
+    for sensor_id, category_id in db.session.query(
+        Sensor.id,
+        Sensor.category_id,
+    ).all():
+        policy = sensors.get(sensor_id, categories.get(category_id, default))
+        if policy is not None:
+            applicable[sensor_id] = policy
+    return applicable
+
+
+def expired_before(now=None):
+    '''
+    Returns the time before which raw sensor data has expired for every sensor,
+    or None if the data of any sensor is kept indefinitely.
+    '''
+    if now is None:
+        now = datetime.datetime.utcnow()
+
+    applicable = policies()
+    cutoffs = []
+    for candidate in db.session.query(Sensor.id).all():
+        policy = applicable.get(candidate.id)
+        if policy is None or policy.raw is None:
+            return None
+        cutoffs.append(now - datetime.timedelta(days=policy.raw))
+
+    if not cutoffs:
+        return None
+    return min(cutoffs)
+
+
+def drop_partitions(now=None):
+    '''
+    Drops each partition of raw sensor data in which all data has expired for
+    every sensor, returning the months dropped. This is much cheaper than
+    deleting the same data, but only applies where sensor data is partitioned.
+    '''
+    before = expired_before(now=now)
+    if before is None:
+        return []
+
+    # Recent data is served without querying the database, so must be rebuilt
+    # once the data it holds has been dropped.
+    dropped = partitions.manager().drop(before)
+    if dropped:
+        for candidate in db.session.query(Sensor.id).all():
+            recent.store().rebuild(candidate.id)
+    return dropped
+
+
+def _delete(table, criteria, batch_size, pause):
+    '''
+    Deletes all rows matching the given criteria from a table, a batch at a
+    time, with each batch deleted and committed in its own transaction.
+    Returns the number of rows deleted.
+    '''
+    if batch_size < 1:
+        raise ValueError('The batch size must be at least 1')
+
+    deleted = 0
+    while True:
+        batch = sqlalchemy.select([table.c.id]).where(criteria).limit(batch_size)
+        result = db.session.execute(table.delete().where(table.c.id.in_(batch)))
+        db.session.commit()
+
+        deleted += result.rowcount
+        if result.rowcount < batch_size:
+            return deleted
+
+        # Optionally yield to other writers between batches.
+        if pause:
+            time.sleep(pause)
+
+
+def enforce(batch_size=DEFAULT_BATCH_SIZE, pause=None, now=None):
+    '''
+    Deletes all sensor data, and rollups, which have expired according to the
+    applicable retention policies. Data is deleted in bounded batches so that
+    locks are only held briefly, allowing ingest to continue. Returns the
+    number of rows deleted from each table.
+    '''
+    if batch_size < 1:
+        raise ValueError('The batch size must be at least 1')
+    if now is None:
+        now = datetime.datetime.utcnow()
+
+    raw = SensorData.__table__
+    rollups = SensorDataRollup.__table__
+    sealed = SensorDataBlock.__table__
+    reclaimed = {raw.name: 0, rollups.name: 0, sealed.name: 0}
+
+    for sensor_id, policy in policies().items():
+        for field, resolution in RESOLUTIONS:
+            days = getattr(policy, field)
+            if days is None:
+                continue
+
+            # Rollups are only deleted once the entire bucket has expired.
+            cutoff = now - datetime.timedelta(days=days)
+            if resolution is None:
+                table = raw
+                criteria = sqlalchemy.and_(
+                    raw.c.sensor_id == sensor_id,
+                    raw.c.created < cutoff,
+                )
+
+                # Blocks of sealed data are only deleted once the entire block
+                # has expired.
+                reclaimed[sealed.name] += _delete(
+                    sealed,
+                    sqlalchemy.and_(
+                        sealed.c.sensor_id == sensor_id,
+                        sealed.c.end <= cutoff,
+                    ),
+                    batch_size,
+                    pause,
+                )
+            else:
+                table = rollups
+                criteria = sqlalchemy.and_(
+                    rollups.c.sensor_id == sensor_id,
+                    rollups.c.resolution == resolution,
+                    rollups.c.bucket <= (
+                        cutoff - datetime.timedelta(seconds=resolution)
+                    ),
+                )
+            deleted = _delete(table, criteria, batch_size, pause)
+            reclaimed[table.name] += deleted
+
+            # Recent data is served without querying the database, so must be
+            # rebuilt once any of the data it may hold has been deleted.
+            if table is raw and deleted:
+                recent.store().rebuild(sensor_id)
+
+    return reclaimed
@@ -0,0 +1,305 @@
+''' Implements incrementally maintained sensor data rollups for Europa. '''
+
+import datetime
+
+import sqlalchemy
+
+from sqlalchemy.dialects import postgresql
+
+from europa import blocks
+
+from europa.models import db
+from europa.models import SensorData
+from europa.models import SensorDataRollup
+from europa.models import SensorDataBlock
+from europa.timeseries import to_epoch
+from europa.timeseries import truncate
+
+# Define the resolutions, in seconds, at which rollups are maintained.
+RESOLUTIONS = (60, 60 * 60, 60 * 60 * 24)
+
+# Define the number of entries to process at a time when rebuilding.
+REBUILD_CHUNK_SIZE = 10000
+
+
+def resolution_for(interval, *boundaries):
+    '''
+    Returns the coarsest resolution from which buckets of the given interval
+    can be built, with the given boundaries falling on the edge of a rollup.
+    If there is no such resolution, None is returned.
+    '''
+    for resolution in reversed(RESOLUTIONS):
+        if interval % resolution:
+            continue
+        if any(to_epoch(boundary) % resolution for boundary in boundaries):
+            continue
+        return resolution
+    return None
+
+
+def summarize(entries):
+    '''
+    Summarizes the given sensor data mappings into a rollup for each sensor,
+    resolution and bucket they fall into.
+    '''
+    summaries = {}
+    for entry in entries:
+        value = entry['value']
+        created = entry['created']
+        for resolution in RESOLUTIONS:
+            key = (
+                entry['sensor_id'],
+                resolution,
+                truncate(created, resolution),
+            )
+            summary = summaries.get(key)
+            if summary is None:
+                summaries[key] = {
+                    'count': 1,
+                    'total': value,
+                    'minimum': value,
+                    'maximum': value,
+                    'last_value': value,
+                    'last_created': created,
+                }
+                continue
+
+            summary['count'] += 1
+            summary['total'] += value
+            summary['minimum'] = min(summary['minimum'], value)
+            summary['maximum'] = max(summary['maximum'], value)
+            if created >= summary['last_created']:
+                summary['last_value'] = value
+                summary['last_created'] = created
+    return summaries
+
+
+def update(entries, floors=None):
+    '''
+    Applies the given sensor data mappings to the rollups. This must be called
+    inside of the same transaction in which the entries are inserted. If given,
+    entries are only applied to buckets from the first bucket in 'floors' for
+    their sensor and resolution.
+    '''
+    summaries = summarize(entries)
+    if floors is not None:
+        summaries = dict(
+            (key, summary) for key, summary in summaries.items()
+            if key[:2] in floors and key[2] >= floors[key[:2]]
+        )
+    if not summaries:
+        return
+
+    # Ensure that every affected rollup exists, as an empty rollup if not,
+    # ignoring any which another transaction has created meanwhile - rather
+    # than checking first, which would fail where both create the rollup.
+    table = SensorDataRollup.__table__
+    updates = []
+    inserts = []
+    for key, summary in summaries.items():
+        summary.update(zip(('sensor_id', 'resolution', 'bucket'), key))
+        updates.append(dict(('_{}'.format(k), v) for k, v in summary.items()))
+        inserts.append(dict(summary, count=0, total=0.0))
+
+    if db.engine.dialect.name == 'postgresql':
+        insert = postgresql.insert(table).on_conflict_do_nothing(
+            index_elements=['sensor_id', 'resolution', 'bucket'],
+        )
+    else:
+        insert = table.insert().prefix_with('OR IGNORE', dialect='sqlite')
+    db.session.execute(insert, inserts)
+
+    # Merge into the rollups in the database, rather than in Python, so that
+    # concurrent updates to the same rollup are not lost.
+    newer = table.c.last_created <= sqlalchemy.bindparam('_last_created')
+    db.session.execute(
+        table.update().where(
+            sqlalchemy.and_(
+                table.c.sensor_id == sqlalchemy.bindparam('_sensor_id'),
+                table.c.resolution == sqlalchemy.bindparam('_resolution'),
+                table.c.bucket == sqlalchemy.bindparam('_bucket'),
+            )
+        ).values(
+            count=table.c.count + sqlalchemy.bindparam('_count'),
+            total=table.c.total + sqlalchemy.bindparam('_total'),
+            minimum=sqlalchemy.case(
+                [(
+                    table.c.minimum > sqlalchemy.bindparam('_minimum'),
+                    sqlalchemy.bindparam('_minimum'),
+                )],
+                else_=table.c.minimum,
+            ),
+            maximum=sqlalchemy.case(
+                [(
+                    table.c.maximum < sqlalchemy.bindparam('_maximum'),
+                    sqlalchemy.bindparam('_maximum'),
+                )],
+                else_=table.c.maximum,
+            ),
+            last_value=sqlalchemy.case(
+                [(newer, sqlalchemy.bindparam('_last_value'))],
+                else_=table.c.last_value,
+            ),
+            last_created=sqlalchemy.case(
+                [(newer, sqlalchemy.bindparam('_last_created'))],
+                else_=table.c.last_created,
+            ),
+        ),
+        updates,
+    )
+
+
+def _earliest(sensor_id=None):
+    '''
+    Returns the time of the earliest entry still stored, as a row or sealed in
+    a block, of each sensor - optionally only for the given sensor.
+    '''
+    query = db.session.query(
+        SensorData.sensor_id,
+        sqlalchemy.func.min(SensorData.created),
+    )
+    if sensor_id is not None:
+        query = query.filter(SensorData.sensor_id == sensor_id)
+    earliest = dict(query.group_by(SensorData.sensor_id).all())
+
+    # The first entry of the earliest block of each sensor is its earliest
+    # sealed entry.
+    query = db.session.query(
+        SensorDataBlock.sensor_id,
+        sqlalchemy.func.min(SensorDataBlock.start),
+    )
+    if sensor_id is not None:
+        query = query.filter(SensorDataBlock.sensor_id == sensor_id)
+    for candidate, start in query.group_by(SensorDataBlock.sensor_id).all():
+        block = SensorDataBlock.query.filter(
+            SensorDataBlock.sensor_id == candidate,
+            SensorDataBlock.start == start,
+        ).one()
+        sealed = blocks.unpack(block.data).created[0].astype(datetime.datetime)
+        if candidate not in earliest or sealed < earliest[candidate]:
+            earliest[candidate] = sealed
+    return earliest
+
+
+def _floors(sensor_id=None):
+    '''
+    Returns the first bucket to rebuild for each sensor, and resolution, with
+    stored entries. Buckets before the earliest entry still stored are kept,
+    as their entries may have been removed by retention. So is the bucket
+    holding the earliest entry, if it summarizes more entries than remain.
+    '''
+    table = SensorDataRollup.__table__
+    floors = {}
+    for candidate, earliest in _earliest(sensor_id).items():
+        for resolution in RESOLUTIONS:
+            bucket = truncate(earliest, resolution)
+            rollup = db.session.execute(
+                sqlalchemy.select([table.c.count]).where(
+                    sqlalchemy.and_(
+                        table.c.sensor_id == candidate,
+                        table.c.resolution == resolution,
+                        table.c.bucket == bucket,
+                    )
+                )
+            ).scalar()
+
+            end = bucket + datetime.timedelta(seconds=resolution)
+            remaining = db.session.query(
+                sqlalchemy.func.count(SensorData.id),
+            ).filter(
+                SensorData.sensor_id == candidate,
+                SensorData.created >= bucket,
+                SensorData.created < end,
+            ).scalar()
+            for _, _, series in blocks.scan(candidate, bucket, end):
+                remaining += len(series)
+
+            if rollup is not None and rollup > remaining:
+                bucket = end
+            floors[(candidate, resolution)] = bucket
+    return floors
+
+
+def rebuild(sensor_id=None):
+    '''
+    Rebuilds rollups from all existing sensor data, optionally only for the
+    given sensor. Rollups of periods before the earliest entry still stored
+    are kept, as they may be all that remains of data removed by retention.
+    Data is processed, and committed, in fixed size chunks. Entries stored
+    after the rollups are cleared are applied as they are stored, so are not
+    applied again - though data must not be sealed while rebuilding. Returns
+    the number of entries processed.
+    '''
+    table = SensorDataRollup.__table__
+    floors = _floors(sensor_id)
+    for (candidate, resolution), bucket in floors.items():
+        db.session.execute(
+            table.delete().where(
+                sqlalchemy.and_(
+                    table.c.sensor_id == candidate,
+                    table.c.resolution == resolution,
+                    table.c.bucket >= bucket,
+                )
+            )
+        )
+    ceiling = db.session.query(sqlalchemy.func.max(SensorData.id)).scalar()
+
+    # Page through sensor data by identifier, so that each chunk is read with
+    # the primary key, and no cursor is held open across commits.
+    processed = 0
+    identifier = 0
+    while True:
+        query = sqlalchemy.select([
+            SensorData.id,
+            SensorData.sensor_id,
+            SensorData.value,
+            SensorData.created,
+        ]).where(
+            SensorData.id > identifier
+        ).where(
+            SensorData.id <= ceiling
+        ).order_by(SensorData.id).limit(REBUILD_CHUNK_SIZE)
+        if sensor_id is not None:
+            query = query.where(SensorData.sensor_id == sensor_id)
+
+        entries = [dict(entry) for entry in db.session.execute(query)]
+        if not entries:
+            break
+
+        update(entries, floors)
+        db.session.commit()
+        processed += len(entries)
+        identifier = entries[-1]['id']
+
+    # Also rebuild from any sealed data, a block at a time.
+    identifier = 0
+    while True:
+        query = sqlalchemy.select([
+            SensorDataBlock.id,
+            SensorDataBlock.sensor_id,
+            SensorDataBlock.data,
+        ]).where(
+            SensorDataBlock.id > identifier
+        ).order_by(SensorDataBlock.id).limit(1)
+        if sensor_id is not None:
+            query = query.where(SensorDataBlock.sensor_id == sensor_id)
+
+        block = db.session.execute(query).first()
+        if block is None:
+            break
+
+        series = blocks.unpack(block.data)
+        entries = [
+            {'sensor_id': block.sensor_id, 'value': value, 'created': created}
+            for created, value in zip(
+                series.created.astype(datetime.datetime).tolist(),
+                series.values.tolist(),
+            )
+        ]
+        update(entries, floors)
+        db.session.commit()
+        processed += len(entries)
+        identifier = block.id
+
+    db.session.commit()
+    return processed
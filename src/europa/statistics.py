@@ -0,0 +1,120 @@
+''' Implements windowed statistics of sensor data for The Europa project. '''
+
+import numpy
+import sqlalchemy
+
+from sqlalchemy.dialects import postgresql
+
+from europa.models import db
+from europa.models import SensorData
+
+
+def _key(percentile):
+    ''' Returns the key of a percentile in the result, such as '5' or '99.9'. '''
+    return '{:g}'.format(percentile)
+
+
+def _aggregates(percentiles):
+    '''
+    Returns the aggregate functions which calculate statistics in the database,
+    including an ordered-set aggregate for all percentiles.
+    '''
+    columns = [
+        sqlalchemy.func.count(SensorData.value),
+        sqlalchemy.func.avg(SensorData.value),
+        sqlalchemy.func.var_samp(SensorData.value),
+        sqlalchemy.func.stddev_samp(SensorData.value),
+        sqlalchemy.func.min(SensorData.value),
+        sqlalchemy.func.max(SensorData.value),
+    ]
+    if percentiles:
+        columns.append(
+            sqlalchemy.func.percentile_cont(
+                postgresql.array([percentile / 100.0 for percentile in percentiles]),
+                type_=postgresql.ARRAY(sqlalchemy.Float),
+            ).within_group(SensorData.value)
+        )
+    return columns
+
+
+def _describe_in_database(query, percentiles):
+    '''
+    Calculates statistics with aggregate functions, so that only a single row
+    is returned from the database.
+    '''
+    candidate = db.session.execute(
+        query.with_only_columns(_aggregates(percentiles))
+    ).first()
+    count, mean, variance, stddev, minimum, maximum = candidate[:6]
+    selected = candidate[6] if percentiles and count else None
+    return {
+        'count': count,
+        'mean': mean,
+        'variance': variance,
+        'stddev': stddev,
+        'min': minimum,
+        'max': maximum,
+        'percentiles': dict(
+            (_key(percentile), selected[index] if selected else None)
+            for index, percentile in enumerate(percentiles)
+        ),
+    }
+
+
+def _describe_vectorized(query, percentiles, sealed=None):
+    '''
+    Calculates statistics in a single pass over the values, which are read
+    from the database directly into an array, along with any sealed values.
+    This is used where the database does not provide the required aggregate
+    functions, or where some values are sealed in blocks.
+    '''
+    values = numpy.fromiter(
+        (candidate[0] for candidate in db.session.execute(query)),
+        dtype=numpy.float64,
+    )
+    if sealed is not None and len(sealed):
+        values = numpy.concatenate([sealed, values])
+    count = len(values)
+    if not count:
+        return {
+            'count': 0,
+            'mean': None,
+            'variance': None,
+            'stddev': None,
+            'min': None,
+            'max': None,
+            'percentiles': dict(
+                (_key(percentile), None) for percentile in percentiles
+            ),
+        }
+
+    # Match the sample variance, and linear interpolation between values for
+    # percentiles, used by the aggregate functions.
+    variance = float(values.var(ddof=1)) if count > 1 else None
+    selected = numpy.percentile(values, percentiles) if percentiles else []
+    return {
+        'count': count,
+        'mean': float(values.mean()),
+        'variance': variance,
+        'stddev': float(numpy.sqrt(variance)) if variance is not None else None,
+        'min': float(values.min()),
+        'max': float(values.max()),
+        'percentiles': dict(
+            (_key(percentile), float(selected[index]))
+            for index, percentile in enumerate(percentiles)
+        ),
+    }
+
+
+def describe(query, percentiles, sealed=None):
+    '''
+    Returns the count, mean, sample variance and standard deviation, minimum,
+    maximum, and the given percentiles of the values selected by the given
+    query - which must select 'SensorData.value' - and of any given array of
+    sealed values. Where supported, these are calculated in the database.
+    '''
+    if db.engine.dialect.name == 'postgresql' and (
+        sealed is None or not len(sealed)
+    ):
+        return _describe_in_database(query, percentiles)
+    return _describe_vectorized(query, percentiles, sealed=sealed)
@@ -0,0 +1,113 @@
+''' Implements a process-local stream of new sensor data for Europa. '''
+
+import json
+import queue
+import threading
+
+from flask import current_app
+
+from europa.models import from_datetime
+
+# Define the key under which the broker is registered with the application.
+EXTENSION_NAME = 'europa.stream'
+
+# Define the default number of messages which may be pending for a subscriber
+# before it is considered too slow, and is disconnected.
+DEFAULT_QUEUE_SIZE = 1000
+
+
+class Subscription(object):
+    '''
+    Tracks the messages pending for a single subscriber, optionally limited to
+    the given sensors. Messages are held in a bounded queue; if a subscriber
+    falls so far behind that its queue fills, it is marked as overflowed
+    rather than allowed to slow down, or grow the memory of, the publisher.
+    '''
+
+    def __init__(self, sensor_ids=None, size=DEFAULT_QUEUE_SIZE):
+        self.sensor_ids = set(sensor_ids) if sensor_ids else None
+        self.messages = queue.Queue(maxsize=size)
+        self.overflowed = False
+
+    def offer(self, message):
+        ''' Adds the given message to the queue, unless already full. '''
+        if self.overflowed:
+            return
+
+        try:
+            self.messages.put_nowait(message)
+        except queue.Full:
+            self.overflowed = True
+
+    def get(self, timeout):
+        ''' Returns the next message, or None if none arrived in time. '''
+        try:
+            return self.messages.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class Broker(object):
+    '''
+    Fans out new sensor data to all subscribers in this process. Publishing
+    never blocks, so that ingest is not slowed by subscribers.
+    '''
+
+    def __init__(self, size=DEFAULT_QUEUE_SIZE):
+        self.lock = threading.Lock()
+        self.size = size
+        self.subscriptions = set()
+
+    def subscribe(self, sensor_ids=None):
+        ''' Returns a new subscription, optionally limited to some sensors. '''
+        subscription = Subscription(sensor_ids, size=self.size)
+        with self.lock:
+            self.subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        ''' Removes the given subscription. '''
+        with self.lock:
+            self.subscriptions.discard(subscription)
+
+    def publish(self, entries):
+        '''
+        Publishes the given, committed, sensor data mappings to subscribers,
+        as a single message for each subscriber.
+        '''
+        if not entries:
+            return
+
+        with self.lock:
+            subscriptions = list(self.subscriptions)
+
+        readings = [
+            {
+                'sensor': entry['sensor_id'],
+                'value': entry['value'],
+                'created': from_datetime(entry['created']),
+            }
+            for entry in entries
+        ]
+        for subscription in subscriptions:
+            selected = readings
+            if subscription.sensor_ids is not None:
+                selected = [
+                    reading for reading in readings
+                    if reading['sensor'] in subscription.sensor_ids
+                ]
+            if selected:
+                subscription.offer(json.dumps(selected))
+
+
+def init_app(application):
+    ''' Registers a new sensor data broker with the given application. '''
+    application.config.setdefault('STREAM_QUEUE_SIZE', DEFAULT_QUEUE_SIZE)
+    application.extensions[EXTENSION_NAME] = Broker(
+        size=application.config['STREAM_QUEUE_SIZE'],
+    )
+
+
+def broker():
+    ''' Returns the sensor data broker for the current application. '''
+    return current_app.extensions[EXTENSION_NAME]
@@ -0,0 +1,202 @@
+''' Implements time-series helpers for The Europa project. '''
+
+import datetime
+import itertools
+
+import numpy
+
+# Define the epoch, used to convert timestamps into seconds.
+EPOCH = datetime.datetime(1970, 1, 1)
+
+# Define the number of rows to read into arrays at a time, so that only this
+# many rows are held as Python objects at once.
+ROW_CHUNK_SIZE = 1000
+
+# Define the type of each column of (id, created, value) rows.
+ROW_TYPES = (numpy.int64, 'datetime64[us]', numpy.float64)
+
+
+def to_epoch(source):
+    ''' Converts a naive UTC datetime into seconds since the epoch. '''
+    return (source - EPOCH).total_seconds()
+
+
+def truncate(source, seconds):
+    ''' Truncates a naive UTC datetime to a multiple of the given seconds. '''
+    return EPOCH + datetime.timedelta(
+        seconds=int(to_epoch(source)) // seconds * seconds
+    )
+
+
+def to_arrays(rows, types, size=None):
+    '''
+    Reads the given rows - either a result, or any iterable - into an array of
+    the given type per column. Rows are read a chunk at a time into arrays
+    sized for 'size' rows, where known, which are only grown if exceeded.
+    '''
+    if hasattr(rows, 'fetchmany'):
+        chunks = iter(lambda: rows.fetchmany(ROW_CHUNK_SIZE), [])
+    else:
+        rows = iter(rows)
+        chunks = iter(lambda: list(itertools.islice(rows, ROW_CHUNK_SIZE)), [])
+
+    capacity = size if size is not None else ROW_CHUNK_SIZE
+    arrays = [numpy.empty(capacity, dtype=candidate) for candidate in types]
+    count = 0
+    for chunk in chunks:
+        end = count + len(chunk)
+        if end > capacity:
+            capacity = max(end, capacity * 2)
+            arrays = [
+                numpy.concatenate([
+                    array[:count],
+                    numpy.empty(capacity - count, dtype=array.dtype),
+                ])
+                for array in arrays
+            ]
+        for array, column in zip(arrays, zip(*chunk)):
+            array[count:end] = numpy.array(column, dtype=array.dtype)
+        count = end
+    return [array[:count] for array in arrays]
+
+
+def downsample(x, y, threshold):
+    '''
+    Selects at most 'threshold' points from the given series using Largest
+    Triangle Three Buckets (LTTB). Unlike averaging, this retains the visual
+    shape of the series - including any peaks and troughs. Returns the indices
+    of the selected points, which always include the first and last points.
+    '''
+    x = numpy.asarray(x, dtype=numpy.float64)
+    y = numpy.asarray(y, dtype=numpy.float64)
+    count = len(x)
+    if threshold >= count or threshold < 3:
+        return numpy.arange(count)
+
+    # Split all points except the first and last into equally sized buckets,
+    # and find the average point of each bucket. The last point is treated as
+    # a bucket of its own, so that the final bucket has a neighbour.
+    edges = numpy.floor(
+        numpy.linspace(1, count - 1, threshold - 1)
+    ).astype(numpy.int64)
+    sizes = numpy.diff(numpy.append(edges, count))
+    average_x = numpy.add.reduceat(x, edges) / sizes
+    average_y = numpy.add.reduceat(y, edges) / sizes
+
+    # From each bucket, select the point which forms the largest triangle with
+    # the previously selected point, and the average of the next bucket.
+    selected = numpy.empty(threshold, dtype=numpy.int64)
+    selected[0] = 0
+    selected[-1] = count - 1
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        previous = selected[bucket]
+        areas = numpy.abs(
+            (x[previous] - average_x[bucket + 1]) * (y[start:end] - y[previous])
+            - (x[previous] - x[start:end]) * (average_y[bucket + 1] - y[previous])
+        )
+        selected[bucket + 1] = start + numpy.argmax(areas)
+    return selected
+
+
+class Series(object):
+    '''
+    Holds a series of sensor data as parallel arrays of IDs, creation times,
+    and values. This allows data to be read from the database, downsampled,
+    and serialized without constructing an object for each entry.
+    '''
+
+    def __init__(self, ids, created, values):
+        self.ids = ids
+        self.created = created
+        self.values = values
+
+    def __len__(self):
+        return len(self.ids)
+
+    @classmethod
+    def empty(cls):
+        ''' Returns a new series with no entries. '''
+        return cls(
+            numpy.empty(0, dtype=numpy.int64),
+            numpy.empty(0, dtype='datetime64[us]'),
+            numpy.empty(0, dtype=numpy.float64),
+        )
+
+    @classmethod
+    def from_rows(cls, rows, size=None):
+        '''
+        Returns a new series from (id, created, value) rows, such as a result,
+        read into arrays sized for 'size' rows where known.
+        '''
+        return cls(*to_arrays(rows, ROW_TYPES, size=size))
+
+    @classmethod
+    def from_grouped_rows(cls, rows):
+        '''
+        Returns a new series for each sensor, keyed by sensor ID, from (sensor_id,
+        id, created, value) rows, such as a result, ordered by sensor ID.
+        '''
+        sensor_ids, ids, created, values = to_arrays(
+            rows,
+            (numpy.int64,) + ROW_TYPES,
+        )
+        if not len(sensor_ids):
+            return {}
+
+        series = cls(ids, created, values)
+
+        # Split the series wherever the sensor ID changes.
+        edges = numpy.flatnonzero(numpy.diff(sensor_ids)) + 1
+        starts = numpy.concatenate(([0], edges))
+        ends = numpy.concatenate((edges, [len(sensor_ids)]))
+        return dict(
+            (int(sensor_ids[start]), series[start:end])
+            for start, end in zip(starts, ends)
+        )
+
+    @classmethod
+    def concatenate(cls, candidates):
+        '''
+        Returns a new series of all entries of the given series, in order - even
+        where only one series is given, as it may not be in order itself.
+        '''
+        candidates = [candidate for candidate in candidates if len(candidate)]
+        if not candidates:
+            return cls.empty()
+
+        series = cls(
+            numpy.concatenate([candidate.ids for candidate in candidates]),
+            numpy.concatenate([candidate.created for candidate in candidates]),
+            numpy.concatenate([candidate.values for candidate in candidates]),
+        )
+        return series[numpy.lexsort((series.ids, series.created))]
+
+    def between(self, since=None, until=None):
+        ''' Returns the entries created from 'since', and before 'until'. '''
+        selected = numpy.ones(len(self), dtype=bool)
+        if since is not None:
+            selected &= self.created >= numpy.datetime64(since, 'us')
+        if until is not None:
+            selected &= self.created < numpy.datetime64(until, 'us')
+        return self[selected]
+
+    def after(self, created, identifier):
+        ''' Returns the entries after the given position, as used by cursors. '''
+        created = numpy.datetime64(created, 'us')
+        return self[
+            (self.created > created) |
+            ((self.created == created) & (self.ids > identifier))
+        ]
+
+    def __getitem__(self, key):
+        ''' Returns a new series from the given slice, or array of indices. '''
+        return Series(self.ids[key], self.created[key], self.values[key])
+
+    def epoch(self):
+        ''' Returns the creation times, in seconds since the epoch. '''
+        return self.created.astype(numpy.int64) / 1e6
+
+    def last(self):
+        ''' Returns the creation time, as a datetime, and ID of the last entry. '''
+        return self.created[-1].astype(datetime.datetime), int(self.ids[-1])
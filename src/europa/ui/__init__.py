@@ -1,10 +1,70 @@
 ''' The Europa project UI. '''
 
+import os
+import hashlib
+import mimetypes
+import collections
+
+from flask import url_for
+from flask import request
 from flask import Blueprint
+from flask import current_app
 from flask import render_template
 
+from europa import compression
+
+# Define the key under which static assets are registered with the application.
+EXTENSION_NAME = 'europa.ui.assets'
+
+# Define how long clients may cache static assets for. As asset URLs include a
+# hash of their content, a changed asset is always fetched from a new URL.
+STATIC_MAX_AGE = 60 * 60 * 24 * 365
+
+# Define the level of compression to use for static assets. As assets are only
+# compressed once, the highest level is used.
+STATIC_COMPRESSION_LEVEL = 9
+
+# Each static asset is tracked with a version, derived from its content, and a
+# gzip compressed copy - if it is worth compressing.
+Asset = collections.namedtuple('Asset', ['version', 'mimetype', 'compressed'])
+
+
+class Router(Blueprint):
+    '''
+    Implements a blueprint which serves precompressed copies of its static
+    files to clients which accept them, with long-lived cache headers.
+    '''
+
+    def get_send_file_max_age(self, filename):
+        ''' Returns the number of seconds for which assets may be cached. '''
+        return STATIC_MAX_AGE
+
+    def send_static_file(self, filename):
+        ''' Serves the given static file, compressed if accepted. '''
+        asset = current_app.extensions[EXTENSION_NAME].get(filename)
+        if (
+            asset is None or
+            asset.compressed is None or
+            not request.accept_encodings['gzip']
+        ):
+            response = super(Router, self).send_static_file(filename)
+        else:
+            response = current_app.response_class(
+                asset.compressed,
+                mimetype=asset.mimetype,
+            )
+            response.headers['Content-Encoding'] = 'gzip'
+            response.set_etag('{}-gzip'.format(asset.version))
+            response.cache_control.public = True
+            response.cache_control.max_age = STATIC_MAX_AGE
+            response.make_conditional(request)
+
+        response.vary.add('Accept-Encoding')
+        return response
+
+
 # Register a new blueprint for the UI router.
-router = Blueprint(
+router = Router(
     __name__,
     __name__,
     template_folder='templates',
@@ -12,6 +72,48 @@ router = Blueprint(
 )
 
 
+@router.record_once
+def precompress_assets(state):
+    '''
+    Reads all static assets when the blueprint is registered, recording the
+    version of each, and compressing those which are worth compressing - so
+    that no compression is performed while serving requests.
+    '''
+    assets = {}
+    for root, _, filenames in os.walk(router.static_folder):
+        for filename in filenames:
+            path = os.path.join(root, filename)
+            with open(path, 'rb') as asset:
+                data = asset.read()
+
+            # Only keep a compressed copy if it is smaller than the original.
+            mimetype = mimetypes.guess_type(filename)[0]
+            compressed = None
+            if mimetype in compression.COMPRESSIBLE_MIMETYPES:
+                compressed = b''.join(
+                    compression.compress([data], STATIC_COMPRESSION_LEVEL)
+                )
+                if len(compressed) >= len(data):
+                    compressed = None
+
+            name = os.path.relpath(path, router.static_folder)
+            assets[name.replace(os.sep, '/')] = Asset(
+                version=hashlib.sha1(data).hexdigest()[:12],
+                mimetype=mimetype,
+                compressed=compressed,
+            )
+    state.app.extensions[EXTENSION_NAME] = assets
+
+
+@router.app_template_global()
+def asset_url(filename):
+    ''' Returns the URL of the given static asset, including its version. '''
+    asset = current_app.extensions[EXTENSION_NAME].get(filename)
+    if asset is None:
+        return url_for('europa.ui.static', filename=filename)
+    return url_for('europa.ui.static', filename=filename, v=asset.version)
+
+
 @router.route('/')
 def retrieve_index():
     ''' Serves up the index page. '''
@@ -81,22 +81,28 @@ def get_light_state():
         return 1.0
 
 
-def post_sensor_data(api_sensor_id, capture_time, value):
-    ''' Provide a helper to POST sensor data to the API. '''
+def post_sensor_data(capture_time, sensors):
+    ''' Provide a helper to POST a batch of sensor data to the API. '''
     # The captured time is submitted to the API 
-    payload = json.dumps({
-        'value': value,
-        'created': capture_time,
-    })
+    payload = json.dumps([
+        {
+            'sensor': sensor['id'],
+            'value': sensor['value'],
+            'created': capture_time,
+        }
+        for sensor in sensors
+    ])
 
     # Don't catch exceptions, let our caller do that.
-    requests.post(
-        '{0}/sensor/{1}/data'.format(API_BASE_URI, api_sensor_id),
+    response = requests.post(
+        '{0}/sensor/data/batch'.format(API_BASE_URI),
         data=payload,
         headers={
             'Content-Type': 'application/json'
         }
     )
+    response.raise_for_status()
+    return response.json()['results']
 
 
 def main():
@@ -150,17 +156,25 @@ def main():
             'name': 'Light State',
         })
 
-        # Poll each sensor and report to the API.
+        # Report all sensors to the API in a single request.
         for sensor in sensors:
-            try:
-                log.info(
-                    "Submitting '%s' for sensor '%s' to API",
-                    sensor['value'],
-                    sensor['name']
-                )
-                post_sensor_data(sensor['id'], capture_time, sensor['value'])
-            except requests.exceptions.RequestException as err:
-                log.error('Failed to POST sensor data: %s', err)
+            log.info(
+                "Submitting '%s' for sensor '%s' to API",
+                sensor['value'],
+                sensor['name']
+            )
+
+        try:
+            results = post_sensor_data(capture_time, sensors)
+            for sensor, result in zip(sensors, results):
+                if result['status'] != 201:
+                    log.error(
+                        "Failed to submit sensor '%s': %s",
+                        sensor['name'],
+                        result.get('error')
+                    )
+        except (requests.exceptions.RequestException, ValueError) as err:
+            log.error('Failed to POST sensor data: %s', err)
 
         # Sleep for the next run.
         log.info('Sleeping %s before the next poll', SLEEP_INTERVAL)
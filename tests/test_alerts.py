@@ -0,0 +1,252 @@
+''' Implements tests for Europa sensor data alerts. '''
+
+import uuid
+import datetime
+import unittest
+import unittest.mock
+
+import sqlalchemy
+
+from europa import alerts
+from europa import latest
+from europa import initialize_all
+
+from europa.models import db
+from europa.models import Vessel
+from europa.models import VesselSize
+from europa.models import Sensor
+from europa.models import SensorData
+from europa.models import SensorCategory
+from europa.models import AlertKind
+from europa.models import AlertRule
+from europa.models import AlertEvent
+from europa.models import AlertState
+
+
+class EuropaAlertsTestCase(unittest.TestCase):
+    ''' Defines tests for Europa sensor data alerts. '''
+
+    def setUp(self):
+        ''' Ensure the application, and database, is setup for testing. '''
+        self.application = initialize_all()
+        self.now = datetime.datetime(2018, 6, 1, 0, 0, 0)
+
+        with self.application.app_context():
+            db.create_all()
+            db.session.add(
+                Vessel(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    size=VesselSize.POT_TWELVE_CM,
+                    location='Some Location',
+                )
+            )
+            db.session.add(
+                SensorCategory(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    units='Degrees',
+                )
+            )
+            for sensor_id in (1337, 1338):
+                db.session.add(
+                    Sensor(
+                        id=sensor_id,
+                        name=str(uuid.uuid4()),
+                        vessel_id=1337,
+                        category_id=1337,
+                    )
+                )
+            db.session.commit()
+
+    def tearDown(self):
+        ''' Ensure the database is torn down between tests. '''
+        with self.application.app_context():
+            db.drop_all()
+
+    def evaluate(self, values, sensor_id=1337):
+        ''' Evaluates readings, one minute apart, returning event states. '''
+        events = alerts.evaluator().evaluate([
+            {
+                'sensor_id': sensor_id,
+                'value': value,
+                'created': self.now + datetime.timedelta(minutes=minutes),
+            }
+            for minutes, value in enumerate(values)
+        ])
+        return [(event.state, event.value) for event in events]
+
+    def test_rate_of_change(self):
+        ''' Ensures that rate of change rules alert on rapid changes. '''
+        with self.application.app_context():
+            db.session.add(
+                AlertRule(sensor_id=1337, kind=AlertKind.RATE, limit=5.0)
+            )
+            db.session.commit()
+
+            assert self.evaluate([10.0, 12.0, 20.0, 22.0]) == [
+                (AlertState.ALERTING, 20.0),
+                (AlertState.RESOLVED, 22.0),
+            ]
+
+    def test_deviation(self):
+        ''' Ensures that deviation rules alert on outlying values. '''
+        with self.application.app_context():
+            db.session.add(
+                AlertRule(
+                    category_id=1337,
+                    kind=AlertKind.DEVIATION,
+                    limit=3.0,
+                    alpha=0.2,
+                )
+            )
+            db.session.commit()
+
+            values = [10.0, 11.0] * 10 + [30.0, 10.0]
+            assert self.evaluate(values, sensor_id=1338) == [
+                (AlertState.ALERTING, 30.0),
+                (AlertState.RESOLVED, 10.0),
+            ]
+
+    def test_evaluate_without_queries(self):
+        ''' Ensures that readings are evaluated without querying the database. '''
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.application.app_context():
+            db.session.add(
+                AlertRule(sensor_id=1337, kind=AlertKind.THRESHOLD, maximum=50.0)
+            )
+            db.session.commit()
+            alerts.evaluator().warm()
+
+            sqlalchemy.event.listen(db.engine, 'before_cursor_execute', capture)
+            try:
+                assert self.evaluate([float(value) for value in range(50)]) == []
+            finally:
+                sqlalchemy.event.remove(
+                    db.engine,
+                    'before_cursor_execute',
+                    capture,
+                )
+        assert statements == []
+
+    def test_state_restored(self):
+        ''' Ensures that alerting rules are not alerted again once reloaded. '''
+        with self.application.app_context():
+            db.session.add(
+                AlertRule(sensor_id=1337, kind=AlertKind.THRESHOLD, maximum=50.0)
+            )
+            db.session.commit()
+            assert self.evaluate([100.0]) == [(AlertState.ALERTING, 100.0)]
+
+        # A new evaluator has no state, other than that recorded.
+        self.application.extensions[alerts.EXTENSION_NAME] = (
+            alerts.AlertEvaluator()
+        )
+        with self.application.app_context():
+            self.now += datetime.timedelta(hours=1)
+            assert self.evaluate([100.0, 10.0]) == [
+                (AlertState.RESOLVED, 10.0),
+            ]
+
+    def test_rules_reloaded(self):
+        ''' Ensures that rules changed via other processes are seen once expired. '''
+        with self.application.app_context():
+            alerts.evaluator().warm()
+
+            # Rules created via another process do not invalidate this one.
+            db.session.add(
+                AlertRule(sensor_id=1337, kind=AlertKind.THRESHOLD, maximum=50.0)
+            )
+            db.session.commit()
+            assert self.evaluate([100.0]) == []
+
+            alerts.evaluator().ttl = 0
+            self.now += datetime.timedelta(hours=1)
+            assert self.evaluate([100.0]) == [(AlertState.ALERTING, 100.0)]
+
+    def test_recorded_once(self):
+        ''' Ensures that changes are recorded once, however many processes see them. '''
+        with self.application.app_context():
+            db.session.add(
+                AlertRule(sensor_id=1337, kind=AlertKind.THRESHOLD, maximum=50.0)
+            )
+            db.session.commit()
+
+            first = alerts.evaluator()
+            second = alerts.AlertEvaluator()
+            second.warm()
+
+            # Each process receives some of the readings of the sensor.
+            states = []
+            for evaluator, value in (
+                (first, 100.0),
+                (second, 100.0),
+                (second, 10.0),
+                (first, 10.0),
+            ):
+                self.application.extensions[alerts.EXTENSION_NAME] = evaluator
+                states.extend(self.evaluate([value]))
+                self.now += datetime.timedelta(minutes=1)
+
+            assert states == [
+                (AlertState.ALERTING, 100.0),
+                (AlertState.RESOLVED, 10.0),
+            ]
+            assert AlertEvent.query.count() == 2
+
+    def test_record_failure(self):
+        ''' Ensures that failing to record events does not raise. '''
+        with self.application.app_context():
+            db.session.add(
+                AlertRule(sensor_id=1337, kind=AlertKind.THRESHOLD, maximum=50.0)
+            )
+            db.session.commit()
+
+            failure = sqlalchemy.exc.OperationalError('COMMIT', {}, None)
+            with unittest.mock.patch.object(
+                db.session,
+                'commit',
+                side_effect=failure,
+            ):
+                assert self.evaluate([100.0]) == []
+            assert AlertEvent.query.count() == 0
+
+    def test_check_stale(self):
+        ''' Ensures that stale rules alert when no data has been received. '''
+        with self.application.app_context():
+            db.session.add(AlertRule(kind=AlertKind.STALE, minutes=30))
+            db.session.add(
+                SensorData(sensor_id=1337, value=1.0, created=self.now)
+            )
+            db.session.commit()
+
+            events = alerts.check(now=self.now + datetime.timedelta(minutes=10))
+            assert [(e.sensor_id, e.state) for e in events] == [
+                (1338, AlertState.ALERTING),
+            ]
+
+            events = alerts.check(now=self.now + datetime.timedelta(minutes=40))
+            assert [(e.sensor_id, e.state) for e in events] == [
+                (1337, AlertState.ALERTING),
+            ]
+
+            # Once data is received, the alert is resolved on the next check.
+            entry = {
+                'sensor_id': 1337,
+                'value': 2.0,
+                'created': self.now + datetime.timedelta(minutes=45),
+            }
+            latest.cache().update([entry])
+            events = alerts.check(now=self.now + datetime.timedelta(minutes=50))
+            assert [(e.sensor_id, e.state) for e in events] == [
+                (1337, AlertState.RESOLVED),
+            ]
+            assert AlertEvent.query.count() == 3
+
+
+if __name__ == '__main__':
+    unittest.main()
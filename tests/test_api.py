@@ -1,13 +1,21 @@
 ''' Implements tests for Europa Models. '''
 
+import gzip
+import zlib
 import uuid
 import json
+import struct
 import datetime
 import unittest
+import unittest.mock
 import coverage
 
+from europa import stream
+from europa import compression
 from europa import initialize_all
 
+from europa.api.v1.endpoints import sensor_data
+
 from europa.models import db
 from europa.models import Vessel
 from europa.models import VesselSize
@@ -15,6 +23,9 @@ from europa.models import Plant
 from europa.models import Sensor
 from europa.models import SensorData
 from europa.models import SensorCategory
+from europa.models import RetentionPolicy
+from europa.models import AlertKind
+from europa.models import AlertRule
 
 
 class EuropaApiTestCase(unittest.TestCase):
@@ -70,6 +81,23 @@ class EuropaApiTestCase(unittest.TestCase):
             )
             db.session.add(sensor_data)
 
+            # Seed the database with a valid retention policy.
+            retention_policy = RetentionPolicy(
+                id=1337,
+                sensor_id=1337,
+                raw=7,
+            )
+            db.session.add(retention_policy)
+
+            # Seed the database with a valid alert rule.
+            alert_rule = AlertRule(
+                id=1337,
+                sensor_id=1337,
+                kind=AlertKind.THRESHOLD,
+                maximum=50.0,
+            )
+            db.session.add(alert_rule)
+
             # Create the test database and save fixtures.
             db.create_all()
             db.session.commit()
@@ -210,6 +238,68 @@ class EuropaApiTestCase(unittest.TestCase):
         )
         assert response.status_code == 200
 
+    def test_retrieve_sensors_conditional(self):
+        ''' Ensures that sensors can be conditionally retrieved via the API. '''
+        response = self.client.get('/api/v1/sensors')
+        etag = response.headers['ETag']
+        assert response.status_code == 200
+
+        # The same version should not be returned again.
+        response = self.client.get(
+            '/api/v1/sensors',
+            headers={'If-None-Match': etag},
+        )
+        assert response.status_code == 304
+        assert response.data == b''
+
+        # But should be once the vessel referenced by a sensor is renamed.
+        self.client.put(
+            '/api/v1/vessel/1337',
+            data=json.dumps({'name': str(uuid.uuid4())}),
+            content_type='application/json',
+        )
+        response = self.client.get(
+            '/api/v1/sensors',
+            headers={'If-None-Match': etag},
+        )
+        assert response.status_code == 200
+        assert response.headers['ETag'] != etag
+
+    def test_retrieve_vessels_modified_since(self):
+        ''' Ensures that vessels can be conditionally retrieved by time. '''
+        response = self.client.get('/api/v1/vessel')
+        modified = response.headers['Last-Modified']
+        assert response.status_code == 200
+
+        response = self.client.get(
+            '/api/v1/vessel',
+            headers={'If-Modified-Since': modified},
+        )
+        assert response.status_code == 304
+
+    def test_retrieve_sensors_cached(self):
+        ''' Ensures that cached sensors are invalidated when modified. '''
+        self.client.get('/api/v1/sensors')
+        self.client.get('/api/v1/sensors')
+
+        # Renaming the vessel of a sensor must invalidate cached sensors.
+        name = str(uuid.uuid4())
+        self.client.put(
+            '/api/v1/vessel/1337',
+            data=json.dumps({'name': name}),
+            content_type='application/json',
+        )
+        response = self.client.get('/api/v1/sensors')
+        sensors = json.loads(response.data.decode())
+        assert sensors[0]['vessel'] == name
+
+        response = self.client.get('/api/v1/cache/metadata')
+        stats = json.loads(response.data.decode())
+        assert response.status_code == 200
+        assert stats['hits'] == 1
+        assert stats['misses'] == 2
+        assert stats['invalidations'] == 1
+
     def test_update_sensor(self):
         ''' Ensures that a specified sensor can be updated via the API. '''
         payload = json.dumps({
@@ -281,6 +371,145 @@ class EuropaApiTestCase(unittest.TestCase):
         )
         assert response.status_code == 204
 
+    def test_create_retention_policy(self):
+        ''' Ensures that a retention policy can be created via the API. '''
+        payload = json.dumps({
+            'category': 1337,
+            'raw': 7,
+            'hourly': 365,
+        })
+        response = self.client.post(
+            '/api/v1/retention/policy',
+            data=payload,
+            content_type='application/json',
+        )
+        assert response.status_code == 201
+
+    def test_retrieve_retention_policies(self):
+        ''' Ensures that retention policies can be retrieved via the API. '''
+        response = self.client.get(
+            '/api/v1/retention/policies',
+            content_type='application/json',
+        )
+        assert response.status_code == 200
+
+    def test_retrieve_retention_policy(self):
+        ''' Ensures that a specific retention policy can be retrieved via the API. '''
+        response = self.client.get(
+            '/api/v1/retention/policy/1337',
+            content_type='application/json',
+        )
+        assert response.status_code == 200
+
+    def test_update_retention_policy(self):
+        ''' Ensures that a specified retention policy can be updated via the API. '''
+        payload = json.dumps({
+            'raw': 14,
+            'daily': None,
+        })
+        response = self.client.put(
+            '/api/v1/retention/policy/1337',
+            data=payload,
+            content_type='application/json',
+        )
+        assert response.status_code == 204
+
+    def test_delete_retention_policy(self):
+        ''' Ensures that a specific retention policy can be deleted via the API. '''
+        response = self.client.delete(
+            '/api/v1/retention/policy/1337',
+            content_type='application/json',
+        )
+        assert response.status_code == 204
+
+    def test_create_alert_rule(self):
+        ''' Ensures that an alert rule can be created via the API. '''
+        payload = json.dumps({
+            'category': 1337,
+            'kind': 'deviation',
+            'limit': 3,
+            'alpha': 0.1,
+        })
+        response = self.client.post(
+            '/api/v1/alert/rule',
+            data=payload,
+            content_type='application/json',
+        )
+        assert response.status_code == 201
+
+    def test_create_alert_rule_invalid(self):
+        ''' Ensures that an incomplete alert rule is rejected by the API. '''
+        payload = json.dumps({
+            'sensor': 1337,
+            'kind': 'stale',
+        })
+        response = self.client.post(
+            '/api/v1/alert/rule',
+            data=payload,
+            content_type='application/json',
+        )
+        assert response.status_code == 400
+
+    def test_retrieve_alert_rules(self):
+        ''' Ensures that alert rules can be retrieved via the API. '''
+        response = self.client.get(
+            '/api/v1/alert/rules',
+            content_type='application/json',
+        )
+        assert response.status_code == 200
+
+    def test_retrieve_alert_rule(self):
+        ''' Ensures that a specific alert rule can be retrieved via the API. '''
+        response = self.client.get(
+            '/api/v1/alert/rule/1337',
+            content_type='application/json',
+        )
+        assert response.status_code == 200
+
+    def test_update_alert_rule(self):
+        ''' Ensures that a specified alert rule can be updated via the API. '''
+        payload = json.dumps({
+            'minimum': 10.0,
+            'maximum': None,
+        })
+        response = self.client.put(
+            '/api/v1/alert/rule/1337',
+            data=payload,
+            content_type='application/json',
+        )
+        assert response.status_code == 204
+
+    def test_delete_alert_rule(self):
+        ''' Ensures that a specific alert rule can be deleted via the API. '''
+        response = self.client.delete(
+            '/api/v1/alert/rule/1337',
+            content_type='application/json',
+        )
+        assert response.status_code == 204
+
+    def test_retrieve_alert_events(self):
+        ''' Ensures that alert events are recorded as data is added. '''
+        created = datetime.datetime.utcnow() + datetime.timedelta(minutes=1)
+        for minutes, value in enumerate([10.0, 100.0, 200.0, 20.0]):
+            self.client.post(
+                '/api/v1/sensor/1337/data',
+                data=json.dumps({
+                    'value': value,
+                    'created': (
+                        created + datetime.timedelta(minutes=minutes)
+                    ).strftime('%Y-%m-%dT%H:%M:%S'),
+                }),
+                content_type='application/json',
+            )
+
+        response = self.client.get('/api/v1/alert/events?sensor=1337')
+        events = json.loads(response.data.decode())
+        assert response.status_code == 200
+        assert [(event['state'], event['value']) for event in events] == [
+            ('resolved', 20.0),
+            ('alerting', 100.0),
+        ]
+
     def test_create_sensor_data(self):
         ''' Ensures that sensor data can be added via the API. '''
         payload = json.dumps({
@@ -294,6 +523,106 @@ class EuropaApiTestCase(unittest.TestCase):
         )
         assert response.status_code == 201
 
+    def test_create_sensor_data_batch(self):
+        ''' Ensures that a batch of sensor data can be added via the API. '''
+        created = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')
+        payload = json.dumps([
+            {'sensor': 1337, 'value': 100.00, 'created': created},
+            {'sensor': 1337, 'value': 101.00, 'created': created},
+        ])
+        response = self.client.post(
+            '/api/v1/sensor/data/batch',
+            data=payload,
+            content_type='application/json',
+        )
+        assert response.status_code == 201
+        assert json.loads(response.data.decode())['accepted'] == 2
+
+    def test_create_sensor_data_batch_partial(self):
+        ''' Ensures that invalid entries in a batch are reported via the API. '''
+        created = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')
+        payload = json.dumps([
+            {'sensor': 1337, 'value': 100.00, 'created': created},
+            {'sensor': 1337, 'value': 'Invalid', 'created': created},
+            {'sensor': 7331, 'value': 100.00, 'created': created},
+        ])
+        response = self.client.post(
+            '/api/v1/sensor/data/batch',
+            data=payload,
+            content_type='application/json',
+        )
+        document = json.loads(response.data.decode())
+        assert response.status_code == 207
+        assert document['accepted'] == 1
+        assert [r['status'] for r in document['results']] == [201, 400, 404]
+
+    def test_create_sensor_data_batch_for_sensor(self):
+        ''' Ensures that a batch of data for a sensor can be added via the API. '''
+        created = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')
+        payload = json.dumps([
+            {'value': 100.00, 'created': created},
+            {'value': 101.00, 'created': created},
+        ])
+        response = self.client.post(
+            '/api/v1/sensor/1337/data/batch',
+            data=payload,
+            content_type='application/json',
+        )
+        assert response.status_code == 201
+
+    def test_import_sensor_data(self):
+        ''' Ensures that sensor data can be imported via the API. '''
+        created = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')
+        entries = [
+            json.dumps({'sensor': 1337, 'value': 100.00, 'created': created}),
+            json.dumps({'sensor': 7331, 'value': 100.00, 'created': created}),
+            'Invalid',
+            json.dumps({'sensor': 1337, 'value': 101.00, 'created': created}),
+        ]
+        response = self.client.post(
+            '/api/v1/sensor/data/import',
+            data='\n'.join(entries),
+            content_type='application/x-ndjson',
+        )
+        document = json.loads(response.data.decode())
+        assert response.status_code == 207
+        assert document['accepted'] == 2
+        assert document['rejected'] == 2
+        assert [error['line'] for error in document['errors']] == [2, 3]
+
+    def test_import_sensor_data_long_line(self):
+        ''' Ensures that long lines are rejected once when imported via the API. '''
+        created = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')
+        entries = [
+            json.dumps({'sensor': 1337, 'value': 100.00, 'created': created}),
+            'x' * 10000,
+            json.dumps({'sensor': 1337, 'value': 101.00, 'created': created}),
+        ]
+        response = self.client.post(
+            '/api/v1/sensor/data/import',
+            data='\n'.join(entries),
+            content_type='application/x-ndjson',
+        )
+        document = json.loads(response.data.decode())
+        assert response.status_code == 207
+        assert document['accepted'] == 2
+        assert document['rejected'] == 1
+        assert document['errors'] == [{'line': 2, 'error': 'Line too long'}]
+
+    def test_import_sensor_data_for_sensor(self):
+        ''' Ensures that data for a sensor can be imported via the API. '''
+        created = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')
+        entries = [
+            json.dumps({'value': 100.00, 'created': created}),
+            json.dumps({'value': 101.00, 'created': created}),
+        ]
+        response = self.client.post(
+            '/api/v1/sensor/1337/data/import',
+            data='\n'.join(entries),
+            content_type='application/x-ndjson',
+        )
+        assert response.status_code == 201
+
     def test_retrieve_sensor_data(self):
         ''' Ensures that sensor data can be retrieved via the API. '''
         response = self.client.get(
@@ -302,5 +631,421 @@ class EuropaApiTestCase(unittest.TestCase):
         )
         assert response.status_code == 200
 
+    def test_retrieve_sensor_data_conditional(self):
+        ''' Ensures that sensor data can be conditionally retrieved via the API. '''
+        response = self.client.get('/api/v1/sensor/1337/data')
+        etag = response.headers['ETag']
+        assert response.status_code == 200
+
+        # The same version should not be returned again, in the same format.
+        response = self.client.get(
+            '/api/v1/sensor/1337/data',
+            headers={'If-None-Match': etag},
+        )
+        assert response.status_code == 304
+        response = self.client.get(
+            '/api/v1/sensor/1337/data?format=columnar',
+            headers={'If-None-Match': etag},
+        )
+        assert response.status_code == 200
+
+        # But should be once new data is submitted.
+        self.client.post(
+            '/api/v1/sensor/1337/data',
+            data=json.dumps({
+                'value': 2.0,
+                'created': datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S'),
+            }),
+            content_type='application/json',
+        )
+        response = self.client.get(
+            '/api/v1/sensor/1337/data',
+            headers={'If-None-Match': etag},
+        )
+        assert response.status_code == 200
+
+    def test_retrieve_sensor_data_paginated(self):
+        ''' Ensures that sensor data can be paged through via the API. '''
+        created = datetime.datetime.utcnow() - datetime.timedelta(hours=1)
+        payload = json.dumps([
+            {
+                'value': float(minute),
+                'created': (
+                    created + datetime.timedelta(minutes=minute)
+                ).strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            for minute in range(5)
+        ])
+        self.client.post(
+            '/api/v1/sensor/1337/data/batch',
+            data=payload,
+            content_type='application/json',
+        )
+
+        # Follow 'next' links until no data remains.
+        values = []
+        target = '/api/v1/sensor/1337/data?limit=2&since={}'.format(
+            created.strftime('%Y-%m-%dT%H:%M:%S')
+        )
+        while target:
+            response = self.client.get(target)
+            assert response.status_code == 200
+            values.extend(
+                entry['value'] for entry in json.loads(response.data.decode())
+            )
+            target = response.headers.get('Link', '')[1:].split('>')[0]
+        assert values == [0.0, 1.0, 2.0, 3.0, 4.0, 1.0]
+
+    def test_retrieve_sensor_data_paginated_by_default(self):
+        ''' Ensures that sensor data is paged through without a limit. '''
+        created = datetime.datetime.utcnow() - datetime.timedelta(hours=1)
+        payload = json.dumps([
+            {
+                'value': float(minute),
+                'created': (
+                    created + datetime.timedelta(minutes=minute)
+                ).strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            for minute in range(3)
+        ])
+        self.client.post(
+            '/api/v1/sensor/1337/data/batch',
+            data=payload,
+            content_type='application/json',
+        )
+
+        with unittest.mock.patch.object(sensor_data, 'MAXIMUM_PAGE_SIZE', 2):
+            response = self.client.get('/api/v1/sensor/1337/data')
+        assert response.status_code == 200
+        assert len(json.loads(response.data.decode())) == 2
+        assert 'Link' in response.headers
+
+    def test_retrieve_sensor_data_invalid_cursor(self):
+        ''' Ensures that an invalid cursor is rejected by the API. '''
+        response = self.client.get('/api/v1/sensor/1337/data?cursor=Invalid')
+        assert response.status_code == 400
+
+    def test_retrieve_sensor_data_downsampled(self):
+        ''' Ensures that downsampled sensor data can be retrieved via the API. '''
+        created = datetime.datetime.utcnow() - datetime.timedelta(hours=12)
+        payload = json.dumps([
+            {
+                'value': 100.0 if minute == 300 else 1.0,
+                'created': (
+                    created + datetime.timedelta(minutes=minute)
+                ).strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            for minute in range(600)
+        ])
+        self.client.post(
+            '/api/v1/sensor/1337/data/batch',
+            data=payload,
+            content_type='application/json',
+        )
+
+        response = self.client.get('/api/v1/sensor/1337/data?max_points=50')
+        values = [
+            entry['value'] for entry in json.loads(response.data.decode())
+        ]
+        assert response.status_code == 200
+        assert len(values) == 50
+        assert 100.0 in values
+
+    def test_retrieve_sensor_data_columnar(self):
+        ''' Ensures that columnar sensor data can be retrieved via the API. '''
+        response = self.client.get(
+            '/api/v1/sensor/1337/data',
+            headers={'Accept': 'application/vnd.europa.columnar+json'},
+        )
+        document = json.loads(response.data.decode())
+        assert response.status_code == 200
+        assert response.mimetype == 'application/vnd.europa.columnar+json'
+        assert document['v'] == [1.0]
+        assert len(document['t']) == 1
+
+    def test_retrieve_sensor_data_binary(self):
+        ''' Ensures that binary sensor data can be retrieved via the API. '''
+        response = self.client.get('/api/v1/sensor/1337/data?format=binary')
+        assert response.status_code == 200
+        assert len(response.data) == 4 + 8 + 8
+        assert struct.unpack('<I', response.data[:4]) == (1, )
+        assert struct.unpack('<d', response.data[12:]) == (1.0, )
+
+    def test_retrieve_sensor_data_invalid_format(self):
+        ''' Ensures that an invalid format is rejected by the API. '''
+        response = self.client.get('/api/v1/sensor/1337/data?format=Invalid')
+        assert response.status_code == 400
+
+    def test_retrieve_sensors_data(self):
+        ''' Ensures that data for many sensors can be retrieved via the API. '''
+        response = self.client.get(
+            '/api/v1/sensors/data?ids=1337,7331',
+            content_type='application/json',
+        )
+        document = json.loads(response.data.decode())
+        assert response.status_code == 200
+        assert list(document.keys()) == ['1337']
+        assert len(document['1337']) == 1
+
+    def test_retrieve_sensors_data_empty_window(self):
+        ''' Ensures that empty window parameters are ignored by the API. '''
+        for arguments in ['since=', 'until=']:
+            response = self.client.get(
+                '/api/v1/sensors/data?ids=1337&{}'.format(arguments)
+            )
+            assert response.status_code == 200
+            assert len(json.loads(response.data.decode())['1337']) == 1
+
+    def test_retrieve_sensors_data_compressed(self):
+        ''' Ensures that large responses are compressed via the API. '''
+        created = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')
+        self.client.post(
+            '/api/v1/sensor/data/batch',
+            data=json.dumps([
+                {'sensor': 1337, 'value': float(value), 'created': created}
+                for value in range(100)
+            ]),
+            content_type='application/json',
+        )
+
+        response = self.client.get(
+            '/api/v1/sensors/data',
+            headers={'Accept-Encoding': 'gzip'},
+        )
+        document = json.loads(gzip.decompress(response.data).decode())
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.headers['ETag'].startswith('W/')
+        assert len(document['1337']) == 101
+
+        # Small responses should not be compressed.
+        response = self.client.get(
+            '/api/v1/sensor/1337',
+            headers={'Accept-Encoding': 'gzip'},
+        )
+        assert 'Content-Encoding' not in response.headers
+
+    def test_retrieve_sensors_latest(self):
+        ''' Ensures that the latest data for all sensors can be retrieved. '''
+        response = self.client.get(
+            '/api/v1/sensors/latest',
+            content_type='application/json',
+        )
+        assert response.status_code == 200
+        assert list(json.loads(response.data.decode()).keys()) == ['1337']
+
+    def test_retrieve_sensor_latest(self):
+        ''' Ensures that the latest data for a sensor is updated on creation. '''
+        created = datetime.datetime.utcnow() + datetime.timedelta(minutes=1)
+        payload = json.dumps({
+            'value': 100.00,
+            'created': created.strftime('%Y-%m-%dT%H:%M:%S'),
+        })
+        self.client.get('/api/v1/sensor/1337/latest')
+        self.client.post(
+            '/api/v1/sensor/1337/data',
+            data=payload,
+            content_type='application/json',
+        )
+        response = self.client.get(
+            '/api/v1/sensor/1337/latest',
+            content_type='application/json',
+        )
+        assert response.status_code == 200
+        assert json.loads(response.data.decode())['value'] == 100.00
+
+    def test_retrieve_sensor_data_stats(self):
+        ''' Ensures that sensor data statistics can be retrieved via the API. '''
+        created = datetime.datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S')
+        self.client.post(
+            '/api/v1/sensor/data/batch',
+            data=json.dumps([
+                {'sensor': 1337, 'value': float(value), 'created': created}
+                for value in range(2, 101)
+            ]),
+            content_type='application/json',
+        )
+
+        response = self.client.get(
+            '/api/v1/sensor/1337/data/stats?percentiles=5,50,99.5'
+        )
+        document = json.loads(response.data.decode())
+        assert response.status_code == 200
+        assert document['count'] == 100
+        assert document['mean'] == 50.5
+        assert document['min'] == 1.0
+        assert document['max'] == 100.0
+        assert round(document['variance'], 6) == round(10100 / 12.0, 6)
+        assert document['percentiles'] == {
+            '5': 5.95,
+            '50': 50.5,
+            '99.5': 99.505,
+        }
+
+    def test_retrieve_sensor_data_stats_empty_window(self):
+        ''' Ensures that empty window parameters are ignored by the API. '''
+        for arguments in ['since=', 'until=']:
+            response = self.client.get(
+                '/api/v1/sensor/1337/data/stats?{}'.format(arguments)
+            )
+            assert response.status_code == 200
+            assert json.loads(response.data.decode())['count'] == 1
+
+    def test_retrieve_sensor_data_stats_invalid(self):
+        ''' Ensures that invalid percentiles are rejected by the API. '''
+        response = self.client.get(
+            '/api/v1/sensor/1337/data/stats?percentiles=5,101'
+        )
+        assert response.status_code == 400
+
+    def test_retrieve_sensor_data_aggregate(self):
+        ''' Ensures that aggregated sensor data can be retrieved via the API. '''
+        created = datetime.datetime(2018, 1, 1, 12, 0, 0)
+        payload = json.dumps([
+            {
+                'value': float(minute),
+                'created': (
+                    created + datetime.timedelta(minutes=minute)
+                ).strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            for minute in range(0, 120, 10)
+        ])
+        self.client.post(
+            '/api/v1/sensor/1337/data/batch',
+            data=payload,
+            content_type='application/json',
+        )
+
+        response = self.client.get(
+            '/api/v1/sensor/1337/data/aggregate'
+            '?interval=1h&fn=avg,max,count'
+            '&since=2018-01-01T00:00:00&until=2018-01-02T00:00:00'
+        )
+        assert response.status_code == 200
+        assert json.loads(response.data.decode()) == [
+            {'created': '2018-01-01T12:00:00', 'avg': 25.0, 'max': 50.0, 'count': 6},
+            {'created': '2018-01-01T13:00:00', 'avg': 85.0, 'max': 110.0, 'count': 6},
+        ]
+
+    def test_retrieve_sensor_data_aggregate_invalid(self):
+        ''' Ensures that invalid aggregation requests are rejected by the API. '''
+        for arguments in ['interval=1y', 'fn=median', 'interval=1s']:
+            response = self.client.get(
+                '/api/v1/sensor/1337/data/aggregate?{}'.format(arguments)
+            )
+            assert response.status_code == 400
+
+    def test_retrieve_sensor_data_aggregate_empty_window(self):
+        ''' Ensures that empty window parameters are ignored by the API. '''
+        for arguments in ['since=', 'until=', 'since=&until=']:
+            response = self.client.get(
+                '/api/v1/sensor/1337/data/aggregate?interval=1h&{}'.format(
+                    arguments
+                )
+            )
+            assert response.status_code == 200
+
+    def test_export_sensor_data(self):
+        ''' Ensures that sensor data can be exported as CSV via the API. '''
+        response = self.client.get('/api/v1/sensor/1337/data/export')
+        lines = response.data.decode().splitlines()
+        assert response.status_code == 200
+        assert response.mimetype == 'text/csv'
+        assert lines[0] == 'created,value'
+        assert len(lines) > 1
+        assert all(len(line.split(',')) == 2 for line in lines)
+
+    def test_export_sensor_data_ndjson(self):
+        ''' Ensures that sensor data can be exported as NDJSON via the API. '''
+        response = self.client.get(
+            '/api/v1/sensor/1337/data/export?format=ndjson&since=2000-01-01T00:00:00'
+        )
+        entries = [
+            json.loads(line) for line in response.data.decode().splitlines()
+        ]
+        assert response.status_code == 200
+        assert response.mimetype == 'application/x-ndjson'
+        assert entries
+        assert all(set(entry) == {'created', 'value'} for entry in entries)
+
+        # Entries are exported in order.
+        created = [entry['created'] for entry in entries]
+        assert created == sorted(created)
+
+    def test_export_sensor_data_compressed(self):
+        ''' Ensures that exported sensor data is compressed as it is streamed. '''
+        response = self.client.get(
+            '/api/v1/sensor/1337/data/export',
+            headers={'Accept-Encoding': 'gzip'},
+        )
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert 'Content-Length' not in response.headers
+        lines = gzip.decompress(response.data).decode().splitlines()
+        assert lines[0] == 'created,value'
+
+    def test_export_sensor_data_compressed_incrementally(self):
+        ''' Ensures that each chunk of a stream is sent once compressed. '''
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        chunks = compression.compress(
+            iter([b'created,value\n', b'2018-06-01T00:00:00,1.0\n']),
+            sync=True,
+        )
+        assert decompressor.decompress(next(chunks)) == b'created,value\n'
+        assert decompressor.decompress(next(chunks)) == (
+            b'2018-06-01T00:00:00,1.0\n'
+        )
+
+    def test_export_sensor_data_invalid(self):
+        ''' Ensures that invalid exports are rejected via the API. '''
+        response = self.client.get('/api/v1/sensor/1337/data/export?format=xml')
+        assert response.status_code == 400
+
+        response = self.client.get('/api/v1/sensor/1/data/export')
+        assert response.status_code == 404
+
+    def post_sensor_data(self, value):
+        ''' Adds a single reading for the seeded sensor via the API. '''
+        return self.client.post(
+            '/api/v1/sensor/1337/data',
+            data=json.dumps({
+                'value': value,
+                'created': datetime.datetime.utcnow().strftime(
+                    '%Y-%m-%dT%H:%M:%S'
+                ),
+            }),
+            content_type='application/json',
+        )
+
+    def test_stream_sensors_data(self):
+        ''' Ensures that new sensor data is streamed via the API. '''
+        response = self.client.get('/api/v1/sensors/stream?ids=1337')
+        events = iter(response.response)
+        assert response.status_code == 200
+        assert response.mimetype == 'text/event-stream'
+        assert next(events).startswith(b'retry: ')
+
+        # Only committed data is streamed, once for each request.
+        assert self.post_sensor_data(100.0).status_code == 201
+        event = next(events).decode()
+        assert event.startswith('data: ')
+        readings = json.loads(event[len('data: '):])
+        assert [(r['sensor'], r['value']) for r in readings] == [(1337, 100.0)]
+
+        # Closing the stream must remove the subscription.
+        response.close()
+        assert not self.application.extensions[stream.EXTENSION_NAME].subscriptions
+
+    def test_stream_sensors_data_overflow(self):
+        ''' Ensures that slow stream clients are reset, rather than buffered. '''
+        self.application.extensions[stream.EXTENSION_NAME] = stream.Broker(size=1)
+        response = self.client.get('/api/v1/sensors/stream')
+        events = iter(response.response)
+        assert next(events).startswith(b'retry: ')
+
+        self.post_sensor_data(100.0)
+        self.post_sensor_data(101.0)
+        assert next(events).startswith(b'event: reset')
+        response.close()
+
 if __name__ == '__main__':
     unittest.main()
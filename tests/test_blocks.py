@@ -0,0 +1,233 @@
+''' Implements tests for Europa compressed sensor data blocks. '''
+
+import uuid
+import json
+import datetime
+import unittest
+
+import numpy
+
+from europa import blocks
+from europa import gorilla
+from europa import rollups
+from europa import retention
+from europa import initialize_all
+
+from europa.models import db
+from europa.models import Vessel
+from europa.models import VesselSize
+from europa.models import Sensor
+from europa.models import SensorData
+from europa.models import SensorCategory
+from europa.models import SensorDataBlock
+from europa.models import SensorDataRollup
+from europa.models import RetentionPolicy
+from europa.timeseries import Series
+
+
+class EuropaBlocksTestCase(unittest.TestCase):
+    ''' Defines tests for Europa compressed sensor data blocks. '''
+
+    def setUp(self):
+        ''' Ensure the application, and database, is setup for testing. '''
+        self.application = initialize_all()
+        self.application.config['SENSOR_DATA_STORAGE'] = blocks.BLOCKS
+        self.client = self.application.test_client()
+        self.now = datetime.datetime(2018, 6, 10, 12, 0, 0)
+
+        with self.application.app_context():
+            db.create_all()
+            db.session.add(
+                Vessel(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    size=VesselSize.POT_TWELVE_CM,
+                    location='Some Location',
+                )
+            )
+            db.session.add(
+                SensorCategory(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    units='Degrees',
+                )
+            )
+            db.session.add(
+                Sensor(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    vessel_id=1337,
+                    category_id=1337,
+                )
+            )
+
+            # Seed ten days of data, every ten minutes.
+            entries = [
+                {
+                    'value': 20.0 + (minutes % 120) / 10.0,
+                    'sensor_id': 1337,
+                    'created': self.now - datetime.timedelta(minutes=minutes),
+                }
+                for minutes in range(10, 60 * 24 * 10 + 1, 10)
+            ]
+            db.session.execute(SensorData.__table__.insert(), entries)
+            rollups.update(entries)
+            db.session.commit()
+
+    def tearDown(self):
+        ''' Ensure the database is torn down between tests. '''
+        with self.application.app_context():
+            db.drop_all()
+
+    def seal(self):
+        ''' Seals all data older than the configured age. '''
+        with self.application.app_context():
+            return blocks.seal(now=self.now)
+
+    def get(self, url):
+        ''' Returns the body of a successful response for the given URL. '''
+        response = self.client.get(url)
+        assert response.status_code == 200
+        return response.data
+
+    def test_encode_decode(self):
+        ''' Ensures that entries are decoded exactly as they were encoded. '''
+        ids = numpy.array([1, 2, 5, 6, 100, 101], dtype=numpy.int64)
+        values = numpy.array([20.5, 20.5, 20.6, -0.0, float('inf'), 1e-300])
+        for times in (
+            numpy.array([0, 60, 120, 181, 300, 10 ** 9], dtype=numpy.int64),
+            numpy.array([0, 1, 3, 10, 500000, 500001], dtype=numpy.int64),
+        ):
+            decoded = gorilla.decode(gorilla.encode(ids, times * 10 ** 6, values))
+            assert decoded[0].tolist() == ids.tolist()
+            assert decoded[1].tolist() == (times * 10 ** 6).tolist()
+            assert decoded[2].tobytes() == values.tobytes()
+
+    def test_concatenate_in_order(self):
+        ''' Ensures that a single series is put in order when concatenated. '''
+        series = Series(
+            numpy.array([3, 1, 2], dtype=numpy.int64),
+            numpy.array([2, 0, 0], dtype='datetime64[us]'),
+            numpy.array([3.0, 1.0, 2.0]),
+        )
+        merged = Series.concatenate([series])
+        assert merged.ids.tolist() == [1, 2, 3]
+        assert merged.values.tolist() == [1.0, 2.0, 3.0]
+
+    def test_compressed(self):
+        ''' Ensures that regular entries compress to a few bytes each. '''
+        times = numpy.arange(0, 60 * 10000, 60, dtype=numpy.int64) * 10 ** 6
+        ids = numpy.arange(len(times), dtype=numpy.int64)
+        values = numpy.round(numpy.sin(numpy.arange(len(times)) / 100.0), 1)
+        data = gorilla.encode(ids, times, values)
+        assert len(data) / float(len(times)) < 4
+
+    def test_seal(self):
+        ''' Ensures that data is sealed into a block per window. '''
+        sealed = self.seal()
+
+        with self.application.app_context():
+            # Data is sealed up to midnight of the day before yesterday.
+            boundary = datetime.datetime(2018, 6, 8)
+            assert sealed == SensorDataBlock.query.with_entities(
+                db.func.sum(SensorDataBlock.count)
+            ).scalar()
+            assert SensorDataBlock.query.count() == 8
+            assert SensorData.query.filter(
+                SensorData.created < boundary,
+            ).count() == 0
+            assert SensorData.query.count() == 6 * 24 * 10 - sealed
+
+        # Sealing again has no effect.
+        assert self.seal() == 0
+
+    def test_seal_late_data(self):
+        ''' Ensures that late data is merged into existing blocks. '''
+        self.seal()
+
+        with self.application.app_context():
+            db.session.add(
+                SensorData(
+                    sensor_id=1337,
+                    value=1.0,
+                    created=datetime.datetime(2018, 6, 5, 0, 0, 5),
+                )
+            )
+            db.session.commit()
+
+        assert self.seal() == 1
+        with self.application.app_context():
+            block = SensorDataBlock.query.filter(
+                SensorDataBlock.start == datetime.datetime(2018, 6, 5),
+            ).one()
+            assert block.count == 6 * 24 + 1
+            assert blocks.unpack(block.data).values.tolist()[1] == 1.0
+
+    def test_read_transparently(self):
+        ''' Ensures that sealed data is returned as if it were not sealed. '''
+        urls = [
+            '/api/v1/sensor/1337/data?since=2018-06-01T00:00:00',
+            '/api/v1/sensor/1337/data?since=2018-06-01T00:00:00&format=columnar',
+            '/api/v1/sensor/1337/data?since=2018-06-07T12:00:00'
+            '&until=2018-06-09T00:00:00&max_points=50',
+            '/api/v1/sensors/data?ids=1337&since=2018-06-01T00:00:00',
+            '/api/v1/sensor/1337/data/export?format=ndjson',
+            '/api/v1/sensor/1337/data/stats?since=2018-06-01T00:00:00',
+            '/api/v1/sensor/1337/data/aggregate?interval=90s'
+            '&since=2018-06-05T00:15:00&until=2018-06-09T00:15:00',
+        ]
+        expected = [self.get(url) for url in urls]
+        self.seal()
+        assert [self.get(url) for url in urls] == expected
+
+    def test_read_pages(self):
+        ''' Ensures that sealed data is paged through as if it were not sealed. '''
+        def pages():
+            entries = []
+            url = '/api/v1/sensor/1337/data?since=2018-06-01T00:00:00&limit=500'
+            while True:
+                response = self.client.get(url)
+                page = json.loads(response.data.decode())
+                if not page:
+                    return entries
+                entries.extend(page)
+                url = response.headers['Link'][1:].split('>')[0]
+
+        expected = pages()
+        self.seal()
+        assert pages() == expected
+
+    def test_conditional(self):
+        ''' Ensures that sealing changes the version of the sensor data. '''
+        url = '/api/v1/sensor/1337/data?since=2018-06-01T00:00:00'
+        etag = self.client.get(url).headers['ETag']
+        self.seal()
+
+        response = self.client.get(url, headers={'If-None-Match': etag})
+        assert response.status_code == 200
+
+    def test_retention(self):
+        ''' Ensures that blocks are only deleted once they have fully expired. '''
+        self.seal()
+
+        with self.application.app_context():
+            db.session.add(RetentionPolicy(raw=5))
+            db.session.commit()
+
+            reclaimed = retention.enforce(now=self.now)
+            assert reclaimed['sensor_data_block'] == 5
+            assert SensorDataBlock.query.count() == 3
+
+    def test_rebuild_rollups(self):
+        ''' Ensures that rollups are rebuilt from sealed data. '''
+        with self.application.app_context():
+            expected = SensorDataRollup.query.count()
+
+        self.seal()
+        with self.application.app_context():
+            assert rollups.rebuild() == 6 * 24 * 10
+            assert SensorDataRollup.query.count() == expected
+
+
+if __name__ == '__main__':
+    unittest.main()
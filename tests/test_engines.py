@@ -0,0 +1,130 @@
+''' Implements tests for Europa database engine profiles. '''
+
+import os
+import shutil
+import tempfile
+import threading
+import unittest
+
+import sqlalchemy
+
+from sqlalchemy.engine.url import make_url
+
+from europa import engines
+from europa import initialize_all
+
+from europa.models import db
+from europa.models import SensorCategory
+
+
+class EuropaEnginesTestCase(unittest.TestCase):
+    ''' Defines tests for Europa database engine profiles. '''
+
+    def setUp(self):
+        ''' Ensure a directory is available for configuration, and databases. '''
+        self.directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        ''' Ensure the directory is removed between tests. '''
+        shutil.rmtree(self.directory)
+
+    def initialize(self, profile, uri=None):
+        ''' Returns an application configured with the given profile. '''
+        if uri is None:
+            uri = 'sqlite:///{}'.format(os.path.join(self.directory, 'europa.db'))
+
+        config_file = os.path.join(self.directory, 'europa.cfg')
+        with open(config_file, 'w') as handle:
+            handle.write('SQLALCHEMY_DATABASE_URI = {!r}\n'.format(uri))
+            handle.write('SQLALCHEMY_TRACK_MODIFICATIONS = False\n')
+            handle.write('DATABASE_PROFILE = {!r}\n'.format(profile))
+        return initialize_all(config_file=config_file)
+
+    def pragma(self, name):
+        ''' Returns the value of the given pragma, on a pooled connection. '''
+        return db.session.execute('PRAGMA {}'.format(name)).scalar()
+
+    def test_default(self):
+        ''' Ensures that engines are left untuned without a profile. '''
+        application = self.initialize(None)
+        with application.app_context():
+            assert isinstance(db.engine.pool, sqlalchemy.pool.NullPool)
+            assert self.pragma('journal_mode') == 'delete'
+
+    def test_sqlite_embedded(self):
+        ''' Ensures that each connection is tuned for embedded SQLite. '''
+        application = self.initialize('sqlite-embedded')
+        with application.app_context():
+            assert isinstance(db.engine.pool, sqlalchemy.pool.QueuePool)
+            assert db.engine.pool.size() == 5
+            assert self.pragma('journal_mode') == 'wal'
+            assert self.pragma('synchronous') == 1
+            assert self.pragma('busy_timeout') == 5000
+            assert self.pragma('cache_size') == -8192
+            assert self.pragma('mmap_size') == 67108864
+
+    def test_sqlite_embedded_threads(self):
+        ''' Ensures that pooled SQLite connections are usable by any thread. '''
+        application = self.initialize('sqlite-embedded')
+        with application.app_context():
+            db.create_all()
+            db.session.add(SensorCategory(name='Category', units='Degrees'))
+            db.session.commit()
+            db.session.remove()
+
+        counts = []
+
+        def read():
+            with application.app_context():
+                counts.append(SensorCategory.query.count())
+
+        threads = [threading.Thread(target=read) for _ in range(10)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        assert counts == [1] * 10
+
+    def test_sqlite_embedded_in_memory(self):
+        ''' Ensures that in-memory databases keep a single static connection. '''
+        application = self.initialize('sqlite-embedded', uri='sqlite://')
+        with application.app_context():
+            assert isinstance(db.engine.pool, sqlalchemy.pool.StaticPool)
+            assert self.pragma('busy_timeout') == 5000
+
+    def test_postgres_server(self):
+        ''' Ensures that pooled PostgreSQL connections are checked before use. '''
+        application = self.initialize(
+            'postgres-server',
+            uri='postgresql://europa@localhost/europa',
+        )
+        options = {}
+        engines.apply(
+            application,
+            make_url(application.config['SQLALCHEMY_DATABASE_URI']),
+            options,
+        )
+        assert options['pool_pre_ping'] is True
+        assert options['pool_size'] == 10
+        assert options['connect_args']['connect_timeout'] == 10
+
+    def test_configured_options(self):
+        ''' Ensures that configured pool options take precedence. '''
+        application = self.initialize('sqlite-embedded')
+        application.config['SQLALCHEMY_POOL_SIZE'] = 2
+        with application.app_context():
+            assert db.engine.pool.size() == 2
+
+    def test_invalid(self):
+        ''' Ensures that unknown, or mismatched, profiles are rejected. '''
+        with self.assertRaises(ValueError):
+            self.initialize('missing')
+
+        application = self.initialize('postgres-server')
+        with application.app_context():
+            with self.assertRaises(ValueError):
+                db.engine
+
+
+if __name__ == '__main__':
+    unittest.main()
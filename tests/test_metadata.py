@@ -0,0 +1,58 @@
+''' Implements tests for the Europa metadata response cache. '''
+
+import time
+import unittest
+
+from europa import metadata
+
+
+class EuropaMetadataCacheTestCase(unittest.TestCase):
+    ''' Defines tests for the Europa metadata response cache. '''
+
+    def setUp(self):
+        ''' Ensure a small cache is setup for testing. '''
+        self.cache = metadata.MetadataCache(
+            metadata.MemoryBackend(maximum_entries=2),
+            ttl=60,
+        )
+
+    def test_least_recently_used_evicted(self):
+        ''' Ensures that the least recently used response is evicted. '''
+        self.cache.set([metadata.SENSORS], '/a', b'a')
+        self.cache.set([metadata.SENSORS], '/b', b'b')
+        self.cache.get([metadata.SENSORS], '/a')
+        self.cache.set([metadata.SENSORS], '/c', b'c')
+
+        assert self.cache.get([metadata.SENSORS], '/a') == b'a'
+        assert self.cache.get([metadata.SENSORS], '/b') is None
+        assert self.cache.stats()['evictions'] == 1
+
+    def test_expired_not_served(self):
+        ''' Ensures that responses are not served once expired. '''
+        self.cache.ttl = 0.01
+        self.cache.set([metadata.SENSORS], '/a', b'a')
+        time.sleep(0.02)
+
+        assert self.cache.get([metadata.SENSORS], '/a') is None
+        assert self.cache.stats()['entries'] == 0
+
+    def test_invalidate_namespace(self):
+        ''' Ensures that invalidating a namespace only affects its responses. '''
+        self.cache.set([metadata.SENSORS, metadata.VESSELS], '/a', b'a')
+        self.cache.set([metadata.CATEGORIES], '/b', b'b')
+        self.cache.invalidate(metadata.VESSELS)
+
+        assert self.cache.get([metadata.SENSORS, metadata.VESSELS], '/a') is None
+        assert self.cache.get([metadata.CATEGORIES], '/b') == b'b'
+
+    def test_invalidated_while_built(self):
+        ''' Ensures that responses invalidated while being built are not served. '''
+        key = self.cache.key([metadata.SENSORS], '/a')
+        self.cache.invalidate(metadata.SENSORS)
+        self.cache.store(key, b'stale')
+
+        assert self.cache.get([metadata.SENSORS], '/a') is None
+
+
+if __name__ == '__main__':
+    unittest.main()
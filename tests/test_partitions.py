@@ -0,0 +1,108 @@
+''' Implements tests for Europa sensor data partitions. '''
+
+import datetime
+import unittest
+import unittest.mock
+
+import sqlalchemy
+
+from europa import partitions
+from europa import initialize_all
+
+from europa.models import db
+
+
+class EuropaPartitionsTestCase(unittest.TestCase):
+    ''' Defines tests for Europa sensor data partitions. '''
+
+    def setUp(self):
+        ''' Ensure the application, and database, is setup for testing. '''
+        self.application = initialize_all()
+
+        with self.application.app_context():
+            db.create_all()
+
+    def tearDown(self):
+        ''' Ensure the database is torn down between tests. '''
+        with self.application.app_context():
+            db.drop_all()
+
+    def test_months(self):
+        ''' Ensures that months are enumerated across years. '''
+        assert partitions.months(
+            datetime.datetime(2018, 11, 15, 12, 30),
+            datetime.datetime(2019, 2, 1),
+        ) == [
+            datetime.datetime(2018, 11, 1),
+            datetime.datetime(2018, 12, 1),
+            datetime.datetime(2019, 1, 1),
+            datetime.datetime(2019, 2, 1),
+        ]
+
+    def test_names(self):
+        ''' Ensures that partition names map to and from their month. '''
+        month = datetime.datetime(2018, 6, 1)
+        assert partitions.name_for(month) == 'sensor_data_y2018m06'
+        assert partitions.month_for('sensor_data_y2018m06') == month
+        assert partitions.month_for('sensor_data_unpartitioned') is None
+
+    def test_statements(self):
+        ''' Ensures that each partition holds exactly one month. '''
+        month = datetime.datetime(2018, 12, 1)
+        assert str(partitions.create_statement(month)) == (
+            'CREATE TABLE IF NOT EXISTS sensor_data_y2018m12 '
+            'PARTITION OF sensor_data '
+            "FOR VALUES FROM ('2018-12-01') TO ('2019-01-01')"
+        )
+        assert str(partitions.drop_statement(month)) == (
+            'DROP TABLE IF EXISTS sensor_data_y2018m12'
+        )
+
+    def test_unpartitioned(self):
+        ''' Ensures that nothing is managed where data is not partitioned. '''
+        with self.application.app_context():
+            manager = partitions.manager()
+            manager.ensure([{'created': datetime.datetime(2018, 6, 1)}])
+
+            assert manager.partitions() == []
+            assert manager.create_ahead() == []
+            assert manager.drop(datetime.datetime.utcnow()) == []
+
+    def test_refreshed(self):
+        ''' Ensures that partitions dropped by another process are recreated. '''
+        month = datetime.datetime(2018, 6, 1)
+        manager = partitions.PartitionManager()
+        manager.enabled = True
+        manager.existing = set([month])
+
+        with self.application.app_context():
+            with unittest.mock.patch.object(partitions, '_existing', set):
+                with unittest.mock.patch.object(db.session, 'execute') as execute:
+                    with unittest.mock.patch.object(db.session, 'commit'):
+                        manager.ensure([{'created': month}])
+                        assert not execute.called
+
+                        manager.refresh()
+                        manager.ensure([{'created': month}])
+                        assert manager.partitions() == [month]
+                        assert str(execute.call_args[0][0]) == str(
+                            partitions.create_statement(month)
+                        )
+
+    def test_missing(self):
+        ''' Ensures that only errors for rows without a partition are matched. '''
+        class Original(Exception):
+            pgcode = partitions.MISSING_PARTITION_CODE
+
+        missing = sqlalchemy.exc.IntegrityError(
+            'INSERT', {}, Original('no partition of relation "sensor_data" found'),
+        )
+        violated = sqlalchemy.exc.IntegrityError(
+            'INSERT', {}, Original('new row violates check constraint'),
+        )
+        assert partitions.missing(missing)
+        assert not partitions.missing(violated)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,358 @@
+''' Implements tests for the SQL emitted by the Europa API. '''
+
+import uuid
+import json
+import datetime
+import unittest
+import unittest.mock
+import contextlib
+
+import sqlalchemy
+
+from sqlalchemy.dialects import postgresql
+
+from europa import latest
+from europa import metadata
+from europa import statistics
+from europa import timeseries
+from europa import initialize_all
+
+from europa.models import db
+from europa.models import Plant
+from europa.models import Vessel
+from europa.models import VesselSize
+from europa.models import Sensor
+from europa.models import SensorData
+from europa.models import SensorCategory
+from europa.models import RetentionPolicy
+
+
+@contextlib.contextmanager
+def captured_statements(engine):
+    ''' Captures all SQL statements executed against the given engine. '''
+    statements = []
+
+    def capture(conn, cursor, statement, parameters, context, executemany):
+        statements.append((statement, parameters))
+
+    sqlalchemy.event.listen(engine, 'before_cursor_execute', capture)
+    try:
+        yield statements
+    finally:
+        sqlalchemy.event.remove(engine, 'before_cursor_execute', capture)
+
+
+@contextlib.contextmanager
+def counted_instructions(engine):
+    '''
+    Counts the number of SQLite virtual machine instructions executed against
+    the given engine, in blocks of 100. This provides a stable measure of the
+    work done by a query, which - unlike wall clock time - is not subject to
+    noise from the host.
+    '''
+    counter = [0]
+
+    def count():
+        counter[0] += 1
+        return 0
+
+    connection = engine.raw_connection()
+    connection.connection.set_progress_handler(count, 100)
+    try:
+        yield counter
+    finally:
+        connection.connection.set_progress_handler(None, 100)
+        connection.close()
+
+
+class EuropaQueryTestCase(unittest.TestCase):
+    ''' Defines tests for the SQL emitted by the Europa API. '''
+
+    def setUp(self):
+        ''' Ensure the application, and database, is setup for testing. '''
+        self.application = initialize_all()
+        self.client = self.application.test_client()
+
+        with self.application.app_context():
+            db.create_all()
+
+            # Seed the database with a valid vessel, category and sensors.
+            db.session.add(
+                Vessel(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    size=VesselSize.POT_TWELVE_CM,
+                    location='Some Location',
+                )
+            )
+            db.session.add(
+                SensorCategory(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    units='Boolean',
+                )
+            )
+            for sensor_id in range(1337, 1347):
+                db.session.add(
+                    Sensor(
+                        id=sensor_id,
+                        name=str(uuid.uuid4()),
+                        vessel_id=1337,
+                        category_id=1337,
+                    )
+                )
+
+            # Seed a day of recent readings for the sensor under test.
+            now = datetime.datetime.utcnow()
+            for minutes in range(0, 60 * 24, 5):
+                db.session.add(
+                    SensorData(
+                        value=1.0,
+                        sensor_id=1337,
+                        created=now - datetime.timedelta(minutes=minutes),
+                    )
+                )
+            db.session.commit()
+
+    def tearDown(self):
+        ''' Ensure the database is torn down between tests. '''
+        with self.application.app_context():
+            db.drop_all()
+
+    def seed_history(self, days):
+        ''' Seed historic data for all sensors, older than the last day. '''
+        start = datetime.datetime.utcnow() - datetime.timedelta(days=2)
+        entries = []
+        for sensor_id in range(1337, 1347):
+            for minutes in range(0, 60 * 24 * days, 5):
+                entries.append({
+                    'value': 1.0,
+                    'sensor_id': sensor_id,
+                    'created': start - datetime.timedelta(minutes=minutes),
+                })
+
+        with self.application.app_context():
+            db.session.execute(SensorData.__table__.insert(), entries)
+            db.session.commit()
+
+    def seed_related(self, start, count):
+        '''
+        Seed vessels, categories, and policies, each with their own sensors
+        and plants - so that no two results share the same related rows.
+        '''
+        with self.application.app_context():
+            for identifier in range(start, start + count):
+                db.session.add(
+                    Vessel(
+                        id=identifier,
+                        name=str(uuid.uuid4()),
+                        size=VesselSize.POT_TWELVE_CM,
+                        location='Some Location',
+                    )
+                )
+                db.session.add(
+                    SensorCategory(
+                        id=identifier,
+                        name=str(uuid.uuid4()),
+                        units='Boolean',
+                    )
+                )
+                db.session.add(
+                    Sensor(
+                        id=identifier,
+                        name=str(uuid.uuid4()),
+                        vessel_id=identifier,
+                        category_id=identifier,
+                    )
+                )
+                db.session.add(
+                    Plant(
+                        id=identifier,
+                        name=str(uuid.uuid4()),
+                        vessel_id=identifier,
+                    )
+                )
+                db.session.add(RetentionPolicy(sensor_id=identifier, raw=1))
+                db.session.add(
+                    SensorData(
+                        value=1.0,
+                        sensor_id=identifier,
+                        created=datetime.datetime.utcnow(),
+                    )
+                )
+            db.session.commit()
+            latest.cache().warm()
+
+    def count_statements(self, path):
+        ''' Returns the number of SQL statements executed by a request. '''
+        with self.application.app_context():
+            metadata.cache().invalidate(
+                metadata.VESSELS,
+                metadata.PLANTS,
+                metadata.SENSORS,
+                metadata.CATEGORIES,
+            )
+            with captured_statements(db.engine) as statements:
+                response = self.client.get(path)
+
+        assert response.status_code == 200
+        return len(statements)
+
+    def test_statements_do_not_scale_with_results(self):
+        ''' Ensures that no endpoint executes a statement for each result. '''
+        paths = [
+            '/api/v1/vessel',
+            '/api/v1/plants',
+            '/api/v1/sensors',
+            '/api/v1/sensor/categories',
+            '/api/v1/retention/policies',
+            '/api/v1/sensors/data',
+            '/api/v1/sensors/latest',
+            '/api/v1/sensor/1337',
+            '/api/v1/plant/2000',
+        ]
+
+        self.seed_related(2000, 1)
+        before = dict((path, self.count_statements(path)) for path in paths)
+
+        # Seeding many more results must not change the statements executed.
+        self.seed_related(2001, 20)
+        after = dict((path, self.count_statements(path)) for path in paths)
+        assert before == after
+
+    def test_retrieve_sensor_data_joins_sensor(self):
+        ''' Ensures that sensor data is retrieved without a cross join. '''
+        with self.application.app_context():
+            with captured_statements(db.engine) as statements:
+                response = self.client.get('/api/v1/sensor/1337/data')
+
+        assert response.status_code == 200
+        statement = [s for s, _ in statements if 'sensor_data' in s][-1]
+        assert 'JOIN sensor ON' in statement
+        assert 'FROM sensor_data, sensor' not in statement
+
+        # A cross join returns each entry once per sensor, so ensure there are
+        # no duplicates now there is more than one sensor.
+        assert len(json.loads(response.data.decode())) == 60 * 24 / 5
+
+    def test_retrieve_sensor_data_uses_index(self):
+        ''' Ensures that sensor data is read and ordered using an index. '''
+        with self.application.app_context():
+            with captured_statements(db.engine) as statements:
+                self.client.get('/api/v1/sensor/1337/data')
+
+            statement, parameters = [
+                (s, p) for s, p in statements if 'sensor_data' in s
+            ][-1]
+            connection = db.engine.raw_connection()
+            try:
+                plan = connection.cursor().execute(
+                    'EXPLAIN QUERY PLAN {}'.format(statement), parameters
+                ).fetchall()
+            finally:
+                connection.close()
+
+        plan = ' '.join(str(step[-1]) for step in plan)
+        assert 'sensor_id_created_idx' in plan
+        assert 'TEMP B-TREE' not in plan
+
+    def test_retrieve_sensor_data_scales_with_window(self):
+        ''' Ensures that sensor data retrieval cost does not grow with history. '''
+        with self.application.app_context():
+            with counted_instructions(db.engine) as before:
+                self.client.get('/api/v1/sensor/1337/data')
+
+        self.seed_history(days=30)
+
+        with self.application.app_context():
+            with counted_instructions(db.engine) as after:
+                self.client.get('/api/v1/sensor/1337/data')
+
+        # Thirty days of history for ten sensors is thousands of times larger
+        # than the window being read, so allow only a small amount of growth.
+        assert after[0] < before[0] * 1.5
+
+    def test_retrieve_sensor_data_without_orm(self):
+        ''' Ensures that sensor data is read without loading ORM objects. '''
+        loaded = []
+
+        def load(target, context):
+            loaded.append(target)
+
+        sqlalchemy.event.listen(SensorData, 'load', load)
+        try:
+            with self.application.app_context():
+                single = self.client.get('/api/v1/sensor/1337/data')
+                many = self.client.get('/api/v1/sensors/data?ids=1337')
+        finally:
+            sqlalchemy.event.remove(SensorData, 'load', load)
+
+        assert len(json.loads(single.data.decode())) == 288
+        assert len(json.loads(many.data.decode())['1337']) == 288
+        assert loaded == []
+
+    def test_sensor_data_read_in_chunks(self):
+        ''' Ensures that sensor data is read into arrays a chunk at a time. '''
+        query = sqlalchemy.select([
+            SensorData.id,
+            SensorData.created,
+            SensorData.value,
+        ]).order_by(SensorData.created, SensorData.id)
+
+        with self.application.app_context():
+            rows = db.session.execute(query).fetchall()
+            with unittest.mock.patch.object(timeseries, 'ROW_CHUNK_SIZE', 100):
+                for size in (None, 10, len(rows)):
+                    series = timeseries.Series.from_rows(
+                        db.session.execute(query),
+                        size=size,
+                    )
+                    assert series.ids.tolist() == [row[0] for row in rows]
+                    assert series.created.tolist() == [row[1] for row in rows]
+                    assert series.values.tolist() == [row[2] for row in rows]
+
+    def test_retrieve_sensor_data_not_modified(self):
+        ''' Ensures that unchanged sensor data is not read from the database. '''
+        with self.application.app_context():
+            etag = self.client.get('/api/v1/sensor/1337/data').headers['ETag']
+            with captured_statements(db.engine) as statements:
+                response = self.client.get(
+                    '/api/v1/sensor/1337/data',
+                    headers={'If-None-Match': etag},
+                )
+
+        assert response.status_code == 304
+        assert len(statements) == 1
+        assert 'count(*)' in statements[0][0]
+
+    def test_cached_metadata_without_queries(self):
+        ''' Ensures that cached metadata, and its validators, are served without queries. '''
+        with self.application.app_context():
+            etag = self.client.get('/api/v1/sensors').headers['ETag']
+            with captured_statements(db.engine) as statements:
+                response = self.client.get('/api/v1/sensors')
+                assert response.status_code == 200
+                assert response.headers['ETag'] == etag
+
+                response = self.client.get(
+                    '/api/v1/sensors',
+                    headers={'If-None-Match': etag},
+                )
+                assert response.status_code == 304
+
+        assert statements == []
+
+    def test_statistics_in_database(self):
+        ''' Ensures that PostgreSQL calculates percentiles in one aggregate. '''
+        statement = str(
+            sqlalchemy.select(
+                statistics._aggregates([5, 50, 95])
+            ).compile(dialect=postgresql.dialect())
+        )
+        assert statement.count('percentile_cont') == 1
+        assert 'WITHIN GROUP (ORDER BY sensor_data.value)' in statement
+        assert 'var_samp(sensor_data.value)' in statement
+
+
+if __name__ == '__main__':
+    unittest.main()
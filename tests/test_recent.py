@@ -0,0 +1,298 @@
+''' Implements tests for the Europa recent sensor data store. '''
+
+import uuid
+import json
+import fcntl
+import shutil
+import datetime
+import tempfile
+import unittest
+
+import numpy
+import sqlalchemy
+
+from europa import recent
+from europa import retention
+from europa import initialize_all
+
+from europa.models import db
+from europa.models import Vessel
+from europa.models import VesselSize
+from europa.models import Sensor
+from europa.models import SensorData
+from europa.models import SensorCategory
+from europa.models import RetentionPolicy
+
+
+class EuropaRecentTestCase(unittest.TestCase):
+    ''' Defines tests for the Europa recent sensor data store. '''
+
+    def setUp(self):
+        ''' Ensure the application, database, and store is setup for testing. '''
+        self.application = initialize_all()
+        self.client = self.application.test_client()
+        self.directory = tempfile.mkdtemp()
+        self.application.extensions[recent.EXTENSION_NAME] = (
+            recent.RecentStore(self.directory, capacity=16)
+        )
+        self.now = datetime.datetime.utcnow().replace(microsecond=0)
+
+        with self.application.app_context():
+            db.create_all()
+            db.session.add(
+                Vessel(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    size=VesselSize.POT_TWELVE_CM,
+                    location='Some Location',
+                )
+            )
+            db.session.add(
+                SensorCategory(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    units='Degrees',
+                )
+            )
+            db.session.add(
+                Sensor(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    vessel_id=1337,
+                    category_id=1337,
+                )
+            )
+            db.session.commit()
+
+    def tearDown(self):
+        ''' Ensure the database, and store, is torn down between tests. '''
+        with self.application.app_context():
+            db.drop_all()
+        shutil.rmtree(self.directory)
+
+    def post(self, minutes, value):
+        ''' Adds an entry, created the given number of minutes ago, via the API. '''
+        created = self.now - datetime.timedelta(minutes=minutes)
+        response = self.client.post(
+            '/api/v1/sensor/1337/data',
+            data=json.dumps({
+                'value': value,
+                'created': created.strftime('%Y-%m-%dT%H:%M:%S'),
+            }),
+            content_type='application/json',
+        )
+        assert response.status_code == 201
+
+    def get(self, url):
+        '''
+        Returns the body of the response for the given URL, and the statements
+        executed to serve it.
+        '''
+        statements = []
+
+        def capture(conn, cursor, statement, parameters, context, executemany):
+            statements.append(statement)
+
+        with self.application.app_context():
+            sqlalchemy.event.listen(db.engine, 'before_cursor_execute', capture)
+            try:
+                response = self.client.get(url)
+            finally:
+                sqlalchemy.event.remove(
+                    db.engine,
+                    'before_cursor_execute',
+                    capture,
+                )
+        assert response.status_code == 200
+        return json.loads(response.data.decode()), statements
+
+    def test_serves_without_queries(self):
+        ''' Ensures that recent windows are served without querying data. '''
+        for minutes in range(10, 0, -1):
+            self.post(minutes, float(minutes))
+
+        url = '/api/v1/sensor/1337/data?max_points=5'
+        served, statements = self.get(url)
+        assert statements == []
+
+        # The same data must be served from the database.
+        self.application.extensions[recent.EXTENSION_NAME] = (
+            recent.DisabledStore()
+        )
+        expected, statements = self.get(url)
+        assert statements
+        assert served == expected
+
+    def test_serves_many_without_queries(self):
+        ''' Ensures that windows for many sensors are served without queries. '''
+        self.post(1, 1.0)
+        served, statements = self.get('/api/v1/sensors/data?ids=1337')
+        assert len(statements) == 1
+        assert served == {'1337': [{
+            'value': 1.0,
+            'created': (self.now - datetime.timedelta(minutes=1)).strftime(
+                '%Y-%m-%dT%H:%M:%S'
+            ),
+        }]}
+
+    def test_window_not_held(self):
+        ''' Ensures that windows older than the buffer are read from the database. '''
+        for minutes in range(20, 0, -1):
+            self.post(minutes, float(minutes))
+
+        # Only the most recent 16 entries are held.
+        since = (self.now - datetime.timedelta(minutes=16)).strftime(
+            '%Y-%m-%dT%H:%M:%S'
+        )
+        served, statements = self.get('/api/v1/sensor/1337/data?since=' + since)
+        assert statements == []
+        assert len(served) == 16
+
+        served, statements = self.get('/api/v1/sensor/1337/data')
+        assert statements
+        assert len(served) == 20
+
+    def test_out_of_order(self):
+        ''' Ensures that entries arriving out of order are held in order. '''
+        self.post(1, 1.0)
+        self.post(3, 3.0)
+        self.post(2, 2.0)
+
+        served, statements = self.get('/api/v1/sensor/1337/data')
+        assert statements == []
+        assert [entry['value'] for entry in served] == [3.0, 2.0, 1.0]
+
+    def test_shared(self):
+        ''' Ensures that entries appended by one process are read by another. '''
+        self.post(2, 2.0)
+        other = recent.RecentStore(self.directory, capacity=16)
+
+        with self.application.app_context():
+            self.post(1, 1.0)
+            series, _ = other.read(1337, self.now - datetime.timedelta(hours=1))
+            assert series.values.tolist() == [2.0, 1.0]
+
+    def test_rebuilt(self):
+        ''' Ensures that the store is rebuilt from the database. '''
+        with self.application.app_context():
+            db.session.execute(
+                SensorData.__table__.insert(),
+                [
+                    {
+                        'sensor_id': 1337,
+                        'value': float(minutes),
+                        'created': self.now - datetime.timedelta(minutes=minutes),
+                    }
+                    for minutes in range(1, 21)
+                ],
+            )
+            db.session.commit()
+            recent.store().warm()
+
+            # Only the most recent entries are held. As other entries may have
+            # been created at the same time as the oldest entry held, windows
+            # from that time are not served either.
+            since = self.now - datetime.timedelta(minutes=15)
+            series, _ = recent.store().read(1337, since)
+            assert len(series) == 15
+            since = since - datetime.timedelta(minutes=1)
+            assert recent.store().read(1337, since) is None
+
+    def test_retention(self):
+        ''' Ensures that data deleted by retention is no longer served. '''
+        with self.application.app_context():
+            db.session.execute(
+                SensorData.__table__.insert(),
+                [
+                    {
+                        'sensor_id': 1337,
+                        'value': float(hours),
+                        'created': self.now - datetime.timedelta(hours=hours),
+                    }
+                    for hours in list(range(1, 4)) + list(range(20, 30))
+                ],
+            )
+            db.session.add(RetentionPolicy(sensor_id=1337, raw=1))
+            db.session.commit()
+            recent.store().warm()
+
+            reclaimed = retention.enforce(now=self.now)
+            assert reclaimed['sensor_data'] == 5
+
+        since = (self.now - datetime.timedelta(hours=40)).strftime(
+            '%Y-%m-%dT%H:%M:%S'
+        )
+        served, statements = self.get('/api/v1/sensor/1337/data?since=' + since)
+        assert statements == []
+        assert [entry['value'] for entry in served] == [
+            24.0, 23.0, 22.0, 21.0, 20.0, 3.0, 2.0, 1.0,
+        ]
+
+    def test_conditional(self):
+        ''' Ensures that recent windows can be conditionally retrieved. '''
+        self.post(2, 2.0)
+        response = self.client.get('/api/v1/sensor/1337/data')
+        etag = response.headers['ETag']
+
+        response = self.client.get(
+            '/api/v1/sensor/1337/data',
+            headers={'If-None-Match': etag},
+        )
+        assert response.status_code == 304
+
+        self.post(1, 1.0)
+        response = self.client.get(
+            '/api/v1/sensor/1337/data',
+            headers={'If-None-Match': etag},
+        )
+        assert response.status_code == 200
+
+    def test_discarded(self):
+        ''' Ensures that data is not served for deleted sensors. '''
+        self.post(1, 1.0)
+        response = self.client.delete('/api/v1/sensor/1337')
+        assert response.status_code == 204
+
+        with self.application.app_context():
+            assert recent.store().read(1337, self.now - datetime.timedelta(hours=1)) is None
+
+    def test_discarded_rebuilt(self):
+        ''' Ensures that data is not served for deleted sensors once rebuilt. '''
+        self.post(2, 2.0)
+        self.post(1, 1.0)
+        response = self.client.delete('/api/v1/sensor/1337')
+        assert response.status_code == 204
+
+        with self.application.app_context():
+            recent.store().warm()
+            recent.store().rebuild(1337)
+
+        served, _ = self.get('/api/v1/sensor/1337/data')
+        assert served == []
+
+    def test_rebuilt_exclusively(self):
+        ''' Ensures that entries are loaded while appends are excluded. '''
+        self.post(1, 1.0)
+        buffer = self.application.extensions[recent.EXTENSION_NAME]._buffer(1337)
+        held = []
+
+        def load():
+            with open(buffer.path, 'rb') as handle:
+                try:
+                    fcntl.flock(handle, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except (IOError, OSError):
+                    held.append(True)
+                else:
+                    fcntl.flock(handle, fcntl.LOCK_UN)
+            return (
+                numpy.array([0], dtype=numpy.int64),
+                numpy.array([1.0]),
+                True,
+            )
+
+        buffer.rebuild(load)
+        assert held == [True]
+
+
+if __name__ == '__main__':
+    unittest.main()
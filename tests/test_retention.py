@@ -0,0 +1,146 @@
+''' Implements tests for Europa sensor data retention. '''
+
+import uuid
+import datetime
+import unittest
+
+from europa import rollups
+from europa import retention
+from europa import initialize_all
+
+from europa.models import db
+from europa.models import Vessel
+from europa.models import VesselSize
+from europa.models import Sensor
+from europa.models import SensorData
+from europa.models import SensorCategory
+from europa.models import SensorDataRollup
+from europa.models import RetentionPolicy
+
+
+class EuropaRetentionTestCase(unittest.TestCase):
+    ''' Defines tests for Europa sensor data retention. '''
+
+    def setUp(self):
+        ''' Ensure the application, and database, is setup for testing. '''
+        self.application = initialize_all()
+        self.now = datetime.datetime(2018, 6, 1, 0, 0, 0)
+
+        with self.application.app_context():
+            db.create_all()
+            db.session.add(
+                Vessel(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    size=VesselSize.POT_TWELVE_CM,
+                    location='Some Location',
+                )
+            )
+            for category_id in (1337, 1338):
+                db.session.add(
+                    SensorCategory(
+                        id=category_id,
+                        name=str(uuid.uuid4()),
+                        units='Degrees',
+                    )
+                )
+            for sensor_id, category_id in ((1337, 1337), (1338, 1337), (1339, 1338)):
+                db.session.add(
+                    Sensor(
+                        id=sensor_id,
+                        name=str(uuid.uuid4()),
+                        vessel_id=1337,
+                        category_id=category_id,
+                    )
+                )
+
+            # Seed thirty days of hourly data for each sensor.
+            entries = [
+                {
+                    'value': 1.0,
+                    'sensor_id': sensor_id,
+                    'created': self.now - datetime.timedelta(hours=hours),
+                }
+                for sensor_id in (1337, 1338, 1339)
+                for hours in range(1, 24 * 30 + 1)
+            ]
+            db.session.execute(SensorData.__table__.insert(), entries)
+            rollups.update(entries)
+            db.session.commit()
+
+    def tearDown(self):
+        ''' Ensure the database is torn down between tests. '''
+        with self.application.app_context():
+            db.drop_all()
+
+    def count(self, model, sensor_id, **criteria):
+        ''' Returns the number of rows for a sensor matching the criteria. '''
+        return model.query.filter_by(sensor_id=sensor_id, **criteria).count()
+
+    def test_enforce_most_specific_policy(self):
+        ''' Ensures that the most specific retention policy is enforced. '''
+        with self.application.app_context():
+            db.session.add(RetentionPolicy(raw=20))
+            db.session.add(RetentionPolicy(category_id=1337, raw=10, hourly=5))
+            db.session.add(RetentionPolicy(sensor_id=1337, raw=1))
+            db.session.commit()
+
+            reclaimed = retention.enforce(batch_size=100, now=self.now)
+
+            assert self.count(SensorData, 1337) == 24
+            assert self.count(SensorData, 1338) == 24 * 10
+            assert self.count(SensorData, 1339) == 24 * 20
+            assert self.count(SensorDataRollup, 1338, resolution=3600) == 24 * 5
+            assert self.count(SensorDataRollup, 1338, resolution=86400) == 30
+            assert reclaimed == {
+                'sensor_data': 24 * (29 + 20 + 10),
+                'sensor_data_rollup': 24 * 25,
+                'sensor_data_block': 0,
+            }
+
+    def test_enforce_without_policies(self):
+        ''' Ensures that no data is deleted without a retention policy. '''
+        with self.application.app_context():
+            reclaimed = retention.enforce(now=self.now)
+
+            assert self.count(SensorData, 1337) == 24 * 30
+            assert reclaimed == {
+                'sensor_data': 0,
+                'sensor_data_rollup': 0,
+                'sensor_data_block': 0,
+            }
+
+    def test_enforce_invalid_batch_size(self):
+        ''' Ensures that batches which could never complete are rejected. '''
+        with self.application.app_context():
+            db.session.add(RetentionPolicy(raw=1))
+            db.session.commit()
+
+            for batch_size in (0, -1):
+                with self.assertRaises(ValueError):
+                    retention.enforce(batch_size=batch_size, now=self.now)
+            assert self.count(SensorData, 1337) == 24 * 30
+
+    def test_expired_before(self):
+        ''' Ensures that data is only expired for all sensors once all expire. '''
+        with self.application.app_context():
+            db.session.add(RetentionPolicy(category_id=1337, raw=10))
+            db.session.commit()
+
+            # Data for sensors without a policy is kept indefinitely.
+            assert retention.expired_before(now=self.now) is None
+            assert retention.drop_partitions(now=self.now) == []
+
+            db.session.add(RetentionPolicy(sensor_id=1339, raw=20))
+            db.session.commit()
+            assert retention.expired_before(now=self.now) == (
+                self.now - datetime.timedelta(days=20)
+            )
+
+            # Sensor data is not partitioned on SQLite, so nothing is dropped.
+            assert retention.drop_partitions(now=self.now) == []
+            assert self.count(SensorData, 1339) == 24 * 30
+
+
+if __name__ == '__main__':
+    unittest.main()
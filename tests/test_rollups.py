@@ -0,0 +1,184 @@
+''' Implements tests for Europa sensor data rollups. '''
+
+import uuid
+import json
+import datetime
+import unittest
+import unittest.mock
+
+from europa import rollups
+from europa import retention
+from europa import initialize_all
+
+from europa.models import db
+from europa.models import Vessel
+from europa.models import VesselSize
+from europa.models import Sensor
+from europa.models import SensorCategory
+from europa.models import SensorDataRollup
+from europa.models import RetentionPolicy
+
+
+class EuropaRollupTestCase(unittest.TestCase):
+    ''' Defines tests for Europa sensor data rollups. '''
+
+    def setUp(self):
+        ''' Ensure the application, and database, is setup for testing. '''
+        self.application = initialize_all()
+        self.client = self.application.test_client()
+
+        with self.application.app_context():
+            db.create_all()
+            db.session.add(
+                Vessel(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    size=VesselSize.POT_TWELVE_CM,
+                    location='Some Location',
+                )
+            )
+            db.session.add(
+                SensorCategory(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    units='Boolean',
+                )
+            )
+            db.session.add(
+                Sensor(
+                    id=1337,
+                    name=str(uuid.uuid4()),
+                    vessel_id=1337,
+                    category_id=1337,
+                )
+            )
+            db.session.commit()
+
+    def tearDown(self):
+        ''' Ensure the database is torn down between tests. '''
+        with self.application.app_context():
+            db.drop_all()
+
+    def post(self, start, minutes, value):
+        ''' Submits a batch of sensor data, one entry per minute. '''
+        payload = json.dumps([
+            {
+                'value': value(minute),
+                'created': (
+                    start + datetime.timedelta(minutes=minute)
+                ).strftime('%Y-%m-%dT%H:%M:%S'),
+            }
+            for minute in minutes
+        ])
+        response = self.client.post(
+            '/api/v1/sensor/1337/data/batch',
+            data=payload,
+            content_type='application/json',
+        )
+        assert response.status_code == 201
+
+    def summaries(self):
+        ''' Returns all rollups in the database, in a comparable format. '''
+        with self.application.app_context():
+            return sorted(
+                (
+                    candidate.resolution,
+                    candidate.bucket,
+                    candidate.count,
+                    candidate.total,
+                    candidate.minimum,
+                    candidate.maximum,
+                    candidate.last_value,
+                )
+                for candidate in SensorDataRollup.query.all()
+            )
+
+    def test_rollups_updated_on_ingest(self):
+        ''' Ensures that rollups are merged as data is submitted. '''
+        start = datetime.datetime(2018, 1, 1, 12, 0, 0)
+        self.post(start, range(0, 90, 2), lambda minute: float(minute))
+        self.post(start, range(1, 90, 2), lambda minute: -float(minute))
+
+        hourly = [
+            summary for summary in self.summaries() if summary[0] == 3600
+        ]
+        assert hourly == [
+            (3600, start, 60, -30.0, -59.0, 58.0, -59.0),
+            (3600, start + datetime.timedelta(hours=1), 30, -15.0, -89.0, 88.0, -89.0),
+        ]
+
+    def test_rollups_rebuilt(self):
+        ''' Ensures that rebuilt rollups match incrementally updated rollups. '''
+        start = datetime.datetime(2018, 1, 1, 23, 0, 0)
+        self.post(start, range(0, 120, 3), lambda minute: float(minute % 7))
+        self.post(start, range(1, 120, 3), lambda minute: float(minute % 5))
+        incremental = self.summaries()
+
+        with self.application.app_context():
+            assert rollups.rebuild() == 80
+        assert self.summaries() == incremental
+
+    def test_rollups_rebuilt_during_ingest(self):
+        ''' Ensures that data stored while rebuilding is only applied once. '''
+        start = datetime.datetime(2018, 1, 1, 23, 0, 0)
+        self.post(start, range(0, 60), lambda minute: float(minute))
+        rebuild = rollups.update
+        ingested = []
+
+        def update(entries, floors=None):
+            # Store a new entry, as ingest would, after the first chunk.
+            rebuild(entries, floors)
+            if not ingested:
+                ingested.append(True)
+                self.post(start, [60], lambda minute: float(minute))
+
+        with self.application.app_context():
+            with unittest.mock.patch.object(rollups, 'REBUILD_CHUNK_SIZE', 10):
+                with unittest.mock.patch.object(rollups, 'update', update):
+                    rollups.rebuild()
+        rebuilt = self.summaries()
+
+        with self.application.app_context():
+            rollups.rebuild()
+        assert self.summaries() == rebuilt
+
+    def test_rollups_rebuilt_after_retention(self):
+        ''' Ensures that rebuilding keeps rollups of data removed by retention. '''
+        start = datetime.datetime(2018, 1, 1, 0, 30, 0)
+        self.post(start, range(0, 60 * 24 * 3, 20), lambda minute: float(minute))
+        incremental = self.summaries()
+
+        # Keep raw data for a day, and rollups forever.
+        with self.application.app_context():
+            db.session.add(RetentionPolicy(raw=1))
+            db.session.commit()
+            retention.enforce(now=datetime.datetime(2018, 1, 3, 12, 0, 0))
+            rollups.rebuild()
+        assert self.summaries() == incremental
+
+    def test_aggregate_from_rollups(self):
+        ''' Ensures that aggregates from rollups match those from raw data. '''
+        start = datetime.datetime(2018, 1, 1, 0, 0, 0)
+        self.post(start, range(0, 60 * 6, 7), lambda minute: float(minute))
+
+        # Buckets of 30 seconds cannot be built from rollups, so are read from
+        # raw data. Aggregating these again must match the hourly rollups.
+        arguments = 'since=2018-01-01T00:00:00&until=2018-01-01T06:00:00'
+        raw = json.loads(self.client.get(
+            '/api/v1/sensor/1337/data/aggregate?interval=30s&fn=sum,count&{}'
+            .format(arguments)
+        ).data.decode())
+        hourly = json.loads(self.client.get(
+            '/api/v1/sensor/1337/data/aggregate?interval=1h&fn=sum,count&{}'
+            .format(arguments)
+        ).data.decode())
+
+        assert len(hourly) == 6
+        assert sum(entry['sum'] for entry in raw) == \
+            sum(entry['sum'] for entry in hourly)
+        assert sum(entry['count'] for entry in raw) == \
+            sum(entry['count'] for entry in hourly)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,5 +1,6 @@
 ''' Implements tests for the Europa UI. '''
 
+import gzip
 import unittest
 import coverage
 
@@ -29,6 +30,25 @@ class EuropaStaticTestCase(unittest.TestCase):
         response = self.client.get('/ui/static/css/style.css')
         assert response.status_code == 200
 
+    def test_fetch_ui_static_content_compressed(self):
+        ''' Ensures that precompressed static files are served if accepted. '''
+        response = self.client.get(
+            '/ui/static/js/chart-2.7.2.min.js',
+            headers={'Accept-Encoding': 'gzip'},
+        )
+        assert response.status_code == 200
+        assert response.headers['Content-Encoding'] == 'gzip'
+        assert response.cache_control.max_age == 60 * 60 * 24 * 365
+
+        # The decompressed content must match the uncompressed file.
+        uncompressed = self.client.get('/ui/static/js/chart-2.7.2.min.js')
+        assert 'Content-Encoding' not in uncompressed.headers
+        assert gzip.decompress(response.data) == uncompressed.data
+
+    def test_fetch_ui_index_versioned_assets(self):
+        ''' Ensures that the UI index references versioned static files. '''
+        response = self.client.get('/ui/')
+        assert b'/ui/static/css/style.css?v=' in response.data
 
 if __name__ == '__main__':
     unittest.main()